@@ -0,0 +1,115 @@
+"""
+Applied Hashes
+Canonical content hashes of the last payload applied to each notebook/dashboard, used to skip no-op updates
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def canonical_hash(payload: Any) -> str:
+    """
+    SHA-256 of a payload's canonical JSON form
+
+    Keys are sorted and whitespace removed, so payloads that differ only in key
+    order or formatting hash the same.
+    """
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class AppliedHashStore:
+    """
+    Last-applied payload hash per (kind, resource ID)
+
+    The record is local: a resource edited directly in Datadog still matches
+    its old hash, so callers need a way to force an update. With a path, the
+    record is loaded at start-up and written back at most every flush_interval
+    seconds (and on flush()).
+    """
+
+    def __init__(self, path: Optional[str] = None, flush_interval: float = 1.0):
+        """
+        Initialize the store
+
+        Args:
+            path: Optional JSON file persisting the record across restarts
+            flush_interval: Minimum seconds between automatic writes to path
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self._hashes: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_flush = 0.0
+        self.skipped = 0
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self._hashes = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable applied-hash record {path}: {str(e)}")
+
+    @staticmethod
+    def _key(kind: str, resource_id: Any) -> str:
+        return f"{kind}:{resource_id}"
+
+    def matches(self, kind: str, resource_id: Any, digest: str) -> bool:
+        """True if digest is the hash last applied to the resource"""
+        with self._lock:
+            unchanged = self._hashes.get(self._key(kind, resource_id)) == digest
+            if unchanged:
+                self.skipped += 1
+            return unchanged
+
+    def record(self, kind: str, resource_id: Any, digest: str) -> None:
+        """Remember the hash just applied to a resource"""
+        with self._lock:
+            self._hashes[self._key(kind, resource_id)] = digest
+            self._dirty = True
+        self._maybe_flush()
+
+    def forget(self, kind: str, resource_id: Any) -> None:
+        """Drop a resource, e.g. after it was deleted or a write failed part-way"""
+        with self._lock:
+            if self._hashes.pop(self._key(kind, resource_id), None) is None:
+                return
+            self._dirty = True
+        self._maybe_flush()
+
+    def _maybe_flush(self) -> None:
+        if self.path and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the record to path if it changed since the last write"""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = dict(self._hashes)
+            self._dirty = False
+            self._last_flush = time.monotonic()
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(snapshot, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Failed to write applied-hash record {self.path}: {str(e)}")
+            with self._lock:
+                self._dirty = True
+
+    def stats(self) -> Dict[str, Any]:
+        """Number of tracked resources and updates skipped so far"""
+        with self._lock:
+            return {"resources": len(self._hashes), "skipped": self.skipped, "path": self.path}
@@ -0,0 +1,664 @@
+"""
+Async Datadog API Client
+Non-blocking counterpart of DatadogClient built on a pooled httpx transport
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, Any, Optional, List, Callable, Awaitable, Tuple, AsyncIterator
+
+import httpx
+
+import metric_series
+from applied_hashes import AppliedHashStore, canonical_hash
+from datadog_client import DatadogAPIError, DatadogPayloadMixin, PreparedPayload, CREATE_PATHS
+from rate_limiter import RateLimiter, endpoint_family
+from response_cache import ResponseCache
+from timeseries_cache import TimeseriesCache
+import resilience
+from resilience import CircuitBreaker, DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class AsyncDatadogClient(DatadogPayloadMixin):
+    def __init__(self, api_key: str, app_key: str, base_url: str = "https://api.datadoghq.com",
+                 http2: bool = False, max_connections: int = 100, max_keepalive_connections: int = 20,
+                 keepalive_expiry: float = 30.0, timeout: float = 30.0, connect_timeout: float = 5.0,
+                 rate_limiter: Optional[RateLimiter] = None, bulk_concurrency: int = 8,
+                 response_cache: Optional[ResponseCache] = None, gzip_threshold: Optional[int] = None,
+                 gzip_level: int = 6, timeseries_cache: Optional[TimeseriesCache] = None,
+                 applied_hashes: Optional[AppliedHashStore] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        """
+        Initialize the async client
+
+        Args:
+            api_key: Datadog API key
+            app_key: Datadog application key
+            base_url: Datadog API base URL
+            http2: Negotiate HTTP/2 when the optional 'h2' package is installed
+            max_connections: Maximum number of pooled connections
+            max_keepalive_connections: Maximum idle connections kept open
+            keepalive_expiry: Seconds an idle connection is kept open
+            timeout: Read/write timeout in seconds
+            connect_timeout: Connect timeout in seconds
+            rate_limiter: Rate limiter to pace requests with, shareable with a DatadogClient
+            bulk_concurrency: Default number of bulk items in flight
+            response_cache: Cache for single notebook/dashboard GETs, shareable with a DatadogClient
+            gzip_threshold: Gzip request bodies of at least this many bytes (None disables)
+            gzip_level: Gzip compression level
+            timeseries_cache: Bucket cache for metric query results, shareable with a DatadogClient
+            applied_hashes: Last-applied payload hashes used to skip unchanged updates, shareable with a DatadogClient
+            circuit_breaker: Breaker that fails fast while Datadog is degraded, shareable with a DatadogClient
+            transport: Optional httpx transport replacing the pooled network one, e.g. a cassette replay
+        """
+        self.api_key = api_key
+        self.app_key = app_key
+        self.base_url = base_url.rstrip('/')
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.bulk_concurrency = bulk_concurrency
+        self.gzip_threshold = gzip_threshold
+        self.gzip_level = gzip_level
+        self.response_cache = response_cache if response_cache is not None else ResponseCache()
+        self.timeseries_cache = timeseries_cache
+        self.applied_hashes = applied_hashes if applied_hashes is not None else AppliedHashStore()
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.circuit_breaker = circuit_breaker or CircuitBreaker("datadog")
+
+        if http2 and not HTTP2_AVAILABLE:
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed, falling back to HTTP/1.1")
+            http2 = False
+
+        self.client = httpx.AsyncClient(
+            transport=transport,
+            http2=http2,
+            limits=self.pool_limits(max_connections, max_keepalive_connections, keepalive_expiry),
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            headers={
+                'DD-API-KEY': self.api_key,
+                'DD-APPLICATION-KEY': self.app_key,
+                'Content-Type': 'application/json',
+                'Accept': 'application/json'
+            }
+        )
+
+    @staticmethod
+    def pool_limits(max_connections: int = 100, max_keepalive_connections: int = 20,
+                    keepalive_expiry: float = 30.0) -> httpx.Limits:
+        """Connection pool limits for the given settings, e.g. to build a replacement transport with"""
+        return httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections,
+                            keepalive_expiry=keepalive_expiry)
+
+    async def aclose(self) -> None:
+        """Close all pooled connections"""
+        await self.client.aclose()
+
+    async def __aenter__(self) -> "AsyncDatadogClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Send a request paced by the rate limiter, retrying 429/5xx responses
+
+        Args:
+            method: HTTP method
+            url: Absolute request URL
+            **kwargs: Passed through to httpx; a json= body is encoded once and reused on retries
+
+        Returns:
+            The successful response
+
+        Raises:
+            httpx.HTTPError: On failure once retries are exhausted
+            DeadlineExceeded: If the request's deadline passes first
+            CircuitOpenError: If Datadog's circuit breaker is open
+        """
+        if "json" in kwargs:
+            kwargs["content"], body_headers = self._encode_json_body(kwargs.pop("json"))
+            if body_headers:
+                kwargs["headers"] = {**(kwargs.get("headers") or {}), **body_headers}
+        family = endpoint_family(httpx.URL(url).path)
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            wait = self.rate_limiter.reserve(family)
+            if wait > 0:
+                resilience.ensure_time_for(wait, f"{family} rate-limit wait")
+                await asyncio.sleep(wait)
+            timeout = resilience.timeout_for(self.timeout, f"{method} {family}")
+            if timeout < self.timeout:
+                kwargs["timeout"] = httpx.Timeout(timeout, connect=min(self.connect_timeout, timeout))
+            self.circuit_breaker.before_call()
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except httpx.TimeoutException as e:
+                if timeout < self.timeout:
+                    self.circuit_breaker.release()
+                    raise DeadlineExceeded(f"Deadline exceeded during {method} {family}") from e
+                self.circuit_breaker.record_failure()
+                raise
+            except httpx.TransportError:
+                self.circuit_breaker.record_failure()
+                raise
+            except BaseException:
+                self.circuit_breaker.release()
+                raise
+            self._record_upstream_status(response.status_code)
+            self.rate_limiter.update(family, response.headers)
+            delay = self.rate_limiter.next_retry_delay(method, attempt, response.status_code,
+                                                       response.headers, started)
+            if delay is None or not self._retry_fits_deadline(delay):
+                break
+            await asyncio.sleep(delay)
+            attempt += 1
+        # httpx treats 3xx as errors; a 304 answers a revalidation and is handled by the caller
+        if response.status_code != 304:
+            response.raise_for_status()
+        return response
+
+    def get_rate_limit_status(self) -> Dict[str, Any]:
+        """Current rate-limit budget per endpoint family"""
+        return self.rate_limiter.status()
+
+    def _error_result(self, action: str, e: httpx.HTTPError) -> Dict[str, Any]:
+        """Convert an httpx error into the error dict returned by DatadogClient"""
+        logger.error(f"Failed to {action}: {str(e)}")
+        response = getattr(e, 'response', None) if isinstance(e, httpx.HTTPStatusError) else None
+        if response is None:
+            return {"error": str(e), "status_code": None}
+        try:
+            error_details = response.json()
+            logger.error(f"API Error Details: {error_details}")
+            return {"error": error_details, "status_code": response.status_code}
+        except json.JSONDecodeError:
+            logger.error(f"Response content: {response.text}")
+            return {"error": response.text, "status_code": response.status_code}
+
+    async def _json_call(self, method: str, url: str, action: str, **kwargs) -> Dict[str, Any]:
+        try:
+            response = await self._request(method, url, **kwargs)
+            return response.json()
+        except httpx.HTTPError as e:
+            return self._error_result(action, e)
+
+    async def _cached_get(self, cache_key: Tuple[str, str], url: str, action: str) -> Dict[str, Any]:
+        """GET a single resource through the response cache, revalidating stale entries"""
+        entry, fresh = self.response_cache.lookup(cache_key)
+        generation = self.response_cache.generation(cache_key)
+        if fresh:
+            return json.loads(entry.body)
+        try:
+            response = await self._request("GET", url, headers=self.response_cache.conditional_headers(entry))
+            return self.response_cache.resolve(cache_key, entry, response, generation)
+        except httpx.HTTPError as e:
+            return self._error_result(action, e)
+
+    async def _delete_call(self, url: str, action: str) -> Dict[str, Any]:
+        try:
+            response = await self._request("DELETE", url)
+            return {"success": True, "status_code": response.status_code}
+        except httpx.HTTPError as e:
+            return self._error_result(action, e)
+
+    # Notebook Methods
+    async def create_notebook(self, notebook_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Create a notebook in Datadog
+
+        Args:
+            notebook_data: The notebook JSON structure
+
+        Returns:
+            Response from Datadog API
+        """
+        clean_data = self._clean_notebook_data_for_creation(notebook_data)
+        result = await self._json_call("POST", f"{self.base_url}/api/v1/notebooks", "create notebook", json=clean_data)
+        if "error" not in result:
+            notebook_id = result.get('data', {}).get('id')
+            logger.info(f"Successfully created notebook: {notebook_id or 'Unknown ID'}")
+            if notebook_id is not None:
+                self.applied_hashes.record("notebook", notebook_id, canonical_hash(clean_data))
+        return result
+
+    async def get_notebook(self, notebook_id: str) -> Dict[str, Any]:
+        """
+        Get a notebook by ID, served from the response cache while fresh
+
+        Args:
+            notebook_id: The notebook ID
+
+        Returns:
+            Notebook data or error information
+        """
+        return await self._cached_get(("notebook", str(notebook_id)), f"{self.base_url}/api/v1/notebooks/{notebook_id}",
+                                      f"get notebook {notebook_id}")
+
+    async def list_notebooks(self, author_handle: Optional[str] = None, exclude_author_handle: Optional[str] = None,
+                             start: int = 0, count: int = 5, sort_field: str = "modified",
+                             sort_dir: str = "desc") -> Dict[str, Any]:
+        """
+        List notebooks
+
+        Args:
+            author_handle: Filter by author handle
+            exclude_author_handle: Exclude notebooks by author handle
+            start: Starting index
+            count: Number of notebooks to return
+            sort_field: Field to sort by
+            sort_dir: Sort direction (asc/desc)
+
+        Returns:
+            List of notebooks or error information
+        """
+        params = {
+            "start": start,
+            "count": count,
+            "sort_field": sort_field,
+            "sort_dir": sort_dir
+        }
+        if author_handle:
+            params["author_handle"] = author_handle
+        if exclude_author_handle:
+            params["exclude_author_handle"] = exclude_author_handle
+
+        return await self._json_call("GET", f"{self.base_url}/api/v1/notebooks", "list notebooks", params=params)
+
+    async def update_notebook(self, notebook_id: str, notebook_data: Dict[str, Any], force: bool = False) -> Dict[str, Any]:
+        """
+        Update a notebook, skipping the request if the payload matches the last one applied
+
+        Args:
+            notebook_id: The notebook ID
+            notebook_data: The updated notebook data
+            force: Send the update even if the payload is unchanged
+
+        Returns:
+            Updated notebook data, {"skipped": True, ...} for an unchanged payload, or error information
+        """
+        clean_data = self._clean_notebook_data_for_creation(notebook_data)
+        digest, skipped = self._skip_unchanged("notebook", notebook_id, clean_data, force)
+        if skipped:
+            return skipped
+        try:
+            result = await self._json_call("PUT", f"{self.base_url}/api/v1/notebooks/{notebook_id}",
+                                           f"update notebook {notebook_id}", json=clean_data)
+            if "error" in result:
+                self.applied_hashes.forget("notebook", notebook_id)
+            else:
+                self.applied_hashes.record("notebook", notebook_id, digest)
+            return result
+        finally:
+            self.response_cache.invalidate(("notebook", str(notebook_id)))
+
+    async def delete_notebook(self, notebook_id: str) -> Dict[str, Any]:
+        """
+        Delete a notebook
+
+        Args:
+            notebook_id: The notebook ID
+
+        Returns:
+            Success status or error information
+        """
+        try:
+            return await self._delete_call(f"{self.base_url}/api/v1/notebooks/{notebook_id}",
+                                           f"delete notebook {notebook_id}")
+        finally:
+            self.response_cache.invalidate(("notebook", str(notebook_id)))
+            self.applied_hashes.forget("notebook", notebook_id)
+
+    async def test_connection(self) -> Dict[str, Any]:
+        """
+        Test the connection to Datadog API
+
+        Returns:
+            Connection status
+        """
+        try:
+            result = await self.list_notebooks(count=1)
+            if "error" not in result:
+                return {"status": "connected", "message": "Successfully connected to Datadog API"}
+            return {"status": "error", "message": f"Connection failed: {result['error']}"}
+        except Exception as e:
+            return {"status": "error", "message": f"Connection test failed: {str(e)}"}
+
+    # Dashboard Methods
+    async def create_dashboard(self, dashboard_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Create a dashboard in Datadog
+
+        Args:
+            dashboard_data: The dashboard JSON structure
+
+        Returns:
+            Response from Datadog API
+        """
+        validation_result = self.validate_dashboard_structure(dashboard_data)
+        if not validation_result.get("valid", False):
+            logger.error(f"Dashboard validation failed: {validation_result.get('errors', [])}")
+            return {
+                "error": "Dashboard validation failed",
+                "validation_errors": validation_result.get("errors", []),
+                "status_code": 400
+            }
+
+        clean_data = self._clean_dashboard_data_for_creation(dashboard_data)
+        logger.info(f"Creating dashboard with title: {clean_data.get('title', 'Untitled')}")
+
+        result = await self._json_call("POST", f"{self.base_url}/api/v1/dashboard", "create dashboard", json=clean_data)
+        if "error" not in result:
+            logger.info(f"Successfully created dashboard with ID: {result.get('id', 'Unknown ID')}")
+            if "id" in result:
+                self.applied_hashes.record("dashboard", result["id"], canonical_hash(clean_data))
+        return result
+
+    async def get_dashboard(self, dashboard_id: str) -> Dict[str, Any]:
+        """
+        Get a dashboard by ID, served from the response cache while fresh
+
+        Args:
+            dashboard_id: The dashboard ID
+
+        Returns:
+            Dashboard data or error information
+        """
+        return await self._cached_get(("dashboard", str(dashboard_id)), f"{self.base_url}/api/v1/dashboard/{dashboard_id}",
+                                      f"get dashboard {dashboard_id}")
+
+    async def list_dashboards(self, count: int = 10, start: int = 0,
+                              sort_field: str = "modified_at", sort_dir: str = "desc") -> Dict[str, Any]:
+        """
+        List dashboards
+
+        Args:
+            count: Number of dashboards to return (max 100)
+            start: Starting index for pagination
+            sort_field: Field to sort by
+            sort_dir: Sort direction (asc/desc)
+
+        Returns:
+            List of dashboards or error information
+        """
+        params = {
+            "count": min(count, 100),  # API limit
+            "start": start,
+            "sort_field": sort_field,
+            "sort_dir": sort_dir
+        }
+        return await self._json_call("GET", f"{self.base_url}/api/v1/dashboard", "list dashboards", params=params)
+
+    async def update_dashboard(self, dashboard_id: str, dashboard_data: Dict[str, Any], force: bool = False) -> Dict[str, Any]:
+        """
+        Update a dashboard, skipping the request if the payload matches the last one applied
+
+        Args:
+            dashboard_id: The dashboard ID
+            dashboard_data: The updated dashboard data
+            force: Send the update even if the payload is unchanged
+
+        Returns:
+            Updated dashboard data, {"skipped": True, ...} for an unchanged payload, or error information
+        """
+        clean_data = self._clean_dashboard_data_for_creation(dashboard_data)
+        digest, skipped = self._skip_unchanged("dashboard", dashboard_id, clean_data, force)
+        if skipped:
+            return skipped
+        try:
+            result = await self._json_call("PUT", f"{self.base_url}/api/v1/dashboard/{dashboard_id}",
+                                           f"update dashboard {dashboard_id}", json=clean_data)
+            if "error" in result:
+                self.applied_hashes.forget("dashboard", dashboard_id)
+            else:
+                self.applied_hashes.record("dashboard", dashboard_id, digest)
+            return result
+        finally:
+            self.response_cache.invalidate(("dashboard", str(dashboard_id)))
+
+    async def delete_dashboard(self, dashboard_id: str) -> Dict[str, Any]:
+        """
+        Delete a dashboard
+
+        Args:
+            dashboard_id: The dashboard ID
+
+        Returns:
+            Success status or error information
+        """
+        try:
+            return await self._delete_call(f"{self.base_url}/api/v1/dashboard/{dashboard_id}",
+                                           f"delete dashboard {dashboard_id}")
+        finally:
+            self.response_cache.invalidate(("dashboard", str(dashboard_id)))
+            self.applied_hashes.forget("dashboard", dashboard_id)
+
+    # Pagination Methods
+    async def _iter_pages(self, list_page: Callable[[int, int], Awaitable[Dict[str, Any]]], items_key: str,
+                          page_size: int, prefetch: bool) -> AsyncIterator[Dict[str, Any]]:
+        """Async counterpart of DatadogClient._iter_pages, prefetching with a task"""
+        pending = None
+        start = 0
+        try:
+            result = await list_page(start, page_size)
+            while True:
+                items = self._page_items(result, items_key)
+                start += len(items)
+                has_more = len(items) >= page_size
+                if has_more and prefetch:
+                    pending = asyncio.ensure_future(list_page(start, page_size))
+
+                for item in items:
+                    yield item
+
+                if not has_more:
+                    return
+                result = await pending if pending else await list_page(start, page_size)
+                pending = None
+        finally:
+            if pending is not None and not pending.done():
+                pending.cancel()
+
+    def iter_notebooks(self, page_size: int = 100, prefetch: bool = True,
+                       **filters) -> AsyncIterator[Dict[str, Any]]:
+        """Iterate over every notebook, see DatadogClient.iter_notebooks"""
+        return self._iter_pages(lambda start, count: self.list_notebooks(start=start, count=count, **filters),
+                                "data", page_size, prefetch)
+
+    def iter_dashboards(self, page_size: int = 100, prefetch: bool = True,
+                        **filters) -> AsyncIterator[Dict[str, Any]]:
+        """Iterate over every dashboard, see DatadogClient.iter_dashboards"""
+        return self._iter_pages(lambda start, count: self.list_dashboards(count=count, start=start, **filters),
+                                "dashboards", min(page_size, 100), prefetch)
+
+    # Bulk Methods
+    async def create_prepared(self, prepared: PreparedPayload) -> Dict[str, Any]:
+        """
+        Create a notebook or dashboard from a payload prepared with prepare_payload
+
+        The body is sent as already serialized, so deploying one definition to
+        many orgs cleans and encodes it only once.
+
+        Args:
+            prepared: The prepared payload
+
+        Returns:
+            Response from Datadog API
+        """
+        content, headers = prepared.encoded(self.gzip_threshold, self.gzip_level)
+        result = await self._json_call("POST", f"{self.base_url}{CREATE_PATHS[prepared.kind]}",
+                                       f"create {prepared.kind}", content=content, headers=headers)
+        if "error" not in result:
+            # Notebooks nest the new ID under 'data', dashboards return it top-level
+            data = result.get("data")
+            created_id = data.get("id") if isinstance(data, dict) else result.get("id")
+            if created_id is not None:
+                self.applied_hashes.record(prepared.kind, created_id, prepared.content_hash)
+        return result
+
+    async def _run_bulk(self, operation: Callable[..., Awaitable[Dict[str, Any]]],
+                        calls: List[Tuple[Optional[str], tuple]],
+                        max_concurrency: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Run one client operation per item with at most max_concurrency in flight
+
+        Args:
+            operation: Async client method to call for each item
+            calls: (item ID or None, positional args) per item
+            max_concurrency: Maximum items in flight (defaults to bulk_concurrency)
+
+        Returns:
+            Summary with per-item results in input order
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency or self.bulk_concurrency))
+
+        async def run_one(index: int, item_id: Optional[str], args: tuple) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    result = await operation(*args)
+                except Exception as e:
+                    logger.error(f"Bulk item {index} failed: {str(e)}")
+                    result = {"error": str(e), "status_code": None}
+            return self._bulk_item_result(index, result, item_id)
+
+        results = await asyncio.gather(*(run_one(index, item_id, args)
+                                         for index, (item_id, args) in enumerate(calls)))
+        summary = self._bulk_summary(list(results))
+        self.applied_hashes.flush()
+        logger.info(f"Bulk {operation.__name__}: {summary['applied']} applied, {summary['skipped']} skipped, "
+                    f"{summary['failed']} failed")
+        return summary
+
+    async def bulk_create_notebooks(self, notebooks: List[Dict[str, Any]],
+                                    max_concurrency: Optional[int] = None) -> Dict[str, Any]:
+        """Create many notebooks concurrently, see DatadogClient.bulk_create_notebooks"""
+        return await self._run_bulk(self.create_notebook, [(None, (notebook,)) for notebook in notebooks],
+                                    max_concurrency)
+
+    async def bulk_update_notebooks(self, updates: List[Tuple[str, Dict[str, Any]]],
+                                    max_concurrency: Optional[int] = None, force: bool = False) -> Dict[str, Any]:
+        """Update many notebooks concurrently, see DatadogClient.bulk_update_notebooks"""
+        return await self._run_bulk(self.update_notebook,
+                                    [(str(notebook_id), (notebook_id, data, force)) for notebook_id, data in updates],
+                                    max_concurrency)
+
+    async def bulk_delete_notebooks(self, notebook_ids: List[str],
+                                    max_concurrency: Optional[int] = None) -> Dict[str, Any]:
+        """Delete many notebooks concurrently, see DatadogClient.bulk_delete_notebooks"""
+        return await self._run_bulk(self.delete_notebook,
+                                    [(str(notebook_id), (notebook_id,)) for notebook_id in notebook_ids],
+                                    max_concurrency)
+
+    async def bulk_create_dashboards(self, dashboards: List[Dict[str, Any]],
+                                     max_concurrency: Optional[int] = None) -> Dict[str, Any]:
+        """Create many dashboards concurrently, see DatadogClient.bulk_create_dashboards"""
+        return await self._run_bulk(self.create_dashboard, [(None, (dashboard,)) for dashboard in dashboards],
+                                    max_concurrency)
+
+    async def bulk_update_dashboards(self, updates: List[Tuple[str, Dict[str, Any]]],
+                                     max_concurrency: Optional[int] = None, force: bool = False) -> Dict[str, Any]:
+        """Update many dashboards concurrently, see DatadogClient.bulk_update_dashboards"""
+        return await self._run_bulk(self.update_dashboard,
+                                    [(str(dashboard_id), (dashboard_id, data, force)) for dashboard_id, data in updates],
+                                    max_concurrency)
+
+    async def bulk_delete_dashboards(self, dashboard_ids: List[str],
+                                     max_concurrency: Optional[int] = None) -> Dict[str, Any]:
+        """Delete many dashboards concurrently, see DatadogClient.bulk_delete_dashboards"""
+        return await self._run_bulk(self.delete_dashboard,
+                                    [(str(dashboard_id), (dashboard_id,)) for dashboard_id in dashboard_ids],
+                                    max_concurrency)
+
+    # Metrics Methods
+    async def get_metrics_metadata(self, metric_name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get metrics metadata from Datadog
+
+        Args:
+            metric_name: Optional specific metric name to get metadata for
+
+        Returns:
+            Metrics metadata or error information
+        """
+        params = {"filter": metric_name} if metric_name else {}
+        return await self._json_call("GET", f"{self.base_url}/api/v1/metrics", "get metrics metadata", params=params)
+
+    async def get_active_metrics(self, from_timestamp: Optional[int] = None,
+                                 host: Optional[str] = None, tag_filter: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get list of actively reporting metrics using Datadog API v2
+
+        Args:
+            from_timestamp: Start timestamp for active metrics
+            host: Filter by host
+            tag_filter: Filter by tags
+
+        Returns:
+            List of active metrics or error information
+        """
+        params = {}
+        if from_timestamp:
+            params["from"] = from_timestamp
+        if host:
+            params["host"] = host
+        if tag_filter:
+            params["filter"] = tag_filter
+        return await self._json_call("GET", f"{self.base_url}/api/v2/metrics", "get active metrics", params=params)
+
+    async def query_metrics(self, query: str, from_timestamp: int, to_timestamp: int) -> Dict[str, Any]:
+        """
+        Query metrics data
+
+        Args:
+            query: Metric query string
+            from_timestamp: Start timestamp
+            to_timestamp: End timestamp
+
+        Returns:
+            Query results or error information
+        """
+        if self.timeseries_cache is not None:
+            return await self._query_metrics_cached(query, from_timestamp, to_timestamp)
+        params = {
+            "query": query,
+            "from": from_timestamp,
+            "to": to_timestamp
+        }
+        return await self._json_call("GET", f"{self.base_url}/api/v1/query", "query metrics", params=params)
+
+    async def _query_chunk(self, query: str, from_timestamp: int, to_timestamp: int) -> Tuple[Dict[str, Any], List[Any]]:
+        """Fetch one range of a metric query and decode its pointlists into arrays"""
+        params = {"query": query, "from": from_timestamp, "to": to_timestamp}
+        response = await self._request("GET", f"{self.base_url}/api/v1/query", params=params)
+        decoded, arrays = metric_series.parse_pointlists(response.content)
+        if decoded.get("status") == "error":
+            raise DatadogAPIError(decoded.get("error", "Query failed"), response.status_code)
+        return decoded, arrays
+
+    async def _query_metrics_cached(self, query: str, from_timestamp: int, to_timestamp: int) -> Dict[str, Any]:
+        """query_metrics through the timeseries cache, fetching the missing edges concurrently"""
+        plan = self.timeseries_cache.plan(query, from_timestamp, to_timestamp)
+        try:
+            fetched = await asyncio.gather(*(self._query_chunk(plan.fetch_query, start, end)
+                                             for start, end in plan.missing))
+        except DatadogAPIError as e:
+            logger.error(f"Failed to query metrics: {str(e)}")
+            return {"error": e.error, "status_code": e.status_code}
+        except httpx.HTTPError as e:
+            return self._error_result("query metrics", e)
+        except ValueError as e:
+            logger.error(f"Failed to query metrics: {str(e)}")
+            return {"error": str(e), "status_code": None}
+        return self.timeseries_cache.complete(plan, list(fetched))
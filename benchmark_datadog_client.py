@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark for DatadogClient
+Times inventory streaming, bulk deployment and chunked metric queries against the fake Datadog server
+"""
+
+import argparse
+import logging
+import time
+
+from datadog_client import DatadogClient
+from fake_datadog_server import FakeDatadogServer
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:>36}: {(time.perf_counter() - start) * 1000:8.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--notebooks", type=int, default=2000, help="Seeded notebooks to stream")
+    parser.add_argument("--dashboards", type=int, default=200, help="Dashboards to bulk create")
+    parser.add_argument("--latency", type=float, default=0.02, help="Fake server latency per request (seconds)")
+    parser.add_argument("--rate-limit", type=int, default=None, help="Fake server requests per 10s window")
+    parser.add_argument("--concurrency", type=int, default=8, help="Bulk/query concurrency")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    with FakeDatadogServer(notebooks=args.notebooks, dashboards=0, latency=args.latency,
+                           rate_limit=args.rate_limit) as server:
+        client = DatadogClient("bench", "bench", server.url, bulk_concurrency=args.concurrency)
+        print(f"Fake Datadog at {server.url}, {args.latency * 1000:.0f} ms latency")
+
+        notebooks = timed(f"iter_notebooks ({args.notebooks})", lambda: sum(1 for _ in client.iter_notebooks()))
+        assert notebooks == args.notebooks
+
+        dashboards = [{"title": f"Bench {i}", "layout_type": "ordered", "widgets": [
+            {"definition": {"type": "note", "content": f"Dashboard {i}"}}]} for i in range(args.dashboards)]
+        summary = timed(f"bulk_create_dashboards ({args.dashboards})",
+                        lambda: client.bulk_create_dashboards(dashboards))
+        assert summary["failed"] == 0
+
+        now = int(time.time())
+        queries = [f"avg:{metric}{{*}} by {{host}}" for metric in server.state.metrics[:10]]
+        results = timed("query_metrics_batch (10 x 7 days)",
+                        lambda: client.query_metrics_batch(queries, now - 7 * 86400, now))
+        points = sum(len(series) for result in results.values() for series in result.series)
+        print(f"{'':>36}  {points} points")
+
+        print(f"Requests served: {sum(server.state.stats()['requests'].values())}, "
+              f"throttled: {client.get_rate_limit_status()['retries']} retries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Benchmark for MetricAnalysisService.analyze_metrics
+Times coverage analysis of a large suggestion list where every metric is missing
+"""
+
+import argparse
+import logging
+import statistics
+import time
+
+from datadog_client import DatadogClient
+from metric_analysis_service import MetricAnalysisService
+
+PREFIXES = [
+    "aws.ec2", "aws.s3", "azure.vm", "system.cpu", "system.mem", "nginx.net",
+    "mysql.performance", "redis.info", "postgresql", "custom.app"
+]
+
+
+def build_suggestions(count: int):
+    """Build `count` distinct suggested metrics spread over several integrations"""
+    return [
+        {"metric_name": f"{PREFIXES[i % len(PREFIXES)]}.bench_metric_{i}", "type": "gauge"}
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--metrics", type=int, default=10000, help="Number of missing metrics to analyze")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of timed runs")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    client = DatadogClient("bench", "bench", "http://127.0.0.1:9")
+    # Empty inventory so every suggested metric is reported as missing
+    client.get_active_metrics = lambda *a, **k: {"data": []}
+    service = MetricAnalysisService(client)
+    suggestions = build_suggestions(args.metrics)
+
+    service.analyze_metrics(suggestions)  # warm-up
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        analysis = service.analyze_metrics(suggestions)
+        timings.append(time.perf_counter() - start)
+
+    print(f"analyze_metrics: {len(analysis.missing_metrics)} missing metrics, "
+          f"median {statistics.median(timings) * 1000:.1f} ms, best {min(timings) * 1000:.1f} ms "
+          f"over {args.repeat} runs")
+
+
+if __name__ == "__main__":
+    main()
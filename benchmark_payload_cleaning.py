@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark for notebook/dashboard payload cleaning
+Times _clean_dashboard_data_for_creation on the dashboard examples scaled up to many widgets
+"""
+
+import argparse
+import copy
+import glob
+import json
+import logging
+import statistics
+import time
+
+from datadog_client import DatadogClient
+
+EXAMPLES_GLOB = "dashboard examples/*.json"
+
+
+def legacy_clean_dashboard(dashboard_data):
+    """Previous implementation: full JSON round-trip copy plus an unconditional debug dump"""
+    clean_data = json.loads(json.dumps(dashboard_data))
+    for field in ["id", "created_at", "modified_at", "author_handle", "url", "is_read_only"]:
+        clean_data.pop(field, None)
+    for widget in clean_data.get("widgets", []):
+        widget.pop("id", None)
+        if "definition" in widget:
+            widget["definition"].pop("id", None)
+    for var in clean_data.get("template_variables", []):
+        var.pop("id", None)
+        if "available_values" not in var and "default" in var:
+            var["available_values"] = ["*"]
+    json.dumps(clean_data, indent=2)  # f-string argument of logger.debug, built even when debug is off
+    return clean_data
+
+
+def scale_dashboard(dashboard, widget_count):
+    """Repeat a dashboard's widgets (with API-assigned IDs) up to widget_count"""
+    scaled = copy.deepcopy(dashboard)
+    template = dashboard["widgets"]
+    scaled["widgets"] = []
+    for i in range(widget_count):
+        widget = copy.deepcopy(template[i % len(template)])
+        widget["id"] = 1000 + i
+        widget.setdefault("definition", {})["id"] = 5000 + i
+        scaled["widgets"].append(widget)
+    scaled.update(id="abc-def-ghi", url="/dashboard/abc-def-ghi", modified_at="2024-01-01T00:00:00Z")
+    return scaled
+
+
+def time_call(func, payloads, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for payload in payloads:
+            func(payload)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--widgets", type=int, default=500, help="Widgets per scaled dashboard")
+    parser.add_argument("--repeat", type=int, default=20, help="Number of timed runs")
+    args = parser.parse_args()
+
+    logging.getLogger("datadog_client").setLevel(logging.INFO)
+
+    examples = []
+    for path in sorted(glob.glob(EXAMPLES_GLOB)):
+        with open(path) as f:
+            examples.append(json.load(f))
+    payloads = [scale_dashboard(example, args.widgets) for example in examples]
+    payload_bytes = sum(len(json.dumps(p)) for p in payloads)
+
+    client = DatadogClient("bench", "bench", "http://127.0.0.1:9")
+    assert all(client._clean_dashboard_data_for_creation(p) == legacy_clean_dashboard(p) for p in payloads)
+
+    print(f"{len(payloads)} dashboards x {args.widgets} widgets ({payload_bytes / 1024:.0f} KiB total), "
+          f"{args.repeat} runs")
+    for name, func in (("legacy (deep copy + debug dump)", legacy_clean_dashboard),
+                       ("copy-on-write", client._clean_dashboard_data_for_creation)):
+        timings = time_call(func, payloads, args.repeat)
+        print(f"{name:>32}: median {statistics.median(timings) * 1000:.2f} ms, "
+              f"best {min(timings) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
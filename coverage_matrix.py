@@ -0,0 +1,152 @@
+"""
+Coverage Matrix Engine
+Computes integration coverage for many customers at once using NumPy matrices
+"""
+
+import csv
+import io
+import logging
+from dataclasses import dataclass
+from typing import Dict, Any, List, Iterable, Mapping
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CoverageMatrix:
+    """Fraction of each integration's metrics reported by each customer"""
+    customers: List[str]
+    integrations: List[str]
+    values: np.ndarray  # shape (len(customers), len(integrations)), floats in [0, 1]
+    integration_metric_counts: List[int]
+    reported_metric_counts: np.ndarray  # shape (len(customers), len(integrations)), ints
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the matrix into a JSON-serializable dictionary
+
+        Returns:
+            Dictionary with row/column labels and the coverage rows
+        """
+        return {
+            "customers": self.customers,
+            "integrations": self.integrations,
+            "integration_metric_counts": dict(zip(self.integrations, self.integration_metric_counts)),
+            "coverage": {
+                customer: {
+                    integration: round(float(value), 4)
+                    for integration, value in zip(self.integrations, row)
+                }
+                for customer, row in zip(self.customers, self.values)
+            },
+            "reported_metrics": {
+                customer: dict(zip(self.integrations, row.tolist()))
+                for customer, row in zip(self.customers, self.reported_metric_counts)
+            }
+        }
+
+    def to_csv(self) -> str:
+        """
+        Render the matrix as CSV with one row per customer and one column per integration
+
+        Returns:
+            CSV text
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["customer_id"] + self.integrations)
+        for customer, row in zip(self.customers, self.values):
+            writer.writerow([customer] + [f"{value:.4f}" for value in row])
+        return buffer.getvalue()
+
+
+class CoverageMatrixEngine:
+    """
+    Encodes integrations and customers as boolean matrices over a shared metric-ID
+    space so the full customer x integration coverage comes from one matrix product
+    """
+
+    def __init__(self, integration_metrics: Mapping[str, Iterable[str]]):
+        """
+        Build the integration x metric matrix
+
+        Args:
+            integration_metrics: Mapping of integration name to the metric names it provides
+        """
+        self.integrations: List[str] = []
+        self.metric_index: Dict[str, int] = {}
+
+        rows = []
+        for integration, metrics in integration_metrics.items():
+            ids = [self.metric_index.setdefault(name, len(self.metric_index)) for name in dict.fromkeys(metrics)]
+            if not ids:
+                continue
+            self.integrations.append(integration)
+            rows.append(ids)
+
+        self.integration_matrix = np.zeros((len(rows), len(self.metric_index)), dtype=np.float32)
+        for row, ids in enumerate(rows):
+            self.integration_matrix[row, ids] = 1.0
+        self.integration_metric_counts = self.integration_matrix.sum(axis=1).astype(np.int64)
+
+        logger.info(f"Coverage matrix engine built for {len(self.integrations)} integrations "
+                    f"over {len(self.metric_index)} metrics")
+
+    @classmethod
+    def from_integration_patterns(cls, patterns: Mapping[str, Dict[str, Any]]) -> "CoverageMatrixEngine":
+        """
+        Build an engine from MetricAnalysisService integration patterns
+
+        Args:
+            patterns: Patterns loaded from the metrics CSV files
+
+        Returns:
+            CoverageMatrixEngine covering every integration that lists its metrics
+        """
+        return cls({name: info.get("metrics", []) for name, info in patterns.items()})
+
+    def encode_customers(self, inventories: Mapping[str, Iterable[str]]) -> np.ndarray:
+        """
+        Encode customer inventories as a customer x metric matrix
+
+        Metrics outside the shared metric-ID space are ignored.
+
+        Args:
+            inventories: Mapping of customer ID to reported metric names
+
+        Returns:
+            Float32 matrix with 1.0 where a customer reports a metric
+        """
+        matrix = np.zeros((len(inventories), len(self.metric_index)), dtype=np.float32)
+        lookup = self.metric_index.get
+        for row, metrics in enumerate(inventories.values()):
+            ids = np.fromiter((i for i in map(lookup, metrics) if i is not None), dtype=np.int64)
+            matrix[row, ids] = 1.0
+        return matrix
+
+    def compute(self, inventories: Mapping[str, Iterable[str]]) -> CoverageMatrix:
+        """
+        Compute the coverage matrix for a set of customers
+
+        Args:
+            inventories: Mapping of customer ID to reported metric names
+
+        Returns:
+            CoverageMatrix for every customer and integration
+        """
+        customers = list(inventories.keys())
+        customer_matrix = self.encode_customers(inventories)
+
+        # (customers x metrics) @ (metrics x integrations) -> reported metrics per integration
+        reported = (customer_matrix @ self.integration_matrix.T).astype(np.int64)
+        values = reported / np.maximum(self.integration_metric_counts, 1)
+
+        return CoverageMatrix(
+            customers=customers,
+            integrations=list(self.integrations),
+            values=values,
+            integration_metric_counts=self.integration_metric_counts.tolist(),
+            reported_metric_counts=reported
+        )
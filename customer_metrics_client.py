@@ -0,0 +1,248 @@
+"""
+Customer Metrics Client
+Async, connection-pooled client for the custom customer metrics endpoint
+"""
+
+import asyncio
+import codecs
+import json
+import logging
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = " \t\n\r"
+
+
+class StreamingMetricListDecoder:
+    """
+    Incrementally decodes a customer metrics response body
+
+    Supports the same formats as the synchronous fetch: a bare JSON array,
+    or an object with a 'metrics' or 'data' array. Array items are decoded one
+    at a time as bytes arrive, so the full body text is never held in memory.
+    """
+
+    _TARGET_KEYS = ("metrics", "data")
+
+    def __init__(self):
+        self._json = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._state = "start"
+        self._key: Optional[str] = None
+        self._items: Optional[List[Any]] = None
+        self._arrays: Dict[Optional[str], List[Any]] = {}
+        self._scalar = False
+
+    def feed(self, chunk: bytes) -> None:
+        """Feed the next chunk of the response body"""
+        self._buffer += self._text.decode(chunk)
+        self._parse(final=False)
+        # Drop consumed text so memory stays proportional to one item
+        self._buffer = self._buffer[self._pos:]
+        self._pos = 0
+
+    def close(self) -> List[Any]:
+        """
+        Finish decoding and return the metric list
+
+        Returns:
+            List of metric names (empty if the body had an unexpected format)
+
+        Raises:
+            ValueError: If the body is not valid JSON
+        """
+        self._buffer += self._text.decode(b"", final=True)
+        self._parse(final=True)
+        if self._state == "scalar":
+            json.loads(self._buffer[self._pos:])
+            self._state = "done"
+        if self._state != "done":
+            raise ValueError("Incomplete JSON document in customer metrics response")
+
+        if None in self._arrays:
+            return self._arrays[None]
+        for key in self._TARGET_KEYS:
+            if key in self._arrays:
+                return self._arrays[key]
+
+        logger.warning("Unexpected response format from custom endpoint")
+        return []
+
+    def _skip_whitespace(self) -> Optional[str]:
+        buffer = self._buffer
+        pos = self._pos
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+        self._pos = pos
+        return buffer[pos] if pos < len(buffer) else None
+
+    def _decode_value(self, final: bool):
+        """Decode one complete JSON value at the cursor, or return (False, None) if more data is needed"""
+        try:
+            value, end = self._json.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            return False, None
+        # A number running to the end of the buffer may still be truncated
+        if end == len(self._buffer) and not final:
+            return False, None
+        self._pos = end
+        return True, value
+
+    def _expect(self, char: Optional[str], allowed: str) -> None:
+        if char not in allowed:
+            raise ValueError(f"Unexpected character {char!r} in customer metrics response")
+        self._pos += 1
+
+    def _parse(self, final: bool) -> None:
+        while self._state not in ("done", "scalar"):
+            char = self._skip_whitespace()
+            if char is None:
+                return
+
+            state = self._state
+            if state == "start":
+                if char == "[":
+                    self._pos += 1
+                    self._begin_array(None)
+                elif char == "{":
+                    self._pos += 1
+                    self._state = "object_key"
+                else:
+                    self._state = "scalar"
+            elif state == "object_key":
+                if char == "}":
+                    self._pos += 1
+                    self._state = "done"
+                    continue
+                complete, key = self._decode_value(final)
+                if not complete:
+                    return
+                self._key = key
+                self._state = "object_colon"
+            elif state == "object_colon":
+                self._expect(char, ":")
+                self._state = "object_value"
+            elif state == "object_value":
+                if char == "[" and self._key in self._TARGET_KEYS:
+                    self._pos += 1
+                    self._begin_array(self._key)
+                    continue
+                complete, _ = self._decode_value(final)
+                if not complete:
+                    return
+                self._state = "object_next"
+            elif state == "object_next":
+                self._expect(char, ",}")
+                self._state = "object_key" if char == "," else "done"
+            elif state == "array_item":
+                if char == "]":
+                    self._pos += 1
+                    self._end_array()
+                    continue
+                complete, item = self._decode_value(final)
+                if not complete:
+                    return
+                self._items.append(item)
+                self._state = "array_next"
+            elif state == "array_next":
+                self._expect(char, ",]")
+                if char == ",":
+                    self._state = "array_item"
+                else:
+                    self._end_array()
+
+    def _begin_array(self, key: Optional[str]) -> None:
+        self._items = []
+        self._arrays[key] = self._items
+        self._state = "array_item"
+
+    def _end_array(self) -> None:
+        self._state = "done" if self._key is None else "object_next"
+
+
+class AsyncCustomerMetricsClient:
+    """Keep-alive, connection-pooled async client for CUSTOMER_METRICS_ENDPOINT"""
+
+    def __init__(self, endpoint_template: str, connect_timeout: float = 5.0, read_timeout: float = 30.0,
+                 max_connections: int = 50, max_connections_per_host: int = 10,
+                 keepalive_expiry: float = 30.0, headers: Optional[Dict[str, str]] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        """
+        Initialize the client
+
+        Args:
+            endpoint_template: Endpoint URL containing a '{customer_id}' placeholder
+            connect_timeout: Seconds allowed to establish a connection
+            read_timeout: Seconds allowed between received chunks of the response
+            max_connections: Maximum connections across all hosts
+            max_connections_per_host: Maximum concurrent requests to any single host
+            keepalive_expiry: Seconds an idle pooled connection is kept open
+            headers: Optional extra headers sent with every request
+            transport: Optional httpx transport replacing the pooled network one, e.g. a cassette replay
+        """
+        self.endpoint_template = endpoint_template
+        self.max_connections_per_host = max_connections_per_host
+        self._client = httpx.AsyncClient(
+            transport=transport,
+            timeout=httpx.Timeout(connect=connect_timeout, read=read_timeout,
+                                  write=read_timeout, pool=connect_timeout),
+            limits=self.pool_limits(max_connections, keepalive_expiry),
+            headers={"Accept": "application/json", **(headers or {})}
+        )
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    @staticmethod
+    def pool_limits(max_connections: int = 50, keepalive_expiry: float = 30.0) -> httpx.Limits:
+        """Connection pool limits for the given settings, e.g. to build a replacement transport with"""
+        return httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections,
+                            keepalive_expiry=keepalive_expiry)
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_connections_per_host)
+            self._host_semaphores[host] = semaphore
+        return semaphore
+
+    async def fetch_metrics(self, customer_id: str) -> List[Any]:
+        """
+        Fetch a customer's metric names, decoding the body as it streams in
+
+        Args:
+            customer_id: Customer ID substituted into the endpoint template
+
+        Returns:
+            List of metric names
+
+        Raises:
+            httpx.HTTPError: On connection, timeout or HTTP status errors
+            ValueError: If the response body is not valid JSON
+        """
+        url = self.endpoint_template.replace('{customer_id}', customer_id)
+
+        async with self._host_semaphore(url):
+            async with self._client.stream("GET", url) as response:
+                response.raise_for_status()
+                decoder = StreamingMetricListDecoder()
+                async for chunk in response.aiter_bytes():
+                    decoder.feed(chunk)
+                return decoder.close()
+
+    async def aclose(self) -> None:
+        """Close all pooled connections"""
+        await self._client.aclose()
+
+    async def __aenter__(self) -> "AsyncCustomerMetricsClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
@@ -8,16 +8,25 @@ import logging
 from typing import Dict, Any, Optional, List
 from openai import OpenAI
 from metrics_loader import MetricsLoader
+import resilience
+from resilience import CircuitBreaker
 
 logger = logging.getLogger(__name__)
 
 
 class DashboardGenerator:
-    def __init__(self, openai_api_key: str):
+    def __init__(self, openai_api_key: str, timeout: float = 60.0, circuit_breaker: Optional[CircuitBreaker] = None):
         """
         Initialize the dashboard generator with OpenAI API key
+
+        Args:
+            openai_api_key: OpenAI API key
+            timeout: Seconds an LLM call may take, further capped by the request deadline
+            circuit_breaker: Breaker that fails fast while the LLM is degraded, shareable with NotebookGenerator
         """
         self.client = OpenAI(api_key=openai_api_key)
+        self.timeout = timeout
+        self.circuit_breaker = circuit_breaker or CircuitBreaker("openai")
         self.metrics_loader = MetricsLoader()
         self.available_metrics = {metric.name: metric for metric in self.metrics_loader.all_metrics}
         
@@ -39,7 +48,8 @@ class DashboardGenerator:
             prompt = self._build_dashboard_prompt(description, advanced_settings)
             
             # Call OpenAI API
-            response = self.client.chat.completions.create(
+            response = resilience.chat_completion(
+                self.circuit_breaker, self.client, self.timeout,
                 model="gpt-4",
                 messages=[
                     {"role": "system", "content": "You are a Datadog metric expert designed to help users understand and utilize available metrics in the Datadog ecosystem. You can interpret and explain metadata from various cloud services like Amazon EC2, S3, SQS, VPC, and Azure Functions, as well as on-premises systems. Your role includes clarifying metric definitions, recommending appropriate metrics for monitoring specific use cases, and providing insights into metric usage patterns and configurations. You support comparisons across services and guide users in leveraging metrics effectively for observability and alerting purposes. When provided with metadata files, you parse them to give detailed, accurate breakdowns and suggestions. You are also an expert in creating Datadog dashboards. Generate comprehensive dashboard JSON configurations that follow Datadog's dashboard API structure."},
@@ -4,19 +4,350 @@ Handles communication with Datadog API for notebook operations
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+import contextvars
+import gzip
 import json
-from typing import Dict, Any, Optional, List
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, List, Callable, Tuple, Iterator
+from urllib.parse import urlsplit
 import logging
+import integration_registry
+import metric_series
+import schema_validation
+from rate_limiter import RateLimiter, endpoint_family
+from response_cache import ResponseCache
+from applied_hashes import AppliedHashStore, canonical_hash
+import timeseries_cache
+from timeseries_cache import TimeseriesCache
+import resilience
+from resilience import CircuitBreaker, DeadlineExceeded
 
 logger = logging.getLogger(__name__)
 
+# Fields set by the API that must not be sent on create/update
+NOTEBOOK_READ_ONLY_FIELDS = frozenset({"id", "created", "modified", "deleted", "author"})
+DASHBOARD_READ_ONLY_FIELDS = frozenset({
+    "id",
+    "created_at",
+    "modified_at",
+    "author_handle",
+    "url",
+    "is_read_only"  # Deprecated as of 2023
+})
+# Create endpoint of each resource kind
+CREATE_PATHS = {"notebook": "/api/v1/notebooks", "dashboard": "/api/v1/dashboard"}
 
-class DatadogClient:
-    def __init__(self, api_key: str, app_key: str, base_url: str = "https://api.datadoghq.com"):
+
+def _without(obj: Any, key: str) -> Any:
+    """Return obj minus key, copying the dict only if the key is present"""
+    if isinstance(obj, dict) and key in obj:
+        return {k: v for k, v in obj.items() if k != key}
+    return obj
+
+
+@dataclass
+class PreparedPayload:
+    """
+    A create payload cleaned and serialized once, to be sent unchanged to many orgs
+
+    The gzip form is compressed on first use and shared by every client
+    using the same compression level.
+    """
+    kind: str
+    body: bytes
+    content_hash: str
+    _compressed: Dict[int, bytes] = field(default_factory=dict, repr=False)
+
+    def encoded(self, gzip_threshold: Optional[int], gzip_level: int) -> Tuple[bytes, Dict[str, str]]:
+        """
+        Request body for a client's gzip settings
+
+        Returns:
+            (body bytes, extra request headers)
+        """
+        if gzip_threshold is None or len(self.body) < gzip_threshold:
+            return self.body, {}
+        if gzip_level not in self._compressed:
+            self._compressed[gzip_level] = gzip.compress(self.body, compresslevel=gzip_level, mtime=0)
+        return self._compressed[gzip_level], {"Content-Encoding": "gzip"}
+
+
+def prepare_payload(kind: str, definition: Dict[str, Any]) -> PreparedPayload:
+    """
+    Clean and serialize a notebook or dashboard for creation, once for any number of orgs
+
+    Args:
+        kind: 'notebook' or 'dashboard'
+        definition: The notebook or dashboard JSON structure
+
+    Returns:
+        The prepared payload
+    """
+    if kind == "notebook":
+        clean_data = _PAYLOADS._clean_notebook_data_for_creation(definition)
+    elif kind == "dashboard":
+        clean_data = _PAYLOADS._clean_dashboard_data_for_creation(definition)
+    else:
+        raise ValueError(f"Unknown kind: {kind}")
+    body = json.dumps(clean_data, separators=(",", ":")).encode("utf-8")
+    return PreparedPayload(kind, body, canonical_hash(clean_data))
+
+
+class DatadogAPIError(Exception):
+    """Raised by the paginating iterators, which cannot return an error dict mid-stream"""
+
+    def __init__(self, error: Any, status_code: Optional[int] = None):
+        super().__init__(f"Datadog API error ({status_code}): {error}")
+        self.error = error
+        self.status_code = status_code
+
+
+class DatadogPayloadMixin:
+    """
+    Payload cleaning, structure validation and integration lookups shared by
+    the synchronous and asynchronous Datadog clients
+    """
+
+    def _clean_notebook_data_for_creation(self, notebook_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Clean notebook data by removing read-only fields for creation
+
+        Only the containers on the path to a removed field are copied; cell
+        definitions are shared with the input, which is never modified.
+        """
+        clean_data = dict(notebook_data)
+        data = notebook_data.get("data")
+        if not isinstance(data, dict):
+            return clean_data
+        
+        # Remove id from data level and the fields set by the API from attributes
+        clean_data["data"] = clean_inner = {k: v for k, v in data.items() if k != "id"}
+        attrs = data.get("attributes")
+        if isinstance(attrs, dict):
+            clean_attrs = {k: v for k, v in attrs.items() if k not in NOTEBOOK_READ_ONLY_FIELDS}
+            # Cell IDs are generated by the API
+            cells = attrs.get("cells")
+            if isinstance(cells, list):
+                clean_attrs["cells"] = [_without(cell, "id") for cell in cells]
+            clean_inner["attributes"] = clean_attrs
+        
+        return clean_data
+
+    def validate_notebook_structure(self, notebook_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Validate notebook structure before creation
+        
+        Args:
+            notebook_data: The notebook JSON structure
+            
+        Returns:
+            Validation result, with every error prefixed by its JSON path
+        """
+        return schema_validation.validate_notebook(notebook_data)
+
+    def _clean_dashboard_data_for_creation(self, dashboard_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Clean dashboard data by removing read-only and deprecated fields for creation
+
+        Widgets and template variables are only copied when a field is removed
+        or added; everything else is shared with the input, which is never modified.
+        """
+        clean_data = {k: v for k, v in dashboard_data.items() if k not in DASHBOARD_READ_ONLY_FIELDS}
+        
+        # Clean up widgets - remove IDs at the widget and definition level
+        widgets = dashboard_data.get("widgets")
+        if isinstance(widgets, list):
+            clean_data["widgets"] = [self._clean_widget_for_creation(widget) for widget in widgets]
+        
+        # Ensure template_variables have proper structure
+        template_vars = dashboard_data.get("template_variables")
+        if isinstance(template_vars, list):
+            clean_data["template_variables"] = [self._clean_template_variable_for_creation(var)
+                                                for var in template_vars]
+        
+        return clean_data
+
+    @staticmethod
+    def _clean_widget_for_creation(widget: Any) -> Any:
+        if not isinstance(widget, dict):
+            return widget
+        definition = widget.get("definition")
+        clean_definition = _without(definition, "id")
+        if "id" not in widget and clean_definition is definition:
+            return widget
+        clean_widget = _without(widget, "id")
+        if clean_widget is widget:
+            clean_widget = dict(widget)
+        if clean_definition is not definition:
+            clean_widget["definition"] = clean_definition
+        return clean_widget
+
+    @staticmethod
+    def _clean_template_variable_for_creation(var: Any) -> Any:
+        if not isinstance(var, dict):
+            return var
+        # Ensure available_values is present for new template variable format
+        needs_values = "available_values" not in var and "default" in var
+        if "id" not in var and not needs_values:
+            return var
+        clean_var = {k: v for k, v in var.items() if k != "id"}
+        if needs_values:
+            clean_var["available_values"] = ["*"]
+        return clean_var
+
+    def validate_dashboard_structure(self, dashboard_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Validate dashboard structure before creation
+        
+        Args:
+            dashboard_data: The dashboard JSON structure
+            
+        Returns:
+            Validation result, with every error prefixed by its JSON path
+        """
+        return schema_validation.validate_dashboard(dashboard_data)
+
+    def get_integration_metrics(self, integration_name: str) -> List[str]:
+        """
+        Get list of metrics for a specific integration
+        
+        Args:
+            integration_name: Name of the integration (e.g., 'aws', 'nginx', 'mysql')
+            
+        Returns:
+            List of metric names for the integration
+        """
+        return integration_registry.get_integration_metrics(integration_name)
+
+    def get_integration_documentation(self, integration_name: str, metric_name: str = None) -> Dict[str, str]:
+        """
+        Get documentation links for setting up integrations and metrics
+        
+        Args:
+            integration_name: Name of the integration
+            metric_name: Optional specific metric name
+            
+        Returns:
+            Dictionary with documentation links and setup instructions
+        """
+        return integration_registry.get_integration_documentation(integration_name)
+
+    def _encode_json_body(self, payload: Any) -> Tuple[bytes, Dict[str, str]]:
+        """
+        Serialize a request body once, gzip-compressing it above gzip_threshold bytes
+
+        Returns:
+            (body bytes, extra request headers)
+        """
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        if self.gzip_threshold is not None and len(body) >= self.gzip_threshold:
+            compressed = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+            logger.debug(f"Compressed request body {len(body)} -> {len(compressed)} bytes")
+            return compressed, {"Content-Encoding": "gzip"}
+        return body, {}
+
+    def _record_upstream_status(self, status_code: int) -> None:
+        """Feed a response into the circuit breaker; only 5xx counts as Datadog being degraded"""
+        if status_code >= 500:
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.record_success()
+
+    @staticmethod
+    def _retry_fits_deadline(delay: float) -> bool:
+        """False if sleeping delay before a retry would outlast the request's deadline"""
+        left = resilience.remaining()
+        return left is None or delay < left
+
+    @staticmethod
+    def _page_items(result: Dict[str, Any], items_key: str) -> List[Dict[str, Any]]:
+        """Items of one list page, raising DatadogAPIError for an error result"""
+        if "error" in result:
+            raise DatadogAPIError(result["error"], result.get("status_code"))
+        return result.get(items_key) or []
+
+    def _skip_unchanged(self, kind: str, resource_id: Any, clean_data: Dict[str, Any],
+                        force: bool) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Hash a cleaned update payload and compare it with the last one applied
+
+        Returns:
+            (content hash, skipped result if the payload is unchanged and not forced, else None)
+        """
+        digest = canonical_hash(clean_data)
+        if not force and self.applied_hashes.matches(kind, resource_id, digest):
+            logger.info(f"Skipping update of {kind} {resource_id}: payload unchanged since last applied")
+            return digest, {"skipped": True, "id": str(resource_id), "content_hash": digest}
+        return digest, None
+
+    @staticmethod
+    def _bulk_item_result(index: int, result: Dict[str, Any], item_id: Optional[str] = None) -> Dict[str, Any]:
+        """Per-item outcome of a bulk operation"""
+        if "error" in result:
+            item = {"index": index, "id": item_id, "success": False,
+                    "error": result["error"], "status_code": result.get("status_code")}
+            if "validation_errors" in result:
+                item["validation_errors"] = result["validation_errors"]
+            return item
+        if item_id is None:
+            # Notebooks nest the new ID under 'data', dashboards return it top-level
+            created_id = result.get("data", {}).get("id") if isinstance(result.get("data"), dict) else result.get("id")
+            item_id = str(created_id) if created_id is not None else None
+        if result.get("skipped"):
+            return {"index": index, "id": item_id, "success": True, "skipped": True}
+        return {"index": index, "id": item_id, "success": True, "result": result}
+
+    @staticmethod
+    def _bulk_summary(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Summarise per-item bulk results, ordered by input position"""
+        results = sorted(results, key=lambda item: item["index"])
+        succeeded = sum(1 for item in results if item["success"])
+        skipped = sum(1 for item in results if item.get("skipped"))
+        return {
+            "total": len(results),
+            "succeeded": succeeded,
+            "applied": succeeded - skipped,
+            "skipped": skipped,
+            "failed": len(results) - succeeded,
+            "results": results
+        }
+
+
+_PAYLOADS = DatadogPayloadMixin()
+
+
+class DatadogClient(DatadogPayloadMixin):
+    def __init__(self, api_key: str, app_key: str, base_url: str = "https://api.datadoghq.com",
+                 rate_limiter: Optional[RateLimiter] = None, bulk_concurrency: int = 8,
+                 response_cache: Optional[ResponseCache] = None, gzip_threshold: Optional[int] = None,
+                 gzip_level: int = 6, timeseries_cache: Optional[TimeseriesCache] = None,
+                 applied_hashes: Optional[AppliedHashStore] = None, timeout: float = 30.0,
+                 connect_timeout: float = 5.0, circuit_breaker: Optional[CircuitBreaker] = None):
         self.api_key = api_key
         self.app_key = app_key
         self.base_url = base_url.rstrip('/')
+        # Request bodies of at least gzip_threshold bytes are sent gzip-encoded (None disables)
+        self.gzip_threshold = gzip_threshold
+        self.gzip_level = gzip_level
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.response_cache = response_cache if response_cache is not None else ResponseCache()
+        # Metric query results are only bucket-cached when a cache is supplied
+        self.timeseries_cache = timeseries_cache
+        # Content hash of the last payload applied per notebook/dashboard, to skip no-op updates
+        self.applied_hashes = applied_hashes if applied_hashes is not None else AppliedHashStore()
+        self.bulk_concurrency = bulk_concurrency
+        # Per-attempt timeouts, further capped by the deadline of the request being served
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.circuit_breaker = circuit_breaker or CircuitBreaker("datadog")
         self.session = requests.Session()
+        # Keep one pooled connection per bulk worker
+        adapter = HTTPAdapter(pool_maxsize=max(10, bulk_concurrency))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
         self.session.headers.update({
             'DD-API-KEY': self.api_key,
             'DD-APPLICATION-KEY': self.app_key,
@@ -24,6 +355,72 @@ class DatadogClient:
             'Accept': 'application/json'
         })
     
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request paced by the rate limiter, retrying 429/5xx responses
+
+        Args:
+            method: HTTP method
+            url: Absolute request URL
+            **kwargs: Passed through to requests; a json= body is encoded once and reused on retries
+
+        Returns:
+            The successful response
+
+        Raises:
+            requests.exceptions.RequestException: On failure once retries are exhausted
+            DeadlineExceeded: If the request's deadline passes first
+            CircuitOpenError: If Datadog's circuit breaker is open
+        """
+        if "json" in kwargs:
+            kwargs["data"], body_headers = self._encode_json_body(kwargs.pop("json"))
+            if body_headers:
+                kwargs["headers"] = {**(kwargs.get("headers") or {}), **body_headers}
+        family = endpoint_family(urlsplit(url).path)
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            wait = self.rate_limiter.reserve(family)
+            if wait > 0:
+                resilience.ensure_time_for(wait, f"{family} rate-limit wait")
+                time.sleep(wait)
+            timeout = resilience.timeout_for(self.timeout, f"{method} {family}")
+            self.circuit_breaker.before_call()
+            try:
+                response = self.session.request(method, url, timeout=(min(self.connect_timeout, timeout), timeout),
+                                                **kwargs)
+            except requests.exceptions.Timeout as e:
+                if timeout < self.timeout:
+                    self.circuit_breaker.release()
+                    raise DeadlineExceeded(f"Deadline exceeded during {method} {family}") from e
+                self.circuit_breaker.record_failure()
+                raise
+            except requests.exceptions.ConnectionError:
+                self.circuit_breaker.record_failure()
+                raise
+            except BaseException:
+                self.circuit_breaker.release()
+                raise
+            self._record_upstream_status(response.status_code)
+            self.rate_limiter.update(family, response.headers)
+            delay = self.rate_limiter.next_retry_delay(method, attempt, response.status_code,
+                                                       response.headers, started)
+            if delay is None or not self._retry_fits_deadline(delay):
+                break
+            time.sleep(delay)
+            attempt += 1
+        response.raise_for_status()
+        return response
+    
+    def get_rate_limit_status(self) -> Dict[str, Any]:
+        """
+        Get the current rate-limit budget per endpoint family
+
+        Returns:
+            Rate limiter status
+        """
+        return self.rate_limiter.status()
+    
     def create_notebook(self, notebook_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Create a notebook in Datadog
@@ -40,11 +437,13 @@ class DatadogClient:
             # Remove any read-only fields that shouldn't be in creation request
             clean_data = self._clean_notebook_data_for_creation(notebook_data)
             
-            response = self.session.post(url, json=clean_data)
-            response.raise_for_status()
+            response = self._request("POST", url, json=clean_data)
             
             result = response.json()
-            logger.info(f"Successfully created notebook: {result.get('data', {}).get('id', 'Unknown ID')}")
+            notebook_id = result.get('data', {}).get('id')
+            logger.info(f"Successfully created notebook: {notebook_id or 'Unknown ID'}")
+            if notebook_id is not None:
+                self.applied_hashes.record("notebook", notebook_id, canonical_hash(clean_data))
             return result
             
         except requests.exceptions.RequestException as e:
@@ -59,33 +458,9 @@ class DatadogClient:
                     return {"error": e.response.text, "status_code": e.response.status_code}
             return {"error": str(e), "status_code": None}
     
-    def _clean_notebook_data_for_creation(self, notebook_data: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Clean notebook data by removing read-only fields for creation
-        """
-        clean_data = json.loads(json.dumps(notebook_data))  # Deep copy
-        
-        # Remove read-only fields
-        attrs = clean_data.get("data", {}).get("attributes", {})
-        
-        # Remove fields that are set by the API
-        read_only_fields = ["id", "created", "modified", "deleted", "author"]
-        for field in read_only_fields:
-            attrs.pop(field, None)
-        
-        # Remove id from data level as well
-        clean_data.get("data", {}).pop("id", None)
-        
-        # Clean up cells - remove IDs as they're generated by API
-        cells = attrs.get("cells", [])
-        for cell in cells:
-            cell.pop("id", None)
-        
-        return clean_data
-    
     def get_notebook(self, notebook_id: str) -> Dict[str, Any]:
         """
-        Get a notebook by ID
+        Get a notebook by ID, served from the response cache while fresh
         
         Args:
             notebook_id: The notebook ID
@@ -94,11 +469,15 @@ class DatadogClient:
             Notebook data or error information
         """
         url = f"{self.base_url}/api/v1/notebooks/{notebook_id}"
+        cache_key = ("notebook", str(notebook_id))
+        entry, fresh = self.response_cache.lookup(cache_key)
+        generation = self.response_cache.generation(cache_key)
+        if fresh:
+            return json.loads(entry.body)
         
         try:
-            response = self.session.get(url)
-            response.raise_for_status()
-            return response.json()
+            response = self._request("GET", url, headers=self.response_cache.conditional_headers(entry))
+            return self.response_cache.resolve(cache_key, entry, response, generation)
             
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to get notebook {notebook_id}: {str(e)}")
@@ -136,36 +515,43 @@ class DatadogClient:
             params["exclude_author_handle"] = exclude_author_handle
         
         try:
-            response = self.session.get(url, params=params)
-            response.raise_for_status()
+            response = self._request("GET", url, params=params)
             return response.json()
             
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to list notebooks: {str(e)}")
             return {"error": str(e), "status_code": getattr(e.response, 'status_code', None)}
     
-    def update_notebook(self, notebook_id: str, notebook_data: Dict[str, Any]) -> Dict[str, Any]:
+    def update_notebook(self, notebook_id: str, notebook_data: Dict[str, Any], force: bool = False) -> Dict[str, Any]:
         """
-        Update a notebook
+        Update a notebook, skipping the request if the payload matches the last one applied
         
         Args:
             notebook_id: The notebook ID
             notebook_data: The updated notebook data
+            force: Send the update even if the payload is unchanged
             
         Returns:
-            Updated notebook data or error information
+            Updated notebook data, {"skipped": True, ...} for an unchanged payload, or error information
         """
         url = f"{self.base_url}/api/v1/notebooks/{notebook_id}"
+        clean_data = self._clean_notebook_data_for_creation(notebook_data)
+        digest, skipped = self._skip_unchanged("notebook", notebook_id, clean_data, force)
+        if skipped:
+            return skipped
         
         try:
-            clean_data = self._clean_notebook_data_for_creation(notebook_data)
-            response = self.session.put(url, json=clean_data)
-            response.raise_for_status()
+            response = self._request("PUT", url, json=clean_data)
+            self.applied_hashes.record("notebook", notebook_id, digest)
             return response.json()
             
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to update notebook {notebook_id}: {str(e)}")
+            self.applied_hashes.forget("notebook", notebook_id)
             return {"error": str(e), "status_code": getattr(e.response, 'status_code', None)}
+        finally:
+            # Drop the cached copy even on failure, the write may have been applied
+            self.response_cache.invalidate(("notebook", str(notebook_id)))
     
     def delete_notebook(self, notebook_id: str) -> Dict[str, Any]:
         """
@@ -180,13 +566,15 @@ class DatadogClient:
         url = f"{self.base_url}/api/v1/notebooks/{notebook_id}"
         
         try:
-            response = self.session.delete(url)
-            response.raise_for_status()
+            response = self._request("DELETE", url)
             return {"success": True, "status_code": response.status_code}
             
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to delete notebook {notebook_id}: {str(e)}")
             return {"error": str(e), "status_code": getattr(e.response, 'status_code', None)}
+        finally:
+            self.response_cache.invalidate(("notebook", str(notebook_id)))
+            self.applied_hashes.forget("notebook", notebook_id)
     
     def test_connection(self) -> Dict[str, Any]:
         """
@@ -206,78 +594,6 @@ class DatadogClient:
         except Exception as e:
             return {"status": "error", "message": f"Connection test failed: {str(e)}"}
     
-    def validate_notebook_structure(self, notebook_data: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Validate notebook structure before creation
-        
-        Args:
-            notebook_data: The notebook JSON structure
-            
-        Returns:
-            Validation result
-        """
-        errors = []
-        warnings = []
-        
-        try:
-            # Check top-level structure
-            if "data" not in notebook_data:
-                errors.append("Missing 'data' field in notebook structure")
-                return {"valid": False, "errors": errors, "warnings": warnings}
-            
-            data = notebook_data["data"]
-            
-            # Check data type
-            if data.get("type") != "notebooks":
-                errors.append("Data type must be 'notebooks'")
-            
-            # Check attributes
-            if "attributes" not in data:
-                errors.append("Missing 'attributes' field in data")
-                return {"valid": False, "errors": errors, "warnings": warnings}
-            
-            attrs = data["attributes"]
-            
-            # Check required fields
-            required_fields = ["name", "cells"]
-            for field in required_fields:
-                if field not in attrs:
-                    errors.append(f"Missing required field: {field}")
-            
-            # Check cells structure
-            if "cells" in attrs:
-                cells = attrs["cells"]
-                if not isinstance(cells, list):
-                    errors.append("Cells must be a list")
-                else:
-                    for i, cell in enumerate(cells):
-                        if "type" not in cell:
-                            errors.append(f"Cell {i} missing 'type' field")
-                        if "attributes" not in cell:
-                            errors.append(f"Cell {i} missing 'attributes' field")
-                        elif "definition" not in cell["attributes"]:
-                            errors.append(f"Cell {i} missing 'definition' in attributes")
-            
-            # Check optional but recommended fields
-            if "time" not in attrs:
-                warnings.append("No time range specified, will use default")
-            
-            if "metadata" not in attrs:
-                warnings.append("No metadata specified, will use defaults")
-            
-            return {
-                "valid": len(errors) == 0,
-                "errors": errors,
-                "warnings": warnings
-            }
-            
-        except Exception as e:
-            return {
-                "valid": False,
-                "errors": [f"Validation error: {str(e)}"],
-                "warnings": warnings
-            }
-
     # Dashboard Methods
     def create_dashboard(self, dashboard_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -306,14 +622,16 @@ class DatadogClient:
             clean_data = self._clean_dashboard_data_for_creation(dashboard_data)
             
             logger.info(f"Creating dashboard with title: {clean_data.get('title', 'Untitled')}")
-            logger.debug(f"Dashboard payload (cleaned): {json.dumps(clean_data, indent=2)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Dashboard payload (cleaned): {json.dumps(clean_data, indent=2)}")
             
-            response = self.session.post(url, json=clean_data)
-            response.raise_for_status()
+            response = self._request("POST", url, json=clean_data)
             
             result = response.json()
             dashboard_id = result.get('id', 'Unknown ID')
             logger.info(f"Successfully created dashboard with ID: {dashboard_id}")
+            if 'id' in result:
+                self.applied_hashes.record("dashboard", dashboard_id, canonical_hash(clean_data))
             return result
             
         except requests.exceptions.RequestException as e:
@@ -338,47 +656,9 @@ class DatadogClient:
             logger.error(f"Unexpected error creating dashboard: {str(e)}")
             return {"error": f"Unexpected error: {str(e)}", "status_code": 500}
     
-    def _clean_dashboard_data_for_creation(self, dashboard_data: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Clean dashboard data by removing read-only and deprecated fields for creation
-        """
-        clean_data = json.loads(json.dumps(dashboard_data))  # Deep copy
-        
-        # Remove read-only and deprecated fields
-        deprecated_and_readonly_fields = [
-            "id", 
-            "created_at", 
-            "modified_at", 
-            "author_handle", 
-            "url",
-            "is_read_only"  # Deprecated as of 2023
-        ]
-        
-        for field in deprecated_and_readonly_fields:
-            clean_data.pop(field, None)
-        
-        # Clean up widgets - remove IDs and other auto-generated fields
-        widgets = clean_data.get("widgets", [])
-        for widget in widgets:
-            widget.pop("id", None)
-            # Also clean definition level if it exists
-            if "definition" in widget:
-                widget["definition"].pop("id", None)
-        
-        # Ensure template_variables have proper structure
-        template_vars = clean_data.get("template_variables", [])
-        for var in template_vars:
-            # Remove any auto-generated fields from template variables
-            var.pop("id", None)
-            # Ensure available_values is present for new template variable format
-            if "available_values" not in var and "default" in var:
-                var["available_values"] = ["*"]
-        
-        return clean_data
-    
     def get_dashboard(self, dashboard_id: str) -> Dict[str, Any]:
         """
-        Get a dashboard by ID
+        Get a dashboard by ID, served from the response cache while fresh
         
         Args:
             dashboard_id: The dashboard ID
@@ -387,11 +667,15 @@ class DatadogClient:
             Dashboard data or error information
         """
         url = f"{self.base_url}/api/v1/dashboard/{dashboard_id}"
+        cache_key = ("dashboard", str(dashboard_id))
+        entry, fresh = self.response_cache.lookup(cache_key)
+        generation = self.response_cache.generation(cache_key)
+        if fresh:
+            return json.loads(entry.body)
         
         try:
-            response = self.session.get(url)
-            response.raise_for_status()
-            return response.json()
+            response = self._request("GET", url, headers=self.response_cache.conditional_headers(entry))
+            return self.response_cache.resolve(cache_key, entry, response, generation)
             
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to get dashboard {dashboard_id}: {str(e)}")
@@ -421,36 +705,42 @@ class DatadogClient:
         }
         
         try:
-            response = self.session.get(url, params=params)
-            response.raise_for_status()
+            response = self._request("GET", url, params=params)
             return response.json()
             
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to list dashboards: {str(e)}")
             return {"error": str(e), "status_code": getattr(e.response, 'status_code', None)}
     
-    def update_dashboard(self, dashboard_id: str, dashboard_data: Dict[str, Any]) -> Dict[str, Any]:
+    def update_dashboard(self, dashboard_id: str, dashboard_data: Dict[str, Any], force: bool = False) -> Dict[str, Any]:
         """
-        Update a dashboard
+        Update a dashboard, skipping the request if the payload matches the last one applied
         
         Args:
             dashboard_id: The dashboard ID
             dashboard_data: The updated dashboard data
+            force: Send the update even if the payload is unchanged
             
         Returns:
-            Updated dashboard data or error information
+            Updated dashboard data, {"skipped": True, ...} for an unchanged payload, or error information
         """
         url = f"{self.base_url}/api/v1/dashboard/{dashboard_id}"
+        clean_data = self._clean_dashboard_data_for_creation(dashboard_data)
+        digest, skipped = self._skip_unchanged("dashboard", dashboard_id, clean_data, force)
+        if skipped:
+            return skipped
         
         try:
-            clean_data = self._clean_dashboard_data_for_creation(dashboard_data)
-            response = self.session.put(url, json=clean_data)
-            response.raise_for_status()
+            response = self._request("PUT", url, json=clean_data)
+            self.applied_hashes.record("dashboard", dashboard_id, digest)
             return response.json()
             
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to update dashboard {dashboard_id}: {str(e)}")
+            self.applied_hashes.forget("dashboard", dashboard_id)
             return {"error": str(e), "status_code": getattr(e.response, 'status_code', None)}
+        finally:
+            self.response_cache.invalidate(("dashboard", str(dashboard_id)))
     
     def delete_dashboard(self, dashboard_id: str) -> Dict[str, Any]:
         """
@@ -465,111 +755,221 @@ class DatadogClient:
         url = f"{self.base_url}/api/v1/dashboard/{dashboard_id}"
         
         try:
-            response = self.session.delete(url)
-            response.raise_for_status()
+            response = self._request("DELETE", url)
             return {"success": True, "status_code": response.status_code}
             
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to delete dashboard {dashboard_id}: {str(e)}")
             return {"error": str(e), "status_code": getattr(e.response, 'status_code', None)}
+        finally:
+            self.response_cache.invalidate(("dashboard", str(dashboard_id)))
+            self.applied_hashes.forget("dashboard", dashboard_id)
     
-    def validate_dashboard_structure(self, dashboard_data: Dict[str, Any]) -> Dict[str, Any]:
+    # Pagination Methods
+    def _iter_pages(self, list_page: Callable[[int, int], Dict[str, Any]], items_key: str,
+                    page_size: int, prefetch: bool) -> Iterator[Dict[str, Any]]:
         """
-        Validate dashboard structure before creation
-        
+        Lazily walk every page of a list endpoint
+
+        With prefetch enabled the next page is requested on a background thread
+        while the caller consumes the current one. Closing the generator early
+        cancels any page that has not started yet.
+        """
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        pending = None
+        start = 0
+        try:
+            result = list_page(start, page_size)
+            while True:
+                items = self._page_items(result, items_key)
+                start += len(items)
+                has_more = len(items) >= page_size
+                if has_more and executor:
+                    # Pages run under the caller's deadline and org
+                    pending = executor.submit(contextvars.copy_context().run, list_page, start, page_size)
+
+                yield from items
+
+                if not has_more:
+                    return
+                result = pending.result() if pending else list_page(start, page_size)
+                pending = None
+        finally:
+            if pending is not None:
+                pending.cancel()
+            if executor:
+                executor.shutdown(wait=False)
+    
+    def iter_notebooks(self, page_size: int = 100, prefetch: bool = True, **filters) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over every notebook, fetching pages on demand
+
         Args:
-            dashboard_data: The dashboard JSON structure
-            
+            page_size: Notebooks per request
+            prefetch: Fetch the next page while the current one is consumed
+            **filters: author_handle, exclude_author_handle, sort_field, sort_dir
+
+        Yields:
+            Notebook objects
+
+        Raises:
+            DatadogAPIError: If a page request fails
+        """
+        return self._iter_pages(lambda start, count: self.list_notebooks(start=start, count=count, **filters),
+                                "data", page_size, prefetch)
+    
+    def iter_dashboards(self, page_size: int = 100, prefetch: bool = True, **filters) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over every dashboard, fetching pages on demand
+
+        Args:
+            page_size: Dashboards per request (max 100)
+            prefetch: Fetch the next page while the current one is consumed
+            **filters: sort_field, sort_dir
+
+        Yields:
+            Dashboard summaries
+
+        Raises:
+            DatadogAPIError: If a page request fails
+        """
+        return self._iter_pages(lambda start, count: self.list_dashboards(count=count, start=start, **filters),
+                                "dashboards", min(page_size, 100), prefetch)
+    
+    # Bulk Methods
+    def _run_bulk(self, operation: Callable[..., Dict[str, Any]], calls: List[Tuple[Optional[str], tuple]],
+                  max_concurrency: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Run one client operation per item on a bounded thread pool
+
+        Requests still go through the rate limiter, so the pool only caps how
+        many are in flight. A failing item never aborts the others.
+
+        Args:
+            operation: Client method to call for each item
+            calls: (item ID or None, positional args) per item
+            max_concurrency: Maximum items in flight (defaults to bulk_concurrency)
+
         Returns:
-            Validation result
+            Summary with per-item results in input order
         """
-        errors = []
-        warnings = []
-        
-        try:
-            # Check required fields
-            required_fields = ["title", "widgets", "layout_type"]
-            for field in required_fields:
-                if field not in dashboard_data:
-                    errors.append(f"Missing required field: {field}")
-            
-            # Check layout_type
-            layout_type = dashboard_data.get("layout_type")
-            if layout_type:
-                valid_layouts = ["ordered", "free"]
-                if layout_type not in valid_layouts:
-                    errors.append(f"Invalid layout_type. Must be one of: {', '.join(valid_layouts)}")
-            
-            # Check widgets structure
-            if "widgets" in dashboard_data:
-                widgets = dashboard_data["widgets"]
-                if not isinstance(widgets, list):
-                    errors.append("Widgets must be a list")
-                else:
-                    for i, widget in enumerate(widgets):
-                        if "definition" not in widget:
-                            errors.append(f"Widget {i} missing 'definition' field")
-                        else:
-                            widget_def = widget["definition"]
-                            
-                            # Check widget definition structure
-                            if "type" not in widget_def:
-                                errors.append(f"Widget {i} definition missing 'type' field")
-                            
-                            # Validate layout fields based on layout_type
-                            if layout_type == "ordered":
-                                if "layout" in widget:
-                                    errors.append(f"Widget {i} should not have 'layout' field for ordered layout_type")
-                            elif layout_type == "free":
-                                if "layout" not in widget:
-                                    errors.append(f"Widget {i} missing 'layout' field for free layout_type")
-                                else:
-                                    layout = widget["layout"]
-                                    required_layout_fields = ["x", "y", "width", "height"]
-                                    for field in required_layout_fields:
-                                        if field not in layout:
-                                            errors.append(f"Widget {i} layout missing '{field}' field")
-                            
-                            # Check widget requests
-                            if "requests" in widget_def:
-                                requests = widget_def["requests"]
-                                if not isinstance(requests, list):
-                                    errors.append(f"Widget {i} requests must be a list")
-                                else:
-                                    for j, request in enumerate(requests):
-                                        if "q" not in request:
-                                            errors.append(f"Widget {i} request {j} missing 'q' (query) field")
-                            
-                            # Check time configuration
-                            if "time" not in widget_def:
-                                warnings.append(f"Widget {i} missing 'time' configuration")
-            
-            # Check for deprecated fields
-            deprecated_fields = ["is_read_only", "author_handle", "created_at", "modified_at", "url"]
-            for field in deprecated_fields:
-                if field in dashboard_data:
-                    warnings.append(f"Field '{field}' is deprecated and will be removed")
-            
-            # Check optional but recommended fields
-            if "description" not in dashboard_data:
-                warnings.append("No description specified")
-            
-            if "template_variables" not in dashboard_data:
-                warnings.append("No template variables specified")
-            
-            return {
-                "valid": len(errors) == 0,
-                "errors": errors,
-                "warnings": warnings
-            }
-            
-        except Exception as e:
-            return {
-                "valid": False,
-                "errors": [f"Validation error: {str(e)}"],
-                "warnings": warnings
-            }
+        def run_one(index: int, item_id: Optional[str], args: tuple) -> Dict[str, Any]:
+            try:
+                result = operation(*args)
+            except Exception as e:
+                logger.error(f"Bulk item {index} failed: {str(e)}")
+                result = {"error": str(e), "status_code": None}
+            return self._bulk_item_result(index, result, item_id)
+
+        if not calls:
+            return self._bulk_summary([])
+
+        workers = max(1, min(max_concurrency or self.bulk_concurrency, len(calls)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # A context copy per call, since one context cannot be entered by two threads at once
+            futures = [executor.submit(contextvars.copy_context().run, run_one, index, item_id, args)
+                       for index, (item_id, args) in enumerate(calls)]
+            summary = self._bulk_summary([future.result() for future in futures])
+        self.applied_hashes.flush()
+        logger.info(f"Bulk {operation.__name__}: {summary['applied']} applied, {summary['skipped']} skipped, "
+                    f"{summary['failed']} failed")
+        return summary
+    
+    def bulk_create_notebooks(self, notebooks: List[Dict[str, Any]],
+                              max_concurrency: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Create many notebooks concurrently
+
+        Args:
+            notebooks: Notebook JSON structures
+            max_concurrency: Maximum creations in flight
+
+        Returns:
+            Summary with a per-notebook result
+        """
+        return self._run_bulk(self.create_notebook, [(None, (notebook,)) for notebook in notebooks], max_concurrency)
+    
+    def bulk_update_notebooks(self, updates: List[Tuple[str, Dict[str, Any]]],
+                              max_concurrency: Optional[int] = None, force: bool = False) -> Dict[str, Any]:
+        """
+        Update many notebooks concurrently, skipping unchanged payloads
+
+        Args:
+            updates: (notebook ID, notebook data) pairs
+            max_concurrency: Maximum updates in flight
+            force: Send every update even if its payload is unchanged
 
+        Returns:
+            Summary with applied/skipped/failed counts and a per-notebook result
+        """
+        return self._run_bulk(self.update_notebook,
+                              [(str(notebook_id), (notebook_id, data, force)) for notebook_id, data in updates],
+                              max_concurrency)
+    
+    def bulk_delete_notebooks(self, notebook_ids: List[str],
+                              max_concurrency: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Delete many notebooks concurrently
+
+        Args:
+            notebook_ids: Notebook IDs
+            max_concurrency: Maximum deletions in flight
+
+        Returns:
+            Summary with a per-notebook result
+        """
+        return self._run_bulk(self.delete_notebook,
+                              [(str(notebook_id), (notebook_id,)) for notebook_id in notebook_ids],
+                              max_concurrency)
+    
+    def bulk_create_dashboards(self, dashboards: List[Dict[str, Any]],
+                               max_concurrency: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Create many dashboards concurrently
+
+        Args:
+            dashboards: Dashboard JSON structures
+            max_concurrency: Maximum creations in flight
+
+        Returns:
+            Summary with a per-dashboard result
+        """
+        return self._run_bulk(self.create_dashboard, [(None, (dashboard,)) for dashboard in dashboards],
+                              max_concurrency)
+    
+    def bulk_update_dashboards(self, updates: List[Tuple[str, Dict[str, Any]]],
+                               max_concurrency: Optional[int] = None, force: bool = False) -> Dict[str, Any]:
+        """
+        Update many dashboards concurrently, skipping unchanged payloads
+
+        Args:
+            updates: (dashboard ID, dashboard data) pairs
+            max_concurrency: Maximum updates in flight
+            force: Send every update even if its payload is unchanged
+
+        Returns:
+            Summary with applied/skipped/failed counts and a per-dashboard result
+        """
+        return self._run_bulk(self.update_dashboard,
+                              [(str(dashboard_id), (dashboard_id, data, force)) for dashboard_id, data in updates],
+                              max_concurrency)
+    
+    def bulk_delete_dashboards(self, dashboard_ids: List[str],
+                               max_concurrency: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Delete many dashboards concurrently
+
+        Args:
+            dashboard_ids: Dashboard IDs
+            max_concurrency: Maximum deletions in flight
+
+        Returns:
+            Summary with a per-dashboard result
+        """
+        return self._run_bulk(self.delete_dashboard,
+                              [(str(dashboard_id), (dashboard_id,)) for dashboard_id in dashboard_ids],
+                              max_concurrency)
+    
     def get_metrics_metadata(self, metric_name: Optional[str] = None) -> Dict[str, Any]:
         """
         Get metrics metadata from Datadog
@@ -587,8 +987,7 @@ class DatadogClient:
             params["filter"] = metric_name
         
         try:
-            response = self.session.get(url, params=params)
-            response.raise_for_status()
+            response = self._request("GET", url, params=params)
             return response.json()
             
         except requests.exceptions.RequestException as e:
@@ -619,8 +1018,7 @@ class DatadogClient:
             params["filter"] = tag_filter
         
         try:
-            response = self.session.get(url, params=params)
-            response.raise_for_status()
+            response = self._request("GET", url, params=params)
             return response.json()
             
         except requests.exceptions.RequestException as e:
@@ -639,6 +1037,9 @@ class DatadogClient:
         Returns:
             Query results or error information
         """
+        if self.timeseries_cache is not None:
+            return self._query_metrics_cached(query, from_timestamp, to_timestamp)
+        
         url = f"{self.base_url}/api/v1/query"
         
         params = {
@@ -648,161 +1049,85 @@ class DatadogClient:
         }
         
         try:
-            response = self.session.get(url, params=params)
-            response.raise_for_status()
+            response = self._request("GET", url, params=params)
             return response.json()
             
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to query metrics: {str(e)}")
             return {"error": str(e), "status_code": getattr(e.response, 'status_code', None)}
-
-    def get_integration_metrics(self, integration_name: str) -> List[str]:
-        """
-        Get list of metrics for a specific integration
-        
-        Args:
-            integration_name: Name of the integration (e.g., 'aws', 'nginx', 'mysql')
-            
-        Returns:
-            List of metric names for the integration
+    
+    def _query_metrics_cached(self, query: str, from_timestamp: int, to_timestamp: int) -> Dict[str, Any]:
+        """query_metrics through the timeseries cache, fetching only the missing buckets"""
+        plan = self.timeseries_cache.plan(query, from_timestamp, to_timestamp)
+        try:
+            fetched = [self._query_chunk(plan.fetch_query, start, end) for start, end in plan.missing]
+        except DatadogAPIError as e:
+            logger.error(f"Failed to query metrics: {str(e)}")
+            return {"error": e.error, "status_code": e.status_code}
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.error(f"Failed to query metrics: {str(e)}")
+            return {"error": str(e), "status_code": getattr(getattr(e, "response", None), "status_code", None)}
+        return self.timeseries_cache.complete(plan, fetched)
+    
+    def _query_chunk(self, query: str, from_timestamp: int, to_timestamp: int) -> Tuple[Dict[str, Any], List[Any]]:
+        """Fetch one chunk of a metric query and decode its pointlists into arrays"""
+        params = {"query": query, "from": from_timestamp, "to": to_timestamp}
+        response = self._request("GET", f"{self.base_url}/api/v1/query", params=params)
+        decoded, arrays = metric_series.parse_pointlists(response.content)
+        if decoded.get("status") == "error":
+            raise DatadogAPIError(decoded.get("error", "Query failed"), response.status_code)
+        return decoded, arrays
+    
+    def query_metrics_batch(self, queries: List[str], from_timestamp: int, to_timestamp: int,
+                            chunk_seconds: int = 86400,
+                            max_concurrency: Optional[int] = None) -> Dict[str, metric_series.MetricQueryResult]:
         """
-        # This is a mapping of common integrations to their typical metrics
-        # In a real implementation, this could be fetched from Datadog's documentation API
-        integration_metrics = {
-            "aws": [
-                "aws.ec2.cpuutilization",
-                "aws.ec2.diskreadbytes", 
-                "aws.ec2.diskwritebytes",
-                "aws.ec2.networkin",
-                "aws.ec2.networkout",
-                "aws.rds.cpuutilization",
-                "aws.rds.database_connections",
-                "aws.elb.request_count",
-                "aws.elb.latency"
-            ],
-            "nginx": [
-                "nginx.net.connections",
-                "nginx.net.conn_opened_per_s",
-                "nginx.net.conn_dropped_per_s",
-                "nginx.net.request_per_s",
-                "nginx.net.reading",
-                "nginx.net.writing",
-                "nginx.net.waiting"
-            ],
-            "mysql": [
-                "mysql.performance.queries",
-                "mysql.performance.questions",
-                "mysql.performance.slow_queries",
-                "mysql.performance.com_select",
-                "mysql.performance.com_insert",
-                "mysql.performance.com_update",
-                "mysql.performance.com_delete",
-                "mysql.innodb.buffer_pool_utilization",
-                "mysql.innodb.current_row_locks"
-            ],
-            "redis": [
-                "redis.info.connected_clients",
-                "redis.info.used_memory",
-                "redis.info.used_memory_rss", 
-                "redis.info.mem_fragmentation_ratio",
-                "redis.net.commands_processed",
-                "redis.info.keyspace_hits",
-                "redis.info.keyspace_misses",
-                "redis.info.evicted_keys"
-            ],
-            "postgresql": [
-                "postgresql.connections",
-                "postgresql.commits",
-                "postgresql.rollbacks",
-                "postgresql.disk_read",
-                "postgresql.buffer_hit",
-                "postgresql.rows_returned",
-                "postgresql.rows_fetched",
-                "postgresql.rows_inserted",
-                "postgresql.rows_updated",
-                "postgresql.rows_deleted"
-            ]
-        }
-        
-        return integration_metrics.get(integration_name.lower(), [])
+        Query many metrics over a long window in parallel, epoch-aligned chunks
+
+        Every (query, chunk) pair is fetched concurrently within the rate limits,
+        decoded straight into NumPy arrays and stitched back into one series per
+        query expression/scope.
 
-    def get_integration_documentation(self, integration_name: str, metric_name: str = None) -> Dict[str, str]:
-        """
-        Get documentation links for setting up integrations and metrics
-        
         Args:
-            integration_name: Name of the integration
-            metric_name: Optional specific metric name
-            
+            queries: Metric query strings
+            from_timestamp: Start timestamp (epoch seconds)
+            to_timestamp: End timestamp (epoch seconds)
+            chunk_seconds: Length of each chunk request (default one day)
+            max_concurrency: Maximum chunk requests in flight (defaults to bulk_concurrency)
+
         Returns:
-            Dictionary with documentation links and setup instructions
+            MetricQueryResult per query, in input order; a failed chunk sets the query's error
         """
-        base_docs_url = "https://docs.datadoghq.com/integrations"
-        
-        # Documentation mapping for common integrations
-        integration_docs = {
-            "aws": {
-                "setup_url": f"{base_docs_url}/amazon_web_services/",
-                "metrics_url": f"{base_docs_url}/amazon_ec2/#metrics",
-                "description": "Set up AWS integration to monitor EC2, RDS, ELB and other AWS services",
-                "setup_steps": [
-                    "Configure AWS IAM role with required permissions",
-                    "Add AWS account to Datadog AWS integration",
-                    "Enable specific AWS services you want to monitor"
-                ]
-            },
-            "nginx": {
-                "setup_url": f"{base_docs_url}/nginx/",
-                "metrics_url": f"{base_docs_url}/nginx/#metrics",
-                "description": "Configure Nginx integration to monitor web server performance",
-                "setup_steps": [
-                    "Enable nginx status module",
-                    "Configure nginx.conf with status endpoint", 
-                    "Install and configure Datadog agent",
-                    "Update nginx.yaml configuration file"
-                ]
-            },
-            "mysql": {
-                "setup_url": f"{base_docs_url}/mysql/",
-                "metrics_url": f"{base_docs_url}/mysql/#metrics",
-                "description": "Set up MySQL integration for database monitoring",
-                "setup_steps": [
-                    "Create MySQL user for Datadog agent",
-                    "Grant required permissions to the user",
-                    "Configure mysql.yaml in agent configuration",
-                    "Restart Datadog agent"
-                ]
-            },
-            "redis": {
-                "setup_url": f"{base_docs_url}/redisdb/",
-                "metrics_url": f"{base_docs_url}/redisdb/#metrics", 
-                "description": "Configure Redis integration for cache monitoring",
-                "setup_steps": [
-                    "Verify Redis INFO command access",
-                    "Configure redisdb.yaml in agent configuration",
-                    "Set up authentication if Redis requires it",
-                    "Restart Datadog agent"
-                ]
-            },
-            "postgresql": {
-                "setup_url": f"{base_docs_url}/postgres/",
-                "metrics_url": f"{base_docs_url}/postgres/#metrics",
-                "description": "Set up PostgreSQL integration for database monitoring", 
-                "setup_steps": [
-                    "Create PostgreSQL user for Datadog agent",
-                    "Grant required permissions and access to pg_stat_* views",
-                    "Configure postgres.yaml in agent configuration",
-                    "Restart Datadog agent"
-                ]
-            }
-        }
-        
-        return integration_docs.get(integration_name.lower(), {
-            "setup_url": f"{base_docs_url}/{integration_name.lower()}/",
-            "description": f"Set up {integration_name} integration",
-            "setup_steps": [
-                "Check Datadog documentation for specific setup instructions",
-                "Configure integration in Datadog agent",
-                "Restart agent after configuration"
-            ]
-        }) 
\ No newline at end of file
+        chunks = metric_series.align_chunks(from_timestamp, to_timestamp, chunk_seconds)
+        queries = list(dict.fromkeys(queries))
+        results = {query: metric_series.MetricQueryResult(query=query) for query in queries}
+        if not queries:
+            return results
+
+        # Pinned over the whole window, or a short trailing chunk comes back at a finer rollup
+        fetch_queries = {}
+        for query in queries:
+            pinned = timeseries_cache.pin_rollup(query, to_timestamp - from_timestamp)
+            fetch_queries[query] = pinned[0] if pinned else query
+
+        parts: Dict[str, List[Any]] = {query: [] for query in queries}
+        workers = max(1, min(max_concurrency or self.bulk_concurrency, len(queries) * len(chunks)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(contextvars.copy_context().run, self._query_chunk,
+                                       fetch_queries[query], start, end): query
+                       for query in queries for start, end in chunks}
+            for future, query in futures.items():
+                try:
+                    parts[query].append(future.result())
+                except DatadogAPIError as e:
+                    logger.error(f"Failed to query metrics for {query}: {str(e)}")
+                    results[query].error, results[query].status_code = e.error, e.status_code
+                except (requests.exceptions.RequestException, ValueError) as e:
+                    logger.error(f"Failed to query metrics for {query}: {str(e)}")
+                    results[query].error = str(e)
+                    results[query].status_code = getattr(getattr(e, "response", None), "status_code", None)
+
+        for query, result in results.items():
+            if result.error is None:
+                result.series = metric_series.stitch_chunks(query, parts[query])
+        return results
@@ -0,0 +1,127 @@
+"""
+Definition Analyzer
+Extracts metric queries and metric names from notebook and dashboard JSON
+"""
+
+import re
+from typing import Dict, Any, List, Iterable, Iterator
+
+from metric_query import MetricQueryError, metric_queries, parse_query
+
+# Fallback for queries the parser rejects: space aggregators that prefix a metric, e.g. avg:system.cpu.user{*}
+_AGGREGATORS = r"(?:avg|sum|min|max|count|p\d{1,2}(?:\.\d+)?)"
+_SCOPE_RE = re.compile(r"\{[^}]*\}")
+_METRIC_RE = re.compile(
+    rf"(?<![\w.]){_AGGREGATORS}\s*:\s*([A-Za-z_][\w.]*?)(?=\{{|\.[a-z_]+\(|[\s),+\-*/]|$)"
+)
+
+
+def detect_definition_type(definition: Dict[str, Any]) -> str:
+    """
+    Detect whether a JSON definition is a notebook or a dashboard
+
+    Args:
+        definition: Notebook or dashboard JSON
+
+    Returns:
+        'notebook', 'dashboard' or 'unknown'
+    """
+    data = definition.get("data")
+    if isinstance(data, dict) and isinstance(data.get("attributes"), dict) and "cells" in data["attributes"]:
+        return "notebook"
+    if "widgets" in definition:
+        return "dashboard"
+    return "unknown"
+
+
+def _iter_request_queries(requests: Any) -> Iterator[str]:
+    """Yield metric query strings from a widget/cell 'requests' value"""
+    if isinstance(requests, dict):
+        # Some widgets (e.g. hostmap) key their requests by role
+        requests = list(requests.values())
+    if not isinstance(requests, list):
+        return
+
+    for request in requests:
+        if not isinstance(request, dict):
+            continue
+        query = request.get("q")
+        if isinstance(query, str):
+            yield query
+        # Formula-style requests keep their metric queries under 'queries'
+        for formula_query in request.get("queries") or []:
+            if isinstance(formula_query, dict) and formula_query.get("data_source", "metrics") == "metrics":
+                query = formula_query.get("query")
+                if isinstance(query, str):
+                    yield query
+
+
+def _iter_widget_queries(widgets: Iterable[Any]) -> Iterator[str]:
+    for widget in widgets or []:
+        definition = widget.get("definition") if isinstance(widget, dict) else None
+        if not isinstance(definition, dict):
+            continue
+        yield from _iter_request_queries(definition.get("requests"))
+        # Group widgets nest their children
+        if "widgets" in definition:
+            yield from _iter_widget_queries(definition["widgets"])
+
+
+def extract_queries(definition: Dict[str, Any]) -> List[str]:
+    """
+    Extract every metric query string from a notebook or dashboard
+
+    Args:
+        definition: Notebook JSON (data.attributes.cells) or dashboard JSON (widgets)
+
+    Returns:
+        List of query strings in document order
+    """
+    kind = detect_definition_type(definition)
+    if kind == "notebook":
+        queries = []
+        for cell in definition["data"]["attributes"].get("cells") or []:
+            cell_definition = (cell.get("attributes") or {}).get("definition") if isinstance(cell, dict) else None
+            if isinstance(cell_definition, dict):
+                queries.extend(_iter_request_queries(cell_definition.get("requests")))
+        return queries
+    if kind == "dashboard":
+        return list(_iter_widget_queries(definition.get("widgets")))
+    return []
+
+
+def extract_metric_names_from_query(query: str) -> List[str]:
+    """
+    Extract metric names from a single Datadog metric query
+
+    Handles wrapping functions, arithmetic between metrics and .rollup()/.fill() suffixes.
+    Malformed queries, common in LLM output, fall back to pattern matching.
+
+    Args:
+        query: Metric query, e.g. "per_second(sum:aws.elb.request_count{*}.as_count())"
+
+    Returns:
+        List of metric names in query order
+    """
+    try:
+        return [term.metric for term in metric_queries(parse_query(query))]
+    except MetricQueryError:
+        # Scope tags look like aggregator:metric pairs, so drop them before matching
+        return _METRIC_RE.findall(_SCOPE_RE.sub("{}", query))
+
+
+def extract_metric_names(definition: Dict[str, Any]) -> List[str]:
+    """
+    Extract the distinct metric names referenced by a notebook or dashboard
+
+    Args:
+        definition: Notebook or dashboard JSON
+
+    Returns:
+        Deduplicated metric names in first-seen order
+    """
+    names = {}
+    for query in extract_queries(definition):
+        for name in extract_metric_names_from_query(query):
+            names.setdefault(name, None)
+    return list(names)
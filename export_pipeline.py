@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Export Pipeline
+Streams every notebook and dashboard into a gzip-compressed NDJSON archive, resumable from a cursor file
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Sequence, Set
+
+from async_datadog_client import AsyncDatadogClient
+from datadog_client import DatadogAPIError
+
+logger = logging.getLogger(__name__)
+
+EXPORT_KINDS = ("notebook", "dashboard")
+
+
+class ExportCursor:
+    """
+    Progress of an export, saved atomically after every completed listing page
+
+    For each kind the cursor holds the listing offset exported so far and the IDs
+    already written (or recorded as failed), and for the archive the byte size at
+    that point. A resumed export truncates the archive back to that size, dropping
+    any partly written page, continues from the offsets and skips those IDs.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offsets: Dict[str, int] = {}
+        self.done_ids: Dict[str, Set[str]] = {}
+        self.archive_bytes = 0
+        self.exported = 0
+        self.failed: List[Dict[str, Any]] = []
+        self.complete = False
+        if os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            self.offsets = state.get("offsets", {})
+            self.done_ids = {kind: set(ids) for kind, ids in state.get("done_ids", {}).items()}
+            self.archive_bytes = state.get("archive_bytes", 0)
+            self.exported = state.get("exported", 0)
+            self.failed = state.get("failed", [])
+            self.complete = state.get("complete", False)
+
+    def save(self) -> None:
+        state = {"offsets": self.offsets, "done_ids": {kind: sorted(ids) for kind, ids in self.done_ids.items()},
+                 "archive_bytes": self.archive_bytes, "exported": self.exported,
+                 "failed": self.failed, "complete": self.complete, "updated_at": time.time()}
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(state, f)
+        os.replace(temp_path, self.path)
+
+
+class ExportPipeline:
+    """
+    Pages the notebook and dashboard listings and fetches each body with bounded parallelism
+
+    Bodies are written to the archive as they arrive, one JSON line per item:
+    {"type": "notebook", "id": ..., "body": <get response>}. Memory use is bounded
+    by the page size, whatever the size of the org. Each listing page is written
+    as its own gzip member, so the archive is a valid .gz file at every checkpoint
+    and reads back with gzip.open as a single stream.
+    """
+
+    def __init__(self, client: AsyncDatadogClient, archive_path: str, cursor_path: Optional[str] = None,
+                 kinds: Sequence[str] = EXPORT_KINDS, page_size: int = 100, max_concurrency: Optional[int] = None):
+        """
+        Initialize the pipeline
+
+        Args:
+            client: Async Datadog client to export from
+            archive_path: Output .ndjson.gz file
+            cursor_path: Progress file (defaults to <archive_path>.cursor.json)
+            kinds: Resource kinds to export, any of 'notebook' and 'dashboard'
+            page_size: Listing page size, also the unit of checkpointing
+            max_concurrency: Bodies fetched concurrently (defaults to the client's bulk_concurrency)
+        """
+        unknown = set(kinds) - set(EXPORT_KINDS)
+        if unknown:
+            raise ValueError(f"Unknown export kinds: {sorted(unknown)}")
+        self.client = client
+        self.archive_path = archive_path
+        self.cursor_path = cursor_path or f"{archive_path}.cursor.json"
+        self.kinds = list(kinds)
+        self.page_size = min(page_size, 100) if "dashboard" in self.kinds else page_size
+        self.max_concurrency = max(1, max_concurrency or client.bulk_concurrency)
+
+    def _listing(self, kind: str) -> Callable[[int], Awaitable[Dict[str, Any]]]:
+        if kind == "notebook":
+            # Oldest first, so notebooks created during the export land after the cursor
+            return lambda start: self.client.list_notebooks(start=start, count=self.page_size,
+                                                            sort_field="created", sort_dir="asc")
+        return lambda start: self.client.list_dashboards(count=self.page_size, start=start)
+
+    def _fetch(self, kind: str) -> Callable[[str], Awaitable[Dict[str, Any]]]:
+        return self.client.get_notebook if kind == "notebook" else self.client.get_dashboard
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Export everything not yet covered by the cursor
+
+        Returns:
+            Summary with exported/failed counts, the IDs that failed and whether the export was resumed
+
+        Raises:
+            DatadogAPIError: If a listing page cannot be fetched; the cursor keeps the progress so far
+        """
+        cursor = ExportCursor(self.cursor_path)
+        resumed = bool(cursor.offsets) and not cursor.complete
+        if cursor.complete:
+            logger.info(f"Export to {self.archive_path} is already complete")
+            return self._summary(cursor, resumed=False, elapsed=0.0)
+        if not resumed:
+            cursor.archive_bytes = 0
+
+        started = time.monotonic()
+        with open(self.archive_path, "ab") as raw:
+            raw.truncate(cursor.archive_bytes)
+            raw.seek(cursor.archive_bytes)
+            for kind in self.kinds:
+                await self._export_kind(kind, cursor, raw)
+
+        cursor.complete = True
+        cursor.save()
+        summary = self._summary(cursor, resumed, time.monotonic() - started)
+        logger.info(f"Exported {summary['exported']} items to {self.archive_path} "
+                    f"({summary['failed']} failed) in {summary['elapsed_seconds']}s")
+        return summary
+
+    async def _export_kind(self, kind: str, cursor: ExportCursor, raw) -> None:
+        list_page = self._listing(kind)
+        items_key = "data" if kind == "notebook" else "dashboards"
+        # Dashboards are only listed most recently modified first, so an edit between runs shifts
+        # every offset; their listing restarts and the IDs already done are skipped instead
+        start = cursor.offsets.get(kind, 0) if kind == "notebook" else 0
+        pending = asyncio.ensure_future(list_page(start))
+        try:
+            while True:
+                items = self.client._page_items(await pending, items_key)
+                pending = None
+                has_more = len(items) >= self.page_size
+                if has_more:
+                    # Page through the listing while this page's bodies are fetched
+                    pending = asyncio.ensure_future(list_page(start + len(items)))
+
+                await self._export_page(kind, items, cursor, raw)
+                start += len(items)
+                cursor.offsets[kind] = start
+                cursor.archive_bytes = raw.tell()
+                cursor.save()
+                logger.debug(f"Export checkpoint: {kind} offset {start}, {cursor.archive_bytes} bytes")
+
+                if not has_more:
+                    return
+        finally:
+            if pending is not None and not pending.done():
+                pending.cancel()
+
+    async def _export_page(self, kind: str, items: List[Dict[str, Any]], cursor: ExportCursor, raw) -> None:
+        """Fetch one page of bodies concurrently and write them as one gzip member"""
+        fetch = self._fetch(kind)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        done = cursor.done_ids.setdefault(kind, set())
+        # Edits during the export can also list an item twice
+        item_ids = list(dict.fromkeys(str(item["id"]) for item in items if str(item["id"]) not in done))
+
+        async def fetch_one(item_id: str):
+            async with semaphore:
+                try:
+                    return item_id, await fetch(item_id)
+                except Exception as e:
+                    return item_id, {"error": str(e), "status_code": None}
+
+        with gzip.GzipFile(fileobj=raw, mode="wb") as member:
+            for future in asyncio.as_completed([fetch_one(item_id) for item_id in item_ids]):
+                item_id, body = await future
+                done.add(item_id)
+                if "error" in body and body.get("status_code") == 404:
+                    logger.info(f"Skipping {kind} {item_id}, deleted since it was listed")
+                    continue
+                if "error" in body:
+                    logger.warning(f"Failed to export {kind} {item_id}: {body['error']}")
+                    cursor.failed.append({"type": kind, "id": item_id, "error": body["error"],
+                                          "status_code": body.get("status_code")})
+                    continue
+                member.write((json.dumps({"type": kind, "id": item_id, "body": body}) + "\n").encode("utf-8"))
+                cursor.exported += 1
+        raw.flush()
+        os.fsync(raw.fileno())
+
+    def _summary(self, cursor: ExportCursor, resumed: bool, elapsed: float) -> Dict[str, Any]:
+        return {
+            "archive": self.archive_path,
+            "exported": cursor.exported,
+            "failed": len(cursor.failed),
+            "failures": cursor.failed,
+            "offsets": dict(cursor.offsets),
+            "archive_bytes": cursor.archive_bytes,
+            "resumed": resumed,
+            "elapsed_seconds": round(elapsed, 3),
+        }
+
+
+def read_archive(path: str):
+    """Iterate over the items of an export archive"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+async def _export(args) -> Dict[str, Any]:
+    async with AsyncDatadogClient(args.api_key, args.app_key, args.base_url,
+                                  bulk_concurrency=args.concurrency) as client:
+        pipeline = ExportPipeline(client, args.archive, args.cursor, kinds=args.kinds,
+                                  page_size=args.page_size)
+        return await pipeline.run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Back up every Datadog notebook and dashboard to NDJSON.gz")
+    parser.add_argument("archive", help="Output archive, e.g. backup-2024-01-01.ndjson.gz")
+    parser.add_argument("--cursor", default=None, help="Progress file (default: <archive>.cursor.json)")
+    parser.add_argument("--kinds", nargs="+", default=list(EXPORT_KINDS), choices=EXPORT_KINDS)
+    parser.add_argument("--page-size", type=int, default=100, help="Listing page size / checkpoint interval")
+    parser.add_argument("--concurrency", type=int, default=8, help="Bodies fetched concurrently")
+    parser.add_argument("--base-url", default=os.getenv("DATADOG_BASE_URL", "https://api.datadoghq.com"))
+    parser.add_argument("--api-key", default=os.getenv("DATADOG_API_KEY", ""))
+    parser.add_argument("--app-key", default=os.getenv("DATADOG_APP_KEY", ""))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        summary = asyncio.run(_export(args))
+    except DatadogAPIError as e:
+        logger.error(f"Export stopped, rerun to resume: {str(e)}")
+        raise SystemExit(1)
+    print(json.dumps({k: v for k, v in summary.items() if k != "failures"}))
+    raise SystemExit(1 if summary["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,502 @@
+#!/usr/bin/env python3
+"""
+Fake Datadog Server
+Local stand-in for the Datadog notebook, dashboard, metrics and query APIs, for tests and load tests
+
+In-process:
+    with FakeDatadogServer(notebooks=500, latency=0.01) as server:
+        client = DatadogClient("fake", "fake", server.url)
+
+Standalone:
+    python fake_datadog_server.py --port 8126 --notebooks 5000 --rate-limit 100
+    DATADOG_BASE_URL=http://127.0.0.1:8126 python main.py
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+from rate_limiter import endpoint_family
+from timeseries_cache import rollup_interval
+
+logger = logging.getLogger(__name__)
+
+SEED_METRICS_FILE = "metrics_expert_example_response/response.json"
+
+_NOTEBOOK_RE = re.compile(r"^/api/v1/notebooks(?:/(\d+))?$")
+_DASHBOARD_RE = re.compile(r"^/api/v1/dashboard(?:/([\w-]+))?$")
+_ROLLUP_RE = re.compile(r"\.rollup\(\s*\w+\s*,\s*(\d+)\s*\)")
+_QUERY_RE = re.compile(r"^(\w+):([\w.]+)\{([^{}]*)\}(?:\s*by\s*\{([^{}]*)\})?")
+
+
+@dataclass
+class FakeDatadogConfig:
+    """Behaviour of the fake server"""
+    latency: float = 0.0
+    latency_jitter: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 503
+    rate_limit: Optional[int] = None
+    rate_limit_period: int = 10
+    notebooks: int = 20
+    dashboards: int = 20
+    metrics: Optional[int] = None
+    seed: int = 0
+    metrics_file: str = SEED_METRICS_FILE
+
+
+def load_seed_metrics(path: str = SEED_METRICS_FILE) -> List[str]:
+    """Metric names from a saved /api/v2/metrics response"""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not load seed metrics from {path}: {str(e)}")
+        return ["system.cpu.user", "system.cpu.system", "system.mem.used", "system.load.1"]
+    return [item["id"] for item in data.get("data", []) if item.get("id")]
+
+
+def _timestamp(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _dashboard_id(number: int) -> str:
+    digits = f"{number:09d}"
+    return f"{digits[:3]}-{digits[3:6]}-{digits[6:]}"
+
+
+class FakeDatadogState:
+    """In-memory inventory plus rate-limit windows and request counters"""
+
+    def __init__(self, config: FakeDatadogConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.lock = threading.Lock()
+        seed_metrics = load_seed_metrics(config.metrics_file)
+        count = config.metrics or len(seed_metrics)
+        self.metrics = [seed_metrics[i % len(seed_metrics)] + (f".synthetic_{i // len(seed_metrics)}"
+                                                              if i >= len(seed_metrics) else "")
+                        for i in range(count)]
+        self.notebooks: Dict[int, Dict[str, Any]] = {}
+        self.dashboards: Dict[str, Dict[str, Any]] = {}
+        self._next_notebook = 1
+        self._next_dashboard = 1
+        created = time.time() - 86400
+        for i in range(config.notebooks):
+            self._add_notebook(self._synthetic_notebook(i), created + i)
+        for i in range(config.dashboards):
+            self._add_dashboard(self._synthetic_dashboard(i), created + i)
+        self._windows: Dict[str, Tuple[float, int]] = {}
+        self._failures: List[int] = []
+        self.requests: Dict[str, int] = {}
+        self.statuses: Dict[int, int] = {}
+
+    def _synthetic_notebook(self, index: int) -> Dict[str, Any]:
+        metric = self.metrics[index % len(self.metrics)]
+        return {"data": {"type": "notebooks", "attributes": {
+            "name": f"Synthetic notebook {index}: {metric}",
+            "time": {"live_span": "1h"},
+            "status": "published",
+            "cells": [
+                {"type": "notebook_cells", "attributes": {"definition": {
+                    "type": "markdown", "text": f"# {metric}\nGenerated by the fake Datadog server."}}},
+                {"type": "notebook_cells", "attributes": {"definition": {
+                    "type": "timeseries", "requests": [{"q": f"avg:{metric}{{*}}", "display_type": "line"}]},
+                    "graph_size": "m"}},
+            ],
+        }}}
+
+    def _synthetic_dashboard(self, index: int) -> Dict[str, Any]:
+        metrics = [self.metrics[(index + offset) % len(self.metrics)] for offset in range(4)]
+        return {
+            "title": f"Synthetic dashboard {index}",
+            "layout_type": "ordered",
+            "widgets": [{"definition": {"type": "timeseries", "title": metric,
+                                        "requests": [{"q": f"avg:{metric}{{*}} by {{host}}"}]}}
+                        for metric in metrics],
+        }
+
+    def _add_notebook(self, body: Dict[str, Any], now: float) -> Dict[str, Any]:
+        notebook_id = self._next_notebook
+        self._next_notebook += 1
+        attributes = dict((body.get("data") or {}).get("attributes") or {})
+        attributes.update(created=_timestamp(now), modified=_timestamp(now),
+                          author={"handle": "fake@example.com", "name": "Fake Datadog"})
+        notebook = {"data": {"id": notebook_id, "type": "notebooks", "attributes": attributes}}
+        self.notebooks[notebook_id] = notebook
+        return notebook
+
+    def _add_dashboard(self, body: Dict[str, Any], now: float) -> Dict[str, Any]:
+        dashboard_id = _dashboard_id(self._next_dashboard)
+        self._next_dashboard += 1
+        dashboard = dict(body, id=dashboard_id, url=f"/dashboard/{dashboard_id}",
+                         created_at=_timestamp(now), modified_at=_timestamp(now),
+                         author_handle="fake@example.com", is_read_only=False)
+        self.dashboards[dashboard_id] = dashboard
+        return dashboard
+
+    def create_notebook(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        with self.lock:
+            return self._add_notebook(body, time.time())
+
+    def create_dashboard(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        with self.lock:
+            return self._add_dashboard(body, time.time())
+
+    def fail_next(self, count: int = 1, status: int = 503) -> None:
+        """Make the next `count` requests fail with `status`"""
+        with self.lock:
+            self._failures.extend([status] * count)
+
+    def injected_failure(self) -> Optional[int]:
+        with self.lock:
+            if self._failures:
+                return self._failures.pop(0)
+            if self.config.error_rate and self.random.random() < self.config.error_rate:
+                return self.config.error_status
+        return None
+
+    def take_rate_limit(self, family: str) -> Optional[Dict[str, str]]:
+        """
+        Count a request against its family's fixed window
+
+        Returns:
+            X-RateLimit-* headers (None when rate limiting is off); Remaining is
+            negative once the window is exhausted
+        """
+        limit = self.config.rate_limit
+        if not limit:
+            return None
+        period = self.config.rate_limit_period
+        with self.lock:
+            now = time.time()
+            window_start, used = self._windows.get(family, (now, 0))
+            if now - window_start >= period:
+                window_start, used = now, 0
+            used += 1
+            self._windows[family] = (window_start, used)
+        return {
+            "X-RateLimit-Limit": str(limit),
+            "X-RateLimit-Period": str(period),
+            "X-RateLimit-Remaining": str(limit - used),
+            "X-RateLimit-Reset": str(max(1, math.ceil(window_start + period - now))),
+            "X-RateLimit-Name": family,
+        }
+
+    def record(self, route: str, status: int) -> None:
+        with self.lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Request counts per route and per status code"""
+        with self.lock:
+            return {
+                "requests": dict(self.requests),
+                "statuses": dict(self.statuses),
+                "notebooks": len(self.notebooks),
+                "dashboards": len(self.dashboards),
+                "metrics": len(self.metrics),
+            }
+
+
+def synthetic_series(query: str, from_timestamp: int, to_timestamp: int) -> Dict[str, Any]:
+    """
+    Deterministic /api/v1/query response: a sine wave per group, one point per rollup interval
+    """
+    match = _ROLLUP_RE.search(query)
+    interval = int(match.group(1)) if match else rollup_interval(to_timestamp - from_timestamp)
+    parsed = _QUERY_RE.match(query.strip())
+    if parsed is None:
+        return {"status": "error", "error": f"Error parsing query: {query}"}
+    aggregator, metric, scope, group_by = parsed.groups()
+    groups = [tag.strip() for tag in (group_by or "").split(",") if tag.strip()]
+    scopes = [",".join(f"{tag}:{tag}-{i}" for tag in groups) for i in range(3)] if groups else [scope or "*"]
+
+    first = -(-from_timestamp // interval) * interval
+    timestamps = range(first, to_timestamp + 1, interval)
+    series = []
+    for index, series_scope in enumerate(scopes):
+        phase = int(hashlib.md5(f"{metric}{series_scope}".encode()).hexdigest()[:6], 16) % 360
+        pointlist = [[t * 1000, round(50 + 40 * math.sin(math.radians(t / interval + phase)), 4)]
+                     for t in timestamps]
+        series.append({
+            "metric": metric, "display_name": metric, "unit": None, "aggr": aggregator,
+            "expression": f"{aggregator}:{metric}{{{series_scope}}}", "scope": series_scope,
+            "tag_set": series_scope.split(",") if groups else [], "interval": interval,
+            "length": len(pointlist), "pointlist": pointlist,
+            "start": pointlist[0][0] if pointlist else None, "end": pointlist[-1][0] if pointlist else None,
+        })
+    return {"status": "ok", "res_type": "time_series", "query": query,
+            "from_date": from_timestamp * 1000, "to_date": to_timestamp * 1000, "series": series}
+
+
+class FakeDatadogHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; with Nagle on, keep-alive requests stall on delayed ACKs
+    disable_nagle_algorithm = True
+    state: FakeDatadogState = None
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method: str):
+        url = urlsplit(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        body = self._read_body()
+        state = self.state
+        config = state.config
+        route = f"{method} {re.sub(r'/[0-9][0-9a-z-]*$', '/{id}', url.path)}"
+
+        if config.latency or config.latency_jitter:
+            time.sleep(config.latency + state.random.uniform(0, config.latency_jitter))
+        if not self.headers.get("DD-API-KEY") or not self.headers.get("DD-APPLICATION-KEY"):
+            return self._send(route, 403, {"errors": ["Forbidden"]})
+
+        rate_headers = state.take_rate_limit(endpoint_family(url.path))
+        if rate_headers and int(rate_headers["X-RateLimit-Remaining"]) < 0:
+            rate_headers["X-RateLimit-Remaining"] = "0"
+            return self._send(route, 429, {"errors": ["Rate limit exceeded"]}, rate_headers)
+        failure = state.injected_failure()
+        if failure:
+            return self._send(route, failure, {"errors": ["Injected failure"]}, rate_headers)
+
+        try:
+            status, payload = self._route(method, url.path, params, body)
+        except (KeyError, ValueError, TypeError) as e:
+            status, payload = 400, {"errors": [f"Bad request: {str(e)}"]}
+        self._send(route, status, payload, rate_headers)
+
+    def _read_body(self) -> Any:
+        raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if not raw:
+            return None
+        if self.headers.get("Content-Encoding") == "gzip":
+            raw = gzip.decompress(raw)
+        return json.loads(raw)
+
+    def _route(self, method: str, path: str, params: Dict[str, str], body: Any) -> Tuple[int, Any]:
+        state = self.state
+        notebook = _NOTEBOOK_RE.match(path)
+        if notebook:
+            return self._notebooks(method, notebook.group(1), params, body)
+        dashboard = _DASHBOARD_RE.match(path)
+        if dashboard:
+            return self._dashboards(method, dashboard.group(1), params, body)
+        if method == "GET" and path == "/api/v1/metrics":
+            metrics = state.metrics
+            if params.get("filter"):
+                metrics = [m for m in metrics if params["filter"] in m]
+            return 200, {"metrics": metrics, "from": params.get("from")}
+        if method == "GET" and path == "/api/v2/metrics":
+            metrics = state.metrics
+            if params.get("filter"):
+                metrics = [m for m in metrics if params["filter"] in m]
+            return 200, {"data": [{"type": "metrics", "id": m} for m in metrics]}
+        if method == "GET" and path == "/api/v1/query":
+            result = synthetic_series(params["query"], int(params["from"]), int(params["to"]))
+            return (400 if result["status"] == "error" else 200), result
+        return 404, {"errors": ["Not found"]}
+
+    def _notebooks(self, method: str, notebook_id: Optional[str], params: Dict[str, str], body: Any):
+        state = self.state
+        if notebook_id is None:
+            if method == "POST":
+                return 200, state.create_notebook(body)
+            if method != "GET":
+                return 405, {"errors": ["Method not allowed"]}
+            start, count = int(params.get("start", 0)), int(params.get("count", 100))
+            with state.lock:
+                items = list(state.notebooks.values())
+            if params.get("sort_dir", "desc") == "desc":
+                items.reverse()
+            page = [{"id": n["data"]["id"], "type": "notebooks",
+                     "attributes": {k: v for k, v in n["data"]["attributes"].items() if k != "cells"}}
+                    for n in items[start:start + count]]
+            return 200, {"data": page, "meta": {"page": {"total_count": len(items),
+                                                         "total_filtered_count": len(items)}}}
+
+        with state.lock:
+            existing = state.notebooks.get(int(notebook_id))
+            if existing is None:
+                return 404, {"errors": ["Notebook not found"]}
+            if method == "GET":
+                return 200, existing
+            if method == "DELETE":
+                del state.notebooks[int(notebook_id)]
+                return 204, None
+            if method == "PUT":
+                attributes = dict(body["data"]["attributes"])
+                attributes.update(created=existing["data"]["attributes"]["created"],
+                                  modified=_timestamp(time.time()),
+                                  author=existing["data"]["attributes"]["author"])
+                existing["data"]["attributes"] = attributes
+                return 200, existing
+        return 405, {"errors": ["Method not allowed"]}
+
+    def _dashboards(self, method: str, dashboard_id: Optional[str], params: Dict[str, str], body: Any):
+        state = self.state
+        if dashboard_id is None:
+            if method == "POST":
+                return 200, state.create_dashboard(body)
+            if method != "GET":
+                return 405, {"errors": ["Method not allowed"]}
+            start, count = int(params.get("start", 0)), min(int(params.get("count", 100)), 100)
+            with state.lock:
+                items = list(state.dashboards.values())
+            # Timestamps share one ISO format, so they sort as strings
+            items.sort(key=lambda d: d.get(params.get("sort_field", "modified_at")) or "",
+                       reverse=params.get("sort_dir", "desc") == "desc")
+            summaries = [{k: d[k] for k in ("id", "title", "url", "layout_type", "created_at",
+                                             "modified_at", "author_handle", "is_read_only")}
+                         for d in items[start:start + count]]
+            return 200, {"dashboards": summaries}
+
+        with state.lock:
+            existing = state.dashboards.get(dashboard_id)
+            if existing is None:
+                return 404, {"errors": ["Dashboard not found"]}
+            if method == "GET":
+                return 200, existing
+            if method == "DELETE":
+                del state.dashboards[dashboard_id]
+                return 200, {"deleted_dashboard_id": dashboard_id}
+            if method == "PUT":
+                updated = dict(body, id=dashboard_id, url=existing["url"], created_at=existing["created_at"],
+                               modified_at=_timestamp(time.time()), author_handle=existing["author_handle"],
+                               is_read_only=False)
+                state.dashboards[dashboard_id] = updated
+                return 200, updated
+        return 405, {"errors": ["Method not allowed"]}
+
+    def _send(self, route: str, status: int, payload: Any, headers: Optional[Dict[str, str]] = None):
+        self.state.record(route, status)
+        body = b"" if payload is None else json.dumps(payload).encode()
+        etag = f'"{hashlib.sha1(body).hexdigest()}"' if status == 200 and self.command == "GET" else None
+        if etag and self.headers.get("If-None-Match") == etag:
+            status, body = 304, b""
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if etag:
+            self.send_header("ETag", etag)
+        if body:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+class _FakeHTTPServer(ThreadingHTTPServer):
+    # The default backlog of 5 makes bursts of concurrent connections stall on SYN retries
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class FakeDatadogServer:
+    """
+    Threaded fake Datadog API server
+
+    Use as a context manager (or start()/stop()) to run it on a background
+    thread; the state attribute exposes the inventory, failure injection and
+    request counters.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, **config):
+        """
+        Initialize the server
+
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free one)
+            **config: FakeDatadogConfig fields (latency, error_rate, rate_limit, notebooks, ...)
+        """
+        self.state = FakeDatadogState(FakeDatadogConfig(**config))
+        handler = type("BoundFakeDatadogHandler", (FakeDatadogHandler,), {"state": self.state})
+        self.httpd = _FakeHTTPServer((host, port), handler)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeDatadogServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self.httpd.shutdown()
+            self._thread = None
+        self.httpd.server_close()
+
+    def __enter__(self) -> "FakeDatadogServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Datadog API server for local load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8126)
+    parser.add_argument("--latency", type=float, default=0.0, help="Added latency per request (seconds)")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="Extra random latency (seconds)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing")
+    parser.add_argument("--error-status", type=int, default=503, help="Status of injected failures")
+    parser.add_argument("--rate-limit", type=int, default=None, help="Requests per window per endpoint family")
+    parser.add_argument("--rate-limit-period", type=int, default=10, help="Rate-limit window (seconds)")
+    parser.add_argument("--notebooks", type=int, default=1000, help="Synthetic notebooks to seed")
+    parser.add_argument("--dashboards", type=int, default=1000, help="Synthetic dashboards to seed")
+    parser.add_argument("--metrics", type=int, default=None, help="Active metrics (default: seed file size)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for latency and failures")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = FakeDatadogServer(
+        args.host, args.port, latency=args.latency, latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate, error_status=args.error_status, rate_limit=args.rate_limit,
+        rate_limit_period=args.rate_limit_period, notebooks=args.notebooks, dashboards=args.dashboards,
+        metrics=args.metrics, seed=args.seed
+    )
+    stats = server.state.stats()
+    logger.info(f"Fake Datadog API on {server.url} with {stats['notebooks']} notebooks, "
+                f"{stats['dashboards']} dashboards and {stats['metrics']} metrics")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        logger.info(f"Request counts: {json.dumps(server.state.stats()['requests'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Health Probe
+Background connectivity check whose last result is served to health endpoints without a live request
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, Callable, Awaitable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class HealthProbe:
+    """
+    Runs a connectivity check on an interval and caches its outcome
+
+    Load balancers can then probe /health as often as they like without each
+    probe spending upstream rate limit. Live (deep) checks share an in-flight
+    probe rather than starting another one.
+    """
+
+    def __init__(self, check: Callable[[], Awaitable[Dict[str, Any]]], interval: float = 30.0,
+                 timeout: float = 5.0):
+        """
+        Initialize the probe
+
+        Args:
+            check: Coroutine function returning {"status": "connected" | ..., "message": ...}
+            interval: Seconds between background checks
+            timeout: Seconds a single check may take before it counts as failed
+        """
+        self.check = check
+        self.interval = interval
+        self.timeout = timeout
+        self.status = "unknown"
+        self.message: Optional[str] = None
+        self.checked_at: Optional[float] = None
+        self.latency_ms: Optional[float] = None
+        self.consecutive_failures = 0
+        self._checked_monotonic: Optional[float] = None
+        self._inflight: Optional[asyncio.Future] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def probe(self) -> Dict[str, Any]:
+        """
+        Run a live check now (or join the one in flight) and return the updated snapshot
+        """
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.ensure_future(self._run_check())
+        await asyncio.shield(self._inflight)
+        return self.snapshot()
+
+    async def _run_check(self) -> None:
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(self.check(), timeout=self.timeout)
+            status, message = result.get("status", "error"), result.get("message")
+        except asyncio.TimeoutError:
+            status, message = "error", f"Connection check timed out after {self.timeout:g}s"
+        except Exception as e:
+            status, message = "error", f"Connection check failed: {str(e)}"
+
+        self.latency_ms = round((time.monotonic() - started) * 1000, 1)
+        self._checked_monotonic = time.monotonic()
+        self.checked_at = time.time()
+        if status != "connected":
+            self.consecutive_failures += 1
+            if self.consecutive_failures == 1:
+                logger.warning(f"Health probe failed: {message}")
+        else:
+            if self.consecutive_failures:
+                logger.info(f"Health probe recovered after {self.consecutive_failures} failures")
+            self.consecutive_failures = 0
+        self.status, self.message = status, message
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Last known status and its age, without any I/O"""
+        age = None
+        if self._checked_monotonic is not None:
+            age = round(time.monotonic() - self._checked_monotonic, 3)
+        checked_at = None
+        if self.checked_at is not None:
+            checked_at = datetime.fromtimestamp(self.checked_at, tz=timezone.utc).isoformat()
+        return {
+            "status": self.status,
+            "message": self.message,
+            "checked_at": checked_at,
+            "age_seconds": age,
+            # A result older than a few intervals means the background loop is not keeping up
+            "stale": age is None or age > 3 * self.interval + self.timeout,
+            "latency_ms": self.latency_ms,
+            "consecutive_failures": self.consecutive_failures,
+        }
+
+    def start(self) -> None:
+        """Start the background loop on the running event loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._loop())
+
+    async def _loop(self) -> None:
+        while True:
+            await self.probe()
+            await asyncio.sleep(self.interval)
+
+    async def stop(self) -> None:
+        """Cancel the background loop"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
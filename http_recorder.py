@@ -0,0 +1,275 @@
+"""
+HTTP Recorder
+Records outbound request/response pairs to cassette files and replays them without network access
+"""
+
+import asyncio
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+from http.client import responses as HTTP_REASONS
+from typing import Dict, Any, List, Optional, Tuple, Iterable, Deque
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+import httpx
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+RECORD = "record"
+REPLAY = "replay"
+
+# Never written to a cassette: credentials and headers describing the original wire encoding
+SECRET_HEADERS = frozenset({"dd-api-key", "dd-application-key", "authorization", "cookie", "set-cookie"})
+WIRE_HEADERS = frozenset({"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"})
+
+
+class CassetteMiss(Exception):
+    """A replayed request has no recorded counterpart"""
+
+
+class Cassette:
+    """
+    Recorded interactions stored one JSON object per line
+
+    In record mode, requests go to the real transport and every request/response
+    pair is appended to the file as it completes. In replay mode, no request
+    leaves the process. Each request is matched by method, URL (with sorted
+    query parameters) and a hash of its decoded body, and the recorded response
+    is returned. Identical requests are answered in the order they were
+    recorded; once those run out, the last one is repeated.
+
+    Replays wait for the recorded latency multiplied by latency_scale. Use 1.0
+    to reproduce the original traffic shape, or 0 to run at maximum speed.
+    """
+
+    def __init__(self, path: str, mode: str = REPLAY, latency_scale: float = 1.0, match_body: bool = True,
+                 ignore_query_params: Iterable[str] = ()):
+        """
+        Initialize the cassette
+
+        Args:
+            path: Cassette file (.jsonl); record mode appends to it
+            mode: 'record' or 'replay'
+            latency_scale: Multiplier applied to recorded latencies on replay (0 = no waiting)
+            match_body: Include the request body in matching
+            ignore_query_params: Query parameters left out of matching, e.g. 'from'/'to' of metric queries
+        """
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.match_body = match_body
+        self.ignore_query_params = frozenset(ignore_query_params)
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._interactions: Dict[Tuple[str, str, str], Deque[Dict[str, Any]]] = {}
+        self._last: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        if mode == REPLAY:
+            self._load()
+        else:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+
+    def _load(self) -> None:
+        with open(self.path) as f:
+            for line in f:
+                if line.strip():
+                    interaction = json.loads(line)
+                    request = interaction["request"]
+                    key = self._key(request["method"], request["url"], _decode_body(request))
+                    self._interactions.setdefault(key, deque()).append(interaction)
+        logger.info(f"Loaded {sum(len(q) for q in self._interactions.values())} interactions from {self.path}")
+
+    def _key(self, method: str, url: str, body: bytes) -> Tuple[str, str, str]:
+        parts = urlsplit(url)
+        query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                       if k not in self.ignore_query_params)
+        normalized = f"{parts.scheme}://{parts.netloc}{parts.path}" + (f"?{urlencode(query)}" if query else "")
+        digest = hashlib.sha256(body).hexdigest() if self.match_body and body else ""
+        return method.upper(), normalized, digest
+
+    def lookup(self, method: str, url: str, body: bytes) -> Dict[str, Any]:
+        """
+        Recorded interaction for a request
+
+        Raises:
+            CassetteMiss: If nothing matching was recorded
+        """
+        key = self._key(method, url, body)
+        with self._lock:
+            queue = self._interactions.get(key)
+            if queue:
+                interaction = queue.popleft()
+                self._last[key] = interaction
+            else:
+                interaction = self._last.get(key)
+            if interaction is None:
+                self.misses += 1
+                raise CassetteMiss(f"No recorded response for {method} {url} in {self.path}")
+            self.replayed += 1
+        return interaction
+
+    def record(self, method: str, url: str, request_headers: Dict[str, str], body: bytes,
+               status_code: int, response_headers: Dict[str, str], content: bytes, elapsed: float) -> None:
+        """Append one interaction to the cassette file"""
+        interaction = {
+            "request": dict(method=method.upper(), url=url, headers=_safe_headers(request_headers),
+                            **_encode_body(body)),
+            "response": dict(status_code=status_code, headers=_safe_headers(response_headers),
+                             **_encode_body(content)),
+            "elapsed": round(elapsed, 6),
+            "recorded_at": time.time(),
+        }
+        line = json.dumps(interaction) + "\n"
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line)
+            self.recorded += 1
+
+    def replay_delay(self, interaction: Dict[str, Any]) -> float:
+        return interaction.get("elapsed", 0.0) * self.latency_scale
+
+    def adapter(self, real: Optional[BaseAdapter] = None) -> "CassetteAdapter":
+        """requests transport adapter backed by this cassette"""
+        return CassetteAdapter(self, real)
+
+    def install(self, session: requests.Session) -> None:
+        """Route a requests session through the cassette, keeping its own adapters for recording"""
+        for prefix in ("https://", "http://"):
+            session.mount(prefix, self.adapter(session.get_adapter(prefix)))
+
+    def async_transport(self, real: Optional[httpx.AsyncBaseTransport] = None, **options) -> "CassetteTransport":
+        """
+        httpx async transport backed by this cassette
+
+        Args:
+            real: Transport to record through; built from options if omitted
+            options: httpx.AsyncHTTPTransport settings such as http2 and limits, so recording
+                uses the same connection pool as the client the cassette is given to
+        """
+        return CassetteTransport(self, real if real is not None else httpx.AsyncHTTPTransport(**options))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"path": self.path, "mode": self.mode, "recorded": self.recorded, "replayed": self.replayed,
+                "misses": self.misses}
+
+
+def _safe_headers(headers: Dict[str, str]) -> Dict[str, str]:
+    return {k: v for k, v in headers.items() if k.lower() not in SECRET_HEADERS and k.lower() not in WIRE_HEADERS}
+
+
+def _encode_body(body: Optional[bytes]) -> Dict[str, str]:
+    if not body:
+        return {"body": ""}
+    try:
+        return {"body": body.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"body_b64": base64.b64encode(body).decode("ascii")}
+
+
+def _decode_body(stored: Dict[str, Any]) -> bytes:
+    if "body_b64" in stored:
+        return base64.b64decode(stored["body_b64"])
+    return stored.get("body", "").encode("utf-8")
+
+
+def _plain_body(body: Optional[bytes], headers) -> bytes:
+    """Request body without transport compression, so gzip settings do not affect matching"""
+    body = body or b""
+    if body and headers.get("Content-Encoding", "").lower() == "gzip":
+        return gzip.decompress(body)
+    return body
+
+
+class CassetteAdapter(BaseAdapter):
+    """requests adapter that records through a real adapter or replays from a cassette"""
+
+    def __init__(self, cassette: Cassette, real: Optional[BaseAdapter] = None):
+        super().__init__()
+        self.cassette = cassette
+        self.real = real if real is not None else HTTPAdapter()
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        body = request.body.encode("utf-8") if isinstance(request.body, str) else request.body
+        plain = _plain_body(body, request.headers)
+
+        if self.cassette.mode == RECORD:
+            started = time.monotonic()
+            response = self.real.send(request, stream=stream, timeout=timeout, verify=verify, cert=cert,
+                                      proxies=proxies)
+            content = response.content
+            self.cassette.record(request.method, request.url, dict(request.headers), plain,
+                                 response.status_code, dict(response.headers), content,
+                                 time.monotonic() - started)
+            return response
+
+        interaction = self.cassette.lookup(request.method, request.url, plain)
+        delay = self.cassette.replay_delay(interaction)
+        if delay > 0:
+            time.sleep(delay)
+        recorded = interaction["response"]
+        response = requests.Response()
+        response.status_code = recorded["status_code"]
+        response.reason = HTTP_REASONS.get(response.status_code, "")
+        response.headers = CaseInsensitiveDict(recorded["headers"])
+        response._content = _decode_body(recorded)
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.elapsed = timedelta(seconds=interaction.get("elapsed", 0.0))
+        response.connection = self
+        return response
+
+    def close(self):
+        self.real.close()
+
+
+class CassetteTransport(httpx.AsyncBaseTransport):
+    """httpx async transport that records through a real transport or replays from a cassette"""
+
+    def __init__(self, cassette: Cassette, real: Optional[httpx.AsyncBaseTransport] = None):
+        self.cassette = cassette
+        self.real = real if real is not None else httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        plain = _plain_body(await request.aread(), request.headers)
+
+        if self.cassette.mode == RECORD:
+            started = time.monotonic()
+            response = await self.real.handle_async_request(request)
+            content = await response.aread()
+            await response.aclose()
+            self.cassette.record(request.method, str(request.url), dict(request.headers), plain,
+                                 response.status_code, dict(response.headers), content,
+                                 time.monotonic() - started)
+            # The body is already decoded, so drop the headers describing its wire encoding
+            return httpx.Response(response.status_code, headers=_without_wire_headers(response.headers),
+                                  content=content, request=request)
+
+        interaction = self.cassette.lookup(request.method, str(request.url), plain)
+        delay = self.cassette.replay_delay(interaction)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        recorded = interaction["response"]
+        return httpx.Response(recorded["status_code"], headers=recorded["headers"],
+                              content=_decode_body(recorded), request=request)
+
+    async def aclose(self) -> None:
+        await self.real.aclose()
+
+
+def _without_wire_headers(headers: httpx.Headers) -> List[Tuple[str, str]]:
+    return [(k, v) for k, v in headers.multi_items() if k.lower() not in WIRE_HEADERS]
@@ -0,0 +1,187 @@
+"""
+Idempotency Store
+Replays the result of a completed create request for a repeated Idempotency-Key instead of redoing the work
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Any, Callable, Awaitable, Optional, Tuple
+
+from applied_hashes import canonical_hash
+
+logger = logging.getLogger(__name__)
+
+
+class IdempotencyConflict(Exception):
+    """Raised when an idempotency key is reused with a different request body"""
+
+
+@dataclass
+class IdempotentResult:
+    fingerprint: str
+    result: Any
+    expires_at: float
+
+
+class IdempotencyStore:
+    """
+    Results of completed requests keyed by (scope, idempotency key), with a TTL
+
+    A request body is fingerprinted by its canonical hash, and reusing a key
+    with a different body is a conflict. A repeat that arrives while the
+    first request is still running waits for it and shares its result. Failed
+    requests are not stored, so a retry with the same key runs again. With a
+    directory, completed results are also written to disk, one file per key,
+    so replays survive a restart.
+    """
+
+    def __init__(self, ttl: float = 86400.0, max_entries: int = 10000, directory: Optional[str] = None):
+        """
+        Initialize the store
+
+        Args:
+            ttl: Seconds a completed result is replayed for
+            max_entries: Maximum results kept in memory (least recently used are dropped)
+            directory: Optional directory for on-disk results
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.directory = directory
+        self._results: "OrderedDict[str, IdempotentResult]" = OrderedDict()
+        self._inflight: Dict[str, Tuple[str, asyncio.Future]] = {}
+        self.replayed = 0
+        self.joined = 0
+        self.executed = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    async def run(self, scope: str, key: str, payload: Any, compute: Callable[[], Awaitable[Any]],
+                  ttl: Optional[float] = None) -> Tuple[Any, bool]:
+        """
+        Run compute once per (scope, key) and replay its result afterwards
+
+        Args:
+            scope: Endpoint the key belongs to, e.g. 'generate'
+            key: Client-supplied idempotency key
+            payload: Request body, fingerprinted to detect key reuse
+            compute: Coroutine function doing the actual work; must return JSON-serializable data
+            ttl: Override of the store's TTL for this key
+
+        Returns:
+            (result, whether it was replayed rather than computed by this call)
+
+        Raises:
+            IdempotencyConflict: If the key was already used with a different body
+        """
+        full_key = f"{scope}:{key}"
+        fingerprint = canonical_hash(payload)
+
+        stored = self._lookup(full_key)
+        if stored is not None:
+            self._check_fingerprint(key, stored.fingerprint, fingerprint)
+            self.replayed += 1
+            logger.info(f"Replaying stored result for {scope} idempotency key {key}")
+            return stored.result, True
+
+        pending = self._inflight.get(full_key)
+        if pending is not None:
+            self._check_fingerprint(key, pending[0], fingerprint)
+            self.joined += 1
+            logger.info(f"Joining in-flight {scope} request for idempotency key {key}")
+            return await asyncio.shield(pending[1]), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[full_key] = (fingerprint, future)
+        try:
+            result = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Waiters re-raise it; mark it retrieved for the no-waiter case
+            raise
+        finally:
+            self._inflight.pop(full_key, None)
+
+        self.executed += 1
+        self._store(full_key, IdempotentResult(fingerprint, result, time.time() + (ttl or self.ttl)))
+        future.set_result(result)
+        return result, False
+
+    @staticmethod
+    def _check_fingerprint(key: str, expected: str, actual: str) -> None:
+        if expected != actual:
+            raise IdempotencyConflict(f"Idempotency key {key} was already used with a different request body")
+
+    def _lookup(self, full_key: str) -> Optional[IdempotentResult]:
+        stored = self._results.get(full_key)
+        if stored is None:
+            stored = self._read_disk(full_key)
+            if stored is not None:
+                self._results[full_key] = stored
+        if stored is None:
+            return None
+        if stored.expires_at <= time.time():
+            self._results.pop(full_key, None)
+            self._remove_disk(full_key)
+            return None
+        self._results.move_to_end(full_key)
+        return stored
+
+    def _store(self, full_key: str, stored: IdempotentResult) -> None:
+        self._results[full_key] = stored
+        self._results.move_to_end(full_key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+        if self.directory:
+            try:
+                fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+                with os.fdopen(fd, "w") as f:
+                    json.dump({"fingerprint": stored.fingerprint, "result": stored.result,
+                               "expires_at": stored.expires_at}, f)
+                os.replace(temp_path, self._disk_path(full_key))
+            except (OSError, TypeError, ValueError) as e:
+                logger.warning(f"Failed to persist idempotent result: {str(e)}")
+
+    def _disk_path(self, full_key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(full_key.encode()).hexdigest() + ".json")
+
+    def _read_disk(self, full_key: str) -> Optional[IdempotentResult]:
+        if not self.directory:
+            return None
+        path = self._disk_path(full_key)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            return IdempotentResult(data["fingerprint"], data["result"], data["expires_at"])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable idempotent result {path}: {str(e)}")
+            return None
+
+    def _remove_disk(self, full_key: str) -> None:
+        if self.directory:
+            try:
+                os.remove(self._disk_path(full_key))
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Stored results and replay counters"""
+        return {
+            "entries": len(self._results),
+            "in_flight": len(self._inflight),
+            "ttl": self.ttl,
+            "executed": self.executed,
+            "replayed": self.replayed,
+            "joined": self.joined,
+        }
@@ -0,0 +1,165 @@
+"""
+Integration Registry
+Static documentation and typical metrics for common Datadog integrations, built once at import
+"""
+
+from typing import Dict, Any, List
+
+BASE_DOCS_URL = "https://docs.datadoghq.com/integrations"
+
+# Mapping of common integrations to their typical metrics
+# In a real implementation, this could be fetched from Datadog's documentation API
+INTEGRATION_METRICS: Dict[str, List[str]] = {
+    "aws": [
+        "aws.ec2.cpuutilization",
+        "aws.ec2.diskreadbytes",
+        "aws.ec2.diskwritebytes",
+        "aws.ec2.networkin",
+        "aws.ec2.networkout",
+        "aws.rds.cpuutilization",
+        "aws.rds.database_connections",
+        "aws.elb.request_count",
+        "aws.elb.latency"
+    ],
+    "nginx": [
+        "nginx.net.connections",
+        "nginx.net.conn_opened_per_s",
+        "nginx.net.conn_dropped_per_s",
+        "nginx.net.request_per_s",
+        "nginx.net.reading",
+        "nginx.net.writing",
+        "nginx.net.waiting"
+    ],
+    "mysql": [
+        "mysql.performance.queries",
+        "mysql.performance.questions",
+        "mysql.performance.slow_queries",
+        "mysql.performance.com_select",
+        "mysql.performance.com_insert",
+        "mysql.performance.com_update",
+        "mysql.performance.com_delete",
+        "mysql.innodb.buffer_pool_utilization",
+        "mysql.innodb.current_row_locks"
+    ],
+    "redis": [
+        "redis.info.connected_clients",
+        "redis.info.used_memory",
+        "redis.info.used_memory_rss",
+        "redis.info.mem_fragmentation_ratio",
+        "redis.net.commands_processed",
+        "redis.info.keyspace_hits",
+        "redis.info.keyspace_misses",
+        "redis.info.evicted_keys"
+    ],
+    "postgresql": [
+        "postgresql.connections",
+        "postgresql.commits",
+        "postgresql.rollbacks",
+        "postgresql.disk_read",
+        "postgresql.buffer_hit",
+        "postgresql.rows_returned",
+        "postgresql.rows_fetched",
+        "postgresql.rows_inserted",
+        "postgresql.rows_updated",
+        "postgresql.rows_deleted"
+    ]
+}
+
+# Documentation mapping for common integrations
+INTEGRATION_DOCS: Dict[str, Dict[str, Any]] = {
+    "aws": {
+        "setup_url": f"{BASE_DOCS_URL}/amazon_web_services/",
+        "metrics_url": f"{BASE_DOCS_URL}/amazon_ec2/#metrics",
+        "description": "Set up AWS integration to monitor EC2, RDS, ELB and other AWS services",
+        "setup_steps": [
+            "Configure AWS IAM role with required permissions",
+            "Add AWS account to Datadog AWS integration",
+            "Enable specific AWS services you want to monitor"
+        ]
+    },
+    "nginx": {
+        "setup_url": f"{BASE_DOCS_URL}/nginx/",
+        "metrics_url": f"{BASE_DOCS_URL}/nginx/#metrics",
+        "description": "Configure Nginx integration to monitor web server performance",
+        "setup_steps": [
+            "Enable nginx status module",
+            "Configure nginx.conf with status endpoint",
+            "Install and configure Datadog agent",
+            "Update nginx.yaml configuration file"
+        ]
+    },
+    "mysql": {
+        "setup_url": f"{BASE_DOCS_URL}/mysql/",
+        "metrics_url": f"{BASE_DOCS_URL}/mysql/#metrics",
+        "description": "Set up MySQL integration for database monitoring",
+        "setup_steps": [
+            "Create MySQL user for Datadog agent",
+            "Grant required permissions to the user",
+            "Configure mysql.yaml in agent configuration",
+            "Restart Datadog agent"
+        ]
+    },
+    "redis": {
+        "setup_url": f"{BASE_DOCS_URL}/redisdb/",
+        "metrics_url": f"{BASE_DOCS_URL}/redisdb/#metrics",
+        "description": "Configure Redis integration for cache monitoring",
+        "setup_steps": [
+            "Verify Redis INFO command access",
+            "Configure redisdb.yaml in agent configuration",
+            "Set up authentication if Redis requires it",
+            "Restart Datadog agent"
+        ]
+    },
+    "postgresql": {
+        "setup_url": f"{BASE_DOCS_URL}/postgres/",
+        "metrics_url": f"{BASE_DOCS_URL}/postgres/#metrics",
+        "description": "Set up PostgreSQL integration for database monitoring",
+        "setup_steps": [
+            "Create PostgreSQL user for Datadog agent",
+            "Grant required permissions and access to pg_stat_* views",
+            "Configure postgres.yaml in agent configuration",
+            "Restart Datadog agent"
+        ]
+    }
+}
+
+DEFAULT_SETUP_STEPS = [
+    "Check Datadog documentation for specific setup instructions",
+    "Configure integration in Datadog agent",
+    "Restart agent after configuration"
+]
+
+
+def get_integration_metrics(integration_name: str) -> List[str]:
+    """
+    Get list of typical metrics for a specific integration
+
+    Args:
+        integration_name: Name of the integration (e.g., 'aws', 'nginx', 'mysql')
+
+    Returns:
+        List of metric names for the integration
+    """
+    return list(INTEGRATION_METRICS.get(integration_name.lower(), []))
+
+
+def get_integration_documentation(integration_name: str) -> Dict[str, Any]:
+    """
+    Get documentation links and setup instructions for an integration
+
+    Args:
+        integration_name: Name of the integration
+
+    Returns:
+        Dictionary with documentation links and setup instructions
+    """
+    key = integration_name.lower()
+    docs = INTEGRATION_DOCS.get(key)
+    if docs is not None:
+        return dict(docs)
+
+    return {
+        "setup_url": f"{BASE_DOCS_URL}/{key}/",
+        "description": f"Set up {integration_name} integration",
+        "setup_steps": list(DEFAULT_SETUP_STEPS)
+    }
@@ -2,10 +2,11 @@
 Main FastAPI application for Notebook Generation and Deployment with LLM
 """
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Header, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
+from fastapi.responses import HTMLResponse, JSONResponse, FileResponse, StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Dict, Any, Optional, List
 import json
@@ -15,12 +16,28 @@ from pathlib import Path
 import uvicorn
 from datetime import datetime
 import asyncio
+import threading
+from contextlib import asynccontextmanager
+import httpx
+from concurrent.futures import ProcessPoolExecutor
 
 # Import our custom modules
 from notebook_generator import NotebookGenerator
 from dashboard_generator import DashboardGenerator
-from datadog_client import DatadogClient
+from datadog_client import DatadogClient, DatadogAPIError, CREATE_PATHS, prepare_payload
+from async_datadog_client import AsyncDatadogClient, HTTP2_AVAILABLE
+from customer_metrics_client import AsyncCustomerMetricsClient
 from metric_analysis_service import MetricAnalysisService
+from rate_limiter import RateLimiter
+from response_cache import ResponseCache
+from timeseries_cache import TimeseriesCache, live_span_seconds
+from health_probe import HealthProbe
+from applied_hashes import AppliedHashStore, canonical_hash
+from idempotency_store import IdempotencyStore, IdempotencyConflict
+import schema_validation
+from resilience import CircuitBreaker, UpstreamUnavailable, deadline_scope
+from http_recorder import Cassette
+from tenant_registry import TenantRegistry, TenantConfig, TenantClients, current_tenant, load_tenants
 
 # Configuration
 try:
@@ -44,11 +61,32 @@ except ImportError:
 logging.basicConfig(level=logging.INFO if not DEBUG else logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run background Datadog checks and idle org eviction, then close pooled connections and workers"""
+    if datadog_health_probe:
+        datadog_health_probe.start()
+    if tenant_registry is not None:
+        tenant_registry.start()
+    yield
+    if datadog_health_probe:
+        await datadog_health_probe.stop()
+    if metric_analysis_service:
+        await metric_analysis_service.aclose()
+    if async_datadog_client:
+        async_datadog_client.applied_hashes.flush()
+        await async_datadog_client.aclose()
+    if tenant_registry is not None:
+        await tenant_registry.aclose()
+    if validation_pool is not None:
+        validation_pool.shutdown(cancel_futures=True)
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Notebook Generation and Deployment with LLM",
     description="Generate and deploy Datadog notebooks using LLM",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -60,30 +98,344 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def apply_request_deadline(request: Request, call_next):
+    """Run each request under a deadline that outbound LLM and Datadog calls respect"""
+    header = request.headers.get("X-Request-Timeout")
+    if header is None and request.url.path in DEADLINE_EXEMPT_PATHS:
+        return await call_next(request)
+    try:
+        seconds = float(header) if header is not None else REQUEST_DEADLINE
+    except ValueError:
+        return JSONResponse(status_code=400, content={"detail": "X-Request-Timeout must be a number of seconds"})
+    with deadline_scope(min(max(seconds, 0.0), MAX_REQUEST_DEADLINE)):
+        return await call_next(request)
+
+@app.middleware("http")
+async def select_tenant(request: Request, call_next):
+    """
+    Point the request at one of the configured Datadog orgs
+
+    The org is named by an X-Datadog-Org header or an /orgs/{org}/ path prefix,
+    which is stripped before routing. Without either, the deployment's own
+    Datadog credentials are used.
+    """
+    org = request.headers.get("X-Datadog-Org")
+    path = request.scope["path"]
+    if path.startswith("/orgs/"):
+        _, _, path_org, rest = (path + "/").split("/", 3)
+        if org is not None and org != path_org:
+            return JSONResponse(status_code=400, content={"detail": "X-Datadog-Org does not match the /orgs/ path"})
+        org = path_org
+        request.scope["path"] = "/" + rest.rstrip("/")
+        request.scope["raw_path"] = request.scope["path"].encode()
+    if org is None:
+        return await call_next(request)
+    if tenant_registry is None or org not in tenant_registry:
+        return JSONResponse(status_code=404, content={"detail": f"Unknown Datadog org: {org}"})
+
+    tenant = tenant_registry.acquire(org)
+    token = current_tenant.set(tenant)
+    try:
+        response = await call_next(request)
+    except BaseException:
+        tenant_registry.release(tenant)
+        raise
+    finally:
+        current_tenant.reset(token)
+    # Streamed bodies keep using the org's clients after this returns, so hold them until the body ends
+    response.body_iterator = _release_after(response.body_iterator, tenant)
+    return response
+
+async def _release_after(body, tenant: TenantClients):
+    try:
+        async for chunk in body:
+            yield chunk
+    finally:
+        tenant_registry.release(tenant)
+
+@app.exception_handler(UpstreamUnavailable)
+async def upstream_unavailable_handler(request: Request, exc: UpstreamUnavailable):
+    """Deadline exceeded -> 504, open circuit breaker -> 503 with Retry-After"""
+    headers = {"Retry-After": str(int(exc.retry_after + 0.999))} if exc.retry_after else None
+    return JSONResponse(status_code=exc.status_code, content={"detail": str(exc)}, headers=headers)
+
 # Initialize components
 notebook_generator = None
 dashboard_generator = None
 datadog_client = None
+async_datadog_client = None
+datadog_health_probe = None
 metric_analysis_service = None
 
+# Every incoming request gets a deadline that caps the timeouts of the LLM and Datadog calls it makes.
+# Clients may ask for less (or, up to the maximum, more) with an X-Request-Timeout header in seconds.
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "120"))
+MAX_REQUEST_DEADLINE = float(os.getenv("MAX_REQUEST_DEADLINE", "600"))
+# NDJSON streams can legitimately run for as long as the inventory takes to page through
+DEADLINE_EXEMPT_PATHS = {"/notebooks/stream", "/dashboards/stream", "/metrics/analyze/batch", "/deploy/fanout"}
+
+# Shared per upstream, so every caller fails fast once an upstream is known to be down
+llm_circuit_breaker = CircuitBreaker(
+    "openai",
+    failure_threshold=int(os.getenv("LLM_BREAKER_THRESHOLD", "5")),
+    reset_timeout=float(os.getenv("LLM_BREAKER_RESET", "30"))
+)
+datadog_circuit_breaker = CircuitBreaker(
+    "datadog",
+    failure_threshold=int(os.getenv("DATADOG_BREAKER_THRESHOLD", "5")),
+    reset_timeout=float(os.getenv("DATADOG_BREAKER_RESET", "30"))
+)
+# Record outbound Datadog and custom-endpoint traffic to a cassette, or replay it with no network
+HTTP_CASSETTE = os.getenv("HTTP_CASSETTE")
+http_cassette = Cassette(
+    HTTP_CASSETTE,
+    mode=os.getenv("HTTP_CASSETTE_MODE", "replay"),
+    latency_scale=float(os.getenv("HTTP_CASSETTE_LATENCY_SCALE", "1.0"))
+) if HTTP_CASSETTE else None
+
+def _cassette_transport(limits: httpx.Limits, http2: bool = False) -> Optional[httpx.AsyncBaseTransport]:
+    """Cassette transport for an async client, recording through a pool set up like the client's own"""
+    if not http_cassette:
+        return None
+    return http_cassette.async_transport(http2=http2 and HTTP2_AVAILABLE, limits=limits)
+
+# Extra Datadog orgs served by this process, selected per request; see select_tenant
+DATADOG_TENANTS_FILE = os.getenv("DATADOG_TENANTS_FILE")
+TENANT_IDLE_TTL = float(os.getenv("TENANT_IDLE_TTL", "900"))
+TENANT_MAX_CONNECTIONS = int(os.getenv("TENANT_MAX_CONNECTIONS", "20"))
+TENANT_TIMESERIES_CACHE_POINTS = int(os.getenv("TENANT_TIMESERIES_CACHE_POINTS", "100000"))
+tenant_registry = None
+# Orgs a fan-out deployment creates in at once; each org is still paced by its own rate limiter
+FANOUT_MAX_CONCURRENCY = int(os.getenv("FANOUT_MAX_CONCURRENCY", "16"))
+
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+DATADOG_TIMEOUT = float(os.getenv("DATADOG_TIMEOUT", "30"))
+DATADOG_HTTP2 = os.getenv("DATADOG_HTTP2", "false").lower() == "true"
+
+# Repeated create submissions replay the first result instead of regenerating and re-creating
+idempotency_store = IdempotencyStore(
+    ttl=float(os.getenv("IDEMPOTENCY_TTL", "86400")),
+    directory=os.getenv("IDEMPOTENCY_STORE_DIR") or None
+)
+# Window in which an identical create request without a key counts as a double submission
+IDEMPOTENCY_DEDUPE_WINDOW = float(os.getenv("IDEMPOTENCY_DEDUPE_WINDOW", "10"))
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+# Batch validation fans chunks of definitions out to worker processes, started on first use
+VALIDATION_WORKERS = int(os.getenv("VALIDATION_WORKERS", "0")) or None
+VALIDATION_CHUNK_SIZE = int(os.getenv("VALIDATION_CHUNK_SIZE", "250"))
+validation_pool = None
+
 if OPENAI_API_KEY:
-    notebook_generator = NotebookGenerator(OPENAI_API_KEY)
-    dashboard_generator = DashboardGenerator(OPENAI_API_KEY)
+    notebook_generator = NotebookGenerator(OPENAI_API_KEY, timeout=LLM_TIMEOUT, circuit_breaker=llm_circuit_breaker)
+    dashboard_generator = DashboardGenerator(OPENAI_API_KEY, timeout=LLM_TIMEOUT,
+                                             circuit_breaker=llm_circuit_breaker)
     logger.info("Notebook and dashboard generators initialized")
 else:
     logger.warning("OpenAI API key not provided")
 
 if DATADOG_API_KEY and DATADOG_APP_KEY:
-    datadog_client = DatadogClient(DATADOG_API_KEY, DATADOG_APP_KEY, DATADOG_BASE_URL)
+    # Both clients draw from the same org-wide Datadog budget and share cached resources
+    datadog_rate_limiter = RateLimiter(
+        max_retries=int(os.getenv("DATADOG_MAX_RETRIES", "5")),
+        retry_deadline=float(os.getenv("DATADOG_RETRY_DEADLINE", "30"))
+    )
+    datadog_bulk_concurrency = int(os.getenv("DATADOG_BULK_CONCURRENCY", "8"))
+    datadog_gzip_threshold = int(os.getenv("DATADOG_GZIP_THRESHOLD", "0")) or None
+    datadog_response_cache = ResponseCache(
+        max_entries=int(os.getenv("DATADOG_CACHE_SIZE", "256")),
+        ttl=float(os.getenv("DATADOG_CACHE_TTL", "30"))
+    )
+    datadog_timeseries_points = int(os.getenv("DATADOG_TIMESERIES_CACHE_POINTS", "1000000"))
+    datadog_timeseries_cache = TimeseriesCache(
+        max_points=datadog_timeseries_points,
+        directory=os.getenv("DATADOG_TIMESERIES_CACHE_DIR") or None
+    ) if datadog_timeseries_points > 0 else None
+    datadog_applied_hashes = AppliedHashStore(os.getenv("DATADOG_APPLIED_HASHES_FILE") or None)
+    datadog_client = DatadogClient(DATADOG_API_KEY, DATADOG_APP_KEY, DATADOG_BASE_URL,
+                                   rate_limiter=datadog_rate_limiter,
+                                   bulk_concurrency=datadog_bulk_concurrency,
+                                   response_cache=datadog_response_cache,
+                                   gzip_threshold=datadog_gzip_threshold,
+                                   timeseries_cache=datadog_timeseries_cache,
+                                   applied_hashes=datadog_applied_hashes,
+                                   timeout=DATADOG_TIMEOUT,
+                                   circuit_breaker=datadog_circuit_breaker)
+    async_datadog_client = AsyncDatadogClient(
+        DATADOG_API_KEY,
+        DATADOG_APP_KEY,
+        DATADOG_BASE_URL,
+        http2=DATADOG_HTTP2,
+        rate_limiter=datadog_rate_limiter,
+        bulk_concurrency=datadog_bulk_concurrency,
+        response_cache=datadog_response_cache,
+        gzip_threshold=datadog_gzip_threshold,
+        timeseries_cache=datadog_timeseries_cache,
+        applied_hashes=datadog_applied_hashes,
+        timeout=DATADOG_TIMEOUT,
+        circuit_breaker=datadog_circuit_breaker,
+        transport=_cassette_transport(AsyncDatadogClient.pool_limits(), DATADOG_HTTP2)
+    )
+    if http_cassette:
+        http_cassette.install(datadog_client.session)
+        logger.info(f"Datadog traffic goes through cassette {HTTP_CASSETTE} ({http_cassette.mode})")
     logger.info("Datadog client initialized")
     
+    # /health serves the last background check instead of calling Datadog on every probe
+    datadog_health_probe = HealthProbe(
+        async_datadog_client.test_connection,
+        interval=float(os.getenv("DATADOG_HEALTH_INTERVAL", "30")),
+        timeout=float(os.getenv("DATADOG_HEALTH_TIMEOUT", "5"))
+    )
+    
     # Initialize metric analysis service
     customer_metrics_endpoint = os.getenv("CUSTOMER_METRICS_ENDPOINT")
-    metric_analysis_service = MetricAnalysisService(datadog_client, customer_metrics_endpoint)
+    metric_analysis_max_concurrency = int(os.getenv("METRIC_ANALYSIS_MAX_CONCURRENCY", "8"))
+    metric_analysis_service = MetricAnalysisService(
+        datadog_client,
+        customer_metrics_endpoint,
+        max_concurrency=metric_analysis_max_concurrency,
+        transport=_cassette_transport(AsyncCustomerMetricsClient.pool_limits())
+    )
+    if http_cassette:
+        http_cassette.install(metric_analysis_service.http_session)
     logger.info("Metric analysis service initialized")
 else:
     logger.warning("Datadog API credentials not provided")
 
+def _build_tenant_clients(tenant: TenantConfig):
+    """Clients for one extra org, with their own rate limiter, caches, breaker and connection pool"""
+    rate_limiter = RateLimiter(
+        max_retries=int(os.getenv("DATADOG_MAX_RETRIES", "5")),
+        retry_deadline=float(os.getenv("DATADOG_RETRY_DEADLINE", "30"))
+    )
+    response_cache = ResponseCache(
+        max_entries=int(os.getenv("DATADOG_CACHE_SIZE", "256")),
+        ttl=float(os.getenv("DATADOG_CACHE_TTL", "30"))
+    )
+    timeseries_cache = TimeseriesCache(max_points=TENANT_TIMESERIES_CACHE_POINTS) \
+        if TENANT_TIMESERIES_CACHE_POINTS > 0 else None
+    applied_hashes = AppliedHashStore()
+    breaker = CircuitBreaker(
+        f"datadog:{tenant.name}",
+        failure_threshold=datadog_circuit_breaker.failure_threshold,
+        reset_timeout=datadog_circuit_breaker.reset_timeout
+    )
+    bulk_concurrency = int(os.getenv("DATADOG_BULK_CONCURRENCY", "8"))
+    gzip_threshold = int(os.getenv("DATADOG_GZIP_THRESHOLD", "0")) or None
+    shared = dict(rate_limiter=rate_limiter, bulk_concurrency=bulk_concurrency, response_cache=response_cache,
+                  gzip_threshold=gzip_threshold, timeseries_cache=timeseries_cache,
+                  applied_hashes=applied_hashes, timeout=DATADOG_TIMEOUT, circuit_breaker=breaker)
+    client = DatadogClient(tenant.api_key, tenant.app_key, tenant.base_url, **shared)
+    async_client = AsyncDatadogClient(
+        tenant.api_key, tenant.app_key, tenant.base_url,
+        http2=DATADOG_HTTP2,
+        max_connections=TENANT_MAX_CONNECTIONS,
+        max_keepalive_connections=max(1, TENANT_MAX_CONNECTIONS // 2),
+        transport=_cassette_transport(
+            AsyncDatadogClient.pool_limits(TENANT_MAX_CONNECTIONS, max(1, TENANT_MAX_CONNECTIONS // 2)),
+            DATADOG_HTTP2
+        ),
+        **shared
+    )
+    if http_cassette:
+        http_cassette.install(client.session)
+    return client, async_client
+
+if DATADOG_TENANTS_FILE:
+    tenant_registry = TenantRegistry(load_tenants(DATADOG_TENANTS_FILE), _build_tenant_clients,
+                                     idle_ttl=TENANT_IDLE_TTL)
+    logger.info(f"Serving {len(tenant_registry.tenants)} extra Datadog orgs from {DATADOG_TENANTS_FILE}")
+
+def _datadog() -> Optional[DatadogClient]:
+    """Datadog client of the org the current request targets"""
+    tenant = current_tenant.get()
+    return tenant.client if tenant is not None else datadog_client
+
+def _async_datadog() -> Optional[AsyncDatadogClient]:
+    """Async Datadog client of the org the current request targets"""
+    tenant = current_tenant.get()
+    return tenant.async_client if tenant is not None else async_datadog_client
+
+_tenant_analysis_lock = threading.Lock()
+
+def _metric_analysis() -> Optional[MetricAnalysisService]:
+    """Metric analysis service of the org the current request targets, built on the org's first analysis"""
+    tenant = current_tenant.get()
+    if tenant is None:
+        return metric_analysis_service
+    with _tenant_analysis_lock:
+        if tenant.metric_analysis is None:
+            tenant.metric_analysis = MetricAnalysisService(
+                tenant.client,
+                os.getenv("CUSTOMER_METRICS_ENDPOINT"),
+                max_concurrency=int(os.getenv("METRIC_ANALYSIS_MAX_CONCURRENCY", "8")),
+                transport=_cassette_transport(AsyncCustomerMetricsClient.pool_limits())
+            )
+            if http_cassette:
+                http_cassette.install(tenant.metric_analysis.http_session)
+        return tenant.metric_analysis
+
+def _datadog_error_status(result: Dict[str, Any], default: int) -> int:
+    """HTTP status for a Datadog client error, passing rate limiting through as 429"""
+    return 429 if result.get("status_code") == 429 else default
+
+async def _idempotent(scope: str, request: BaseModel, response: Response,
+                      idempotency_key: Optional[str], compute) -> Dict[str, Any]:
+    """
+    Run a create endpoint once per Idempotency-Key and replay its result for repeats
+
+    Requests that create something in Datadog but carry no key are still deduplicated
+    by their body for a short window, which absorbs double-clicks and quick retries.
+    """
+    payload = request.model_dump()
+    tenant = current_tenant.get()
+    if tenant is not None:
+        # The same key sent to two orgs names two different submissions
+        scope = f"{scope}@{tenant.config.name}"
+    if idempotency_key is not None:
+        if not idempotency_key or len(idempotency_key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+            raise HTTPException(status_code=400,
+                                detail=f"Idempotency-Key must be 1-{MAX_IDEMPOTENCY_KEY_LENGTH} characters")
+        key, ttl = idempotency_key, None
+    elif getattr(request, "create_in_datadog", False) and IDEMPOTENCY_DEDUPE_WINDOW > 0:
+        key, ttl = f"content:{canonical_hash(payload)}", IDEMPOTENCY_DEDUPE_WINDOW
+    else:
+        return await compute()
+
+    try:
+        result, replayed = await idempotency_store.run(scope, key, payload, compute, ttl=ttl)
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
+async def _ndjson_items(items):
+    """Serialise an async item iterator as NDJSON, ending with an error line if a page fails"""
+    try:
+        async for item in items:
+            yield json.dumps(item) + "\n"
+    except DatadogAPIError as e:
+        logger.error(f"Streaming stopped: {str(e)}")
+        yield json.dumps({"error": e.error, "status_code": e.status_code}) + "\n"
+    except UpstreamUnavailable as e:
+        # Headers are already sent, so the deadline or open breaker is reported in-band
+        logger.error(f"Streaming stopped: {str(e)}")
+        yield json.dumps({"error": str(e), "status_code": e.status_code}) + "\n"
+
+def _check_bulk_request(item_count: int, max_concurrency: Optional[int]) -> AsyncDatadogClient:
+    """Validate a bulk request and return the client it will run on"""
+    client = _async_datadog()
+    if not client:
+        raise HTTPException(status_code=500, detail="Datadog client not initialized")
+    if item_count == 0:
+        raise HTTPException(status_code=400, detail="At least one item is required")
+    if max_concurrency is not None and max_concurrency < 1:
+        raise HTTPException(status_code=400, detail="max_concurrency must be at least 1")
+    return client
+
 # Static files for frontend
 static_dir = Path("static")
 if static_dir.exists():
@@ -129,6 +481,54 @@ class MetricAnalysisRequest(BaseModel):
     suggested_metrics: List[Dict[str, Any]]
     customer_id: Optional[str] = None
 
+class DefinitionAnalysisRequest(BaseModel):
+    definition: Dict[str, Any]
+    customer_id: Optional[str] = None
+
+class BatchMetricAnalysisRequest(BaseModel):
+    customer_ids: List[str]
+    suggested_metrics: List[Dict[str, Any]]
+    max_concurrency: Optional[int] = None
+
+class MetricQueryBatchRequest(BaseModel):
+    queries: List[str]
+    from_timestamp: int
+    to_timestamp: int
+    chunk_seconds: int = 86400
+    max_concurrency: Optional[int] = None
+    include_points: bool = True
+
+class BulkCreateRequest(BaseModel):
+    items: List[Dict[str, Any]]
+    max_concurrency: Optional[int] = None
+
+class FanOutDeployRequest(BaseModel):
+    kind: str
+    definition: Dict[str, Any]
+    orgs: List[str]
+    max_concurrency: Optional[int] = None
+
+class BulkUpdateItem(BaseModel):
+    id: str
+    definition: Dict[str, Any]
+
+class BulkUpdateRequest(BaseModel):
+    items: List[BulkUpdateItem]
+    max_concurrency: Optional[int] = None
+    force: bool = False
+
+class BulkDeleteRequest(BaseModel):
+    ids: List[str]
+    max_concurrency: Optional[int] = None
+
+class ValidationItem(BaseModel):
+    kind: str
+    definition: Any
+    id: Optional[str] = None
+
+class BatchValidationRequest(BaseModel):
+    items: List[ValidationItem]
+
 class MetricAnalysisResponse(BaseModel):
     success: bool
     message: str
@@ -155,9 +555,13 @@ async def documentation():
     return FileResponse('static/docs.html')
 
 @app.post("/generate", response_model=NotebookResponse)
-async def generate_notebook(request: NotebookRequest):
+async def generate_notebook(request: NotebookRequest, response: Response,
+                            idempotency_key: Optional[str] = Header(None)):
     """Generate a notebook based on user description"""
-    
+    return await _idempotent("generate", request, response, idempotency_key,
+                             lambda: _generate_notebook(request))
+
+async def _generate_notebook(request: NotebookRequest) -> Dict[str, Any]:
     if not notebook_generator:
         raise HTTPException(status_code=500, detail="Notebook generator not initialized - OpenAI API key missing")
     
@@ -174,7 +578,9 @@ async def generate_notebook(request: NotebookRequest):
             advanced_settings["rollup"] = request.rollup
         
         # Generate notebook
-        notebook_json = notebook_generator.generate_notebook(request.description, None, advanced_settings)
+        notebook_json = await run_in_threadpool(
+            notebook_generator.generate_notebook, request.description, None, advanced_settings
+        )
         
         # Generate preview
         preview = notebook_generator.preview_notebook(notebook_json)
@@ -182,18 +588,19 @@ async def generate_notebook(request: NotebookRequest):
         # Create in Datadog if requested
         datadog_notebook_id = None
         if request.create_in_datadog:
-            if not datadog_client:
+            client = _async_datadog()
+            if not client:
                 raise HTTPException(status_code=500, detail="Datadog client not initialized - API credentials missing")
             
             # Validate notebook structure
-            validation = datadog_client.validate_notebook_structure(notebook_json)
+            validation = client.validate_notebook_structure(notebook_json)
             if not validation["valid"]:
                 raise HTTPException(status_code=400, detail=f"Invalid notebook structure: {validation['errors']}")
             
             # Create notebook in Datadog
-            result = datadog_client.create_notebook(notebook_json)
+            result = await client.create_notebook(notebook_json)
             if "error" in result:
-                raise HTTPException(status_code=500, detail=f"Failed to create notebook in Datadog: {result['error']}")
+                raise HTTPException(status_code=_datadog_error_status(result, 500), detail=f"Failed to create notebook in Datadog: {result['error']}")
             
             notebook_id = result.get("data", {}).get("id")
             datadog_notebook_id = str(notebook_id) if notebook_id is not None else None
@@ -204,39 +611,76 @@ async def generate_notebook(request: NotebookRequest):
             notebook_json=notebook_json,
             datadog_notebook_id=datadog_notebook_id,
             preview=preview
-        )
+        ).model_dump()
         
-    except HTTPException:
+    except (HTTPException, UpstreamUnavailable):
         raise
     except Exception as e:
         logger.error(f"Failed to generate notebook: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to generate notebook: {str(e)}")
 
 @app.get("/health")
-async def health_check():
-    """Health check endpoint"""
+async def health_check(deep: bool = False):
+    """Health check endpoint; deep=true runs a live Datadog check instead of returning the cached one"""
     status = {
         "status": "healthy",
         "openai_configured": notebook_generator is not None and dashboard_generator is not None,
         "datadog_configured": datadog_client is not None
     }
     
-    if datadog_client:
-        connection_test = datadog_client.test_connection()
-        status["datadog_connection"] = connection_test["status"]
-    
+    if datadog_health_probe:
+        probe = await datadog_health_probe.probe() if deep else datadog_health_probe.snapshot()
+        status["datadog_connection"] = probe["status"]
+        status["datadog_probe"] = probe
+
+    # An open breaker means requests needing that upstream are being rejected; callers can shed load
+    status["circuit_breakers"] = {breaker.name: breaker.snapshot()
+                                  for breaker in (llm_circuit_breaker, datadog_circuit_breaker)}
     return status
 
+@app.get("/datadog/rate-limits")
+async def get_rate_limits():
+    """Current Datadog rate-limit budget per endpoint family"""
+    client = _async_datadog()
+    if not client:
+        raise HTTPException(status_code=500, detail="Datadog client not initialized")
+
+    return client.get_rate_limit_status()
+
+@app.get("/datadog/cache")
+async def get_cache_stats():
+    """Hit/miss counters of the Datadog response and timeseries caches, the applied-payload record and idempotent replays"""
+    client = _async_datadog()
+    if not client:
+        raise HTTPException(status_code=500, detail="Datadog client not initialized")
+
+    timeseries_cache = client.timeseries_cache
+    return {
+        "responses": client.response_cache.stats(),
+        "timeseries": timeseries_cache.stats() if timeseries_cache is not None else None,
+        "applied_hashes": client.applied_hashes.stats(),
+        "idempotency": idempotency_store.stats()
+    }
+
+@app.get("/orgs")
+async def list_orgs():
+    """Extra Datadog orgs this process serves, and which of them currently hold live clients"""
+    if tenant_registry is None:
+        return {"orgs": {}, "active": 0}
+    return tenant_registry.stats()
+
 # Metric Analysis Endpoints
 @app.post("/metrics/analyze", response_model=MetricAnalysisResponse)
 async def analyze_metrics(request: MetricAnalysisRequest):
     """Analyze suggested metrics against customer's existing metrics"""
     
-    if not metric_analysis_service:
+    service = _metric_analysis()
+    if not service:
         raise HTTPException(status_code=500, detail="Metric analysis service not initialized - Datadog credentials missing")
     
     try:
-        analysis = metric_analysis_service.analyze_metrics(
+        analysis = await run_in_threadpool(
+            service.analyze_metrics,
             request.suggested_metrics, 
             request.customer_id
         )
@@ -255,19 +699,186 @@ async def analyze_metrics(request: MetricAnalysisRequest):
             recommendations=analysis.recommendations
         )
         
+    except (HTTPException, UpstreamUnavailable):
+        raise
     except Exception as e:
         logger.error(f"Failed to analyze metrics: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to analyze metrics: {str(e)}")
 
+@app.post("/metrics/analyze/definition", response_model=MetricAnalysisResponse)
+async def analyze_definition_metrics(request: DefinitionAnalysisRequest):
+    """Analyze the metrics queried by a generated notebook or dashboard"""
+    
+    service = _metric_analysis()
+    if not service:
+        raise HTTPException(status_code=500, detail="Metric analysis service not initialized - Datadog credentials missing")
+    
+    try:
+        definition_type, metric_names, analysis = await run_in_threadpool(
+            service.analyze_definition,
+            request.definition,
+            request.customer_id
+        )
+        
+        return MetricAnalysisResponse(
+            success=True,
+            message="Metric analysis completed successfully!",
+            analysis={
+                "definition_type": definition_type,
+                "extracted_metrics": metric_names,
+                "total_suggested": analysis.total_suggested,
+                "coverage_percentage": analysis.coverage_percentage,
+                "summary": f"{len(analysis.missing_metrics)} missing metrics found out of {analysis.total_suggested} queried"
+            },
+            existing_metrics=analysis.existing_metrics,
+            missing_metrics=analysis.missing_metrics,
+            coverage_percentage=analysis.coverage_percentage,
+            recommendations=analysis.recommendations
+        )
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (HTTPException, UpstreamUnavailable):
+        raise
+    except Exception as e:
+        logger.error(f"Failed to analyze definition metrics: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to analyze definition metrics: {str(e)}")
+
+@app.post("/metrics/analyze/batch")
+async def analyze_metrics_batch(request: BatchMetricAnalysisRequest):
+    """Analyze suggested metrics against many customers, streaming NDJSON results as they complete"""
+    
+    service = _metric_analysis()
+    if not service:
+        raise HTTPException(status_code=500, detail="Metric analysis service not initialized - Datadog credentials missing")
+    
+    if not request.customer_ids:
+        raise HTTPException(status_code=400, detail="At least one customer_id is required")
+    
+    if request.max_concurrency is not None and request.max_concurrency < 1:
+        raise HTTPException(status_code=400, detail="max_concurrency must be at least 1")
+    
+    def stream_results():
+        results = service.analyze_metrics_batch(
+            request.customer_ids,
+            request.suggested_metrics,
+            max_concurrency=request.max_concurrency
+        )
+        for result in results:
+            if result.analysis is not None:
+                analysis = result.analysis
+                line = {
+                    "customer_id": result.customer_id,
+                    "success": True,
+                    "total_suggested": analysis.total_suggested,
+                    "coverage_percentage": analysis.coverage_percentage,
+                    "existing_metrics_count": len(analysis.existing_metrics),
+                    "missing_metrics": analysis.missing_metrics,
+                    "recommendations": analysis.recommendations
+                }
+            else:
+                line = {
+                    "customer_id": result.customer_id,
+                    "success": False,
+                    "error": result.error
+                }
+            yield json.dumps(line) + "\n"
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+@app.get("/metrics/coverage-matrix")
+async def get_coverage_matrix(customer_ids: Optional[str] = None, format: str = "json"):
+    """Get per-integration metric coverage for a comma-separated list of customers"""
+    
+    service = _metric_analysis()
+    if not service:
+        raise HTTPException(status_code=500, detail="Metric analysis service not initialized")
+    
+    if format not in ("json", "csv"):
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'csv'")
+    
+    try:
+        ids = [c.strip() for c in customer_ids.split(",") if c.strip()] if customer_ids else []
+        matrix = await run_in_threadpool(service.get_coverage_matrix, ids)
+        
+        if format == "csv":
+            return Response(
+                content=matrix.to_csv(),
+                media_type="text/csv",
+                headers={"Content-Disposition": "attachment; filename=coverage_matrix.csv"}
+            )
+        
+        return {
+            "success": True,
+            **matrix.to_dict()
+        }
+        
+    except (HTTPException, UpstreamUnavailable):
+        raise
+    except Exception as e:
+        logger.error(f"Failed to compute coverage matrix: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to compute coverage matrix: {str(e)}")
+
+@app.get("/metrics/query")
+async def query_metrics(query: str, live_span: Optional[str] = None,
+                        from_timestamp: Optional[int] = None, to_timestamp: Optional[int] = None):
+    """Query one metric over a live_span (e.g. 4h) or explicit window, served from the timeseries cache"""
+    client = _async_datadog()
+    if not client:
+        raise HTTPException(status_code=500, detail="Datadog client not initialized")
+    if live_span:
+        try:
+            span = live_span_seconds(live_span)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        to_timestamp = to_timestamp or int(datetime.now().timestamp())
+        from_timestamp = to_timestamp - span
+    if from_timestamp is None or to_timestamp is None:
+        raise HTTPException(status_code=400, detail="Provide live_span or both from_timestamp and to_timestamp")
+    if to_timestamp <= from_timestamp:
+        raise HTTPException(status_code=400, detail="to_timestamp must be after from_timestamp")
+    
+    result = await client.query_metrics(query, from_timestamp, to_timestamp)
+    if "error" in result:
+        raise HTTPException(status_code=_datadog_error_status(result, 500), detail=f"Failed to query metrics: {result['error']}")
+    
+    return result
+
+@app.post("/metrics/query/batch")
+async def query_metrics_batch(request: MetricQueryBatchRequest):
+    """Query many metrics over a long window using parallel, aligned chunk requests"""
+    client = _datadog()
+    if not client:
+        raise HTTPException(status_code=500, detail="Datadog client not initialized")
+    if not request.queries:
+        raise HTTPException(status_code=400, detail="At least one query is required")
+    if request.to_timestamp <= request.from_timestamp:
+        raise HTTPException(status_code=400, detail="to_timestamp must be after from_timestamp")
+    if request.chunk_seconds < 60:
+        raise HTTPException(status_code=400, detail="chunk_seconds must be at least 60")
+    if request.max_concurrency is not None and request.max_concurrency < 1:
+        raise HTTPException(status_code=400, detail="max_concurrency must be at least 1")
+    
+    results = await run_in_threadpool(
+        client.query_metrics_batch, request.queries, request.from_timestamp,
+        request.to_timestamp, request.chunk_seconds, request.max_concurrency
+    )
+    return {
+        "from_timestamp": request.from_timestamp,
+        "to_timestamp": request.to_timestamp,
+        "results": [result.to_dict(request.include_points) for result in results.values()]
+    }
+
 @app.get("/metrics/customer/{customer_id}")
 async def get_customer_metrics(customer_id: str):
     """Get customer's existing metrics"""
     
-    if not metric_analysis_service:
+    service = _metric_analysis()
+    if not service:
         raise HTTPException(status_code=500, detail="Metric analysis service not initialized")
     
     try:
-        metrics = metric_analysis_service._get_customer_metrics(customer_id)
+        metrics = await service.get_customer_metrics_async(customer_id)
         return {
             "success": True,
             "customer_id": customer_id,
@@ -275,6 +886,8 @@ async def get_customer_metrics(customer_id: str):
             "count": len(metrics)
         }
         
+    except (HTTPException, UpstreamUnavailable):
+        raise
     except Exception as e:
         logger.error(f"Failed to get customer metrics: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to get customer metrics: {str(e)}")
@@ -283,11 +896,12 @@ async def get_customer_metrics(customer_id: str):
 async def get_integration_setup(integration_name: str):
     """Get setup guide for a specific integration"""
     
-    if not metric_analysis_service:
+    service = _metric_analysis()
+    if not service:
         raise HTTPException(status_code=500, detail="Metric analysis service not initialized")
     
     try:
-        setup_guide = metric_analysis_service.get_setup_guide(integration_name)
+        setup_guide = service.get_setup_guide(integration_name)
         return {
             "success": True,
             "setup_guide": setup_guide
@@ -301,12 +915,13 @@ async def get_integration_setup(integration_name: str):
 async def get_integration_metrics(integration_name: str):
     """Get available metrics for a specific integration"""
     
-    if not datadog_client:
+    client = _datadog()
+    if not client:
         raise HTTPException(status_code=500, detail="Datadog client not initialized")
     
     try:
-        metrics = datadog_client.get_integration_metrics(integration_name)
-        doc_info = datadog_client.get_integration_documentation(integration_name)
+        metrics = client.get_integration_metrics(integration_name)
+        doc_info = client.get_integration_documentation(integration_name)
         
         return {
             "success": True,
@@ -323,36 +938,123 @@ async def get_integration_metrics(integration_name: str):
 @app.get("/notebooks")
 async def list_notebooks(count: int = 5):
     """List existing notebooks"""
-    if not datadog_client:
+    client = _async_datadog()
+    if not client:
         raise HTTPException(status_code=500, detail="Datadog client not initialized")
     
-    result = datadog_client.list_notebooks(count=count)
+    result = await client.list_notebooks(count=count)
     if "error" in result:
-        raise HTTPException(status_code=500, detail=f"Failed to list notebooks: {result['error']}")
+        raise HTTPException(status_code=_datadog_error_status(result, 500), detail=f"Failed to list notebooks: {result['error']}")
     
     return result
 
+@app.get("/notebooks/stream")
+async def stream_notebooks(page_size: int = 100):
+    """Stream every notebook as NDJSON, fetching pages as the client reads"""
+    client = _async_datadog()
+    if not client:
+        raise HTTPException(status_code=500, detail="Datadog client not initialized")
+    if page_size < 1:
+        raise HTTPException(status_code=400, detail="page_size must be at least 1")
+    
+    return StreamingResponse(_ndjson_items(client.iter_notebooks(page_size=page_size)),
+                             media_type="application/x-ndjson")
+
 @app.get("/notebooks/{notebook_id}")
 async def get_notebook(notebook_id: str):
     """Get a specific notebook"""
-    if not datadog_client:
+    client = _async_datadog()
+    if not client:
         raise HTTPException(status_code=500, detail="Datadog client not initialized")
     
-    result = datadog_client.get_notebook(notebook_id)
+    result = await client.get_notebook(notebook_id)
     if "error" in result:
-        raise HTTPException(status_code=404, detail=f"Notebook not found: {result['error']}")
+        raise HTTPException(status_code=_datadog_error_status(result, 404), detail=f"Notebook not found: {result['error']}")
     
     return result
 
+@app.post("/notebooks/bulk")
+async def bulk_create_notebooks(request: BulkCreateRequest):
+    """Create many notebooks concurrently, reporting each notebook's outcome"""
+    client = _check_bulk_request(len(request.items), request.max_concurrency)
+    return await client.bulk_create_notebooks(request.items, request.max_concurrency)
+
+@app.put("/notebooks/bulk")
+async def bulk_update_notebooks(request: BulkUpdateRequest):
+    """Update many notebooks concurrently, skipping unchanged ones and reporting each notebook's outcome"""
+    client = _check_bulk_request(len(request.items), request.max_concurrency)
+    updates = [(item.id, item.definition) for item in request.items]
+    return await client.bulk_update_notebooks(updates, request.max_concurrency, request.force)
+
+@app.post("/notebooks/bulk/delete")
+async def bulk_delete_notebooks(request: BulkDeleteRequest):
+    """Delete many notebooks concurrently, reporting each notebook's outcome"""
+    client = _check_bulk_request(len(request.ids), request.max_concurrency)
+    return await client.bulk_delete_notebooks(request.ids, request.max_concurrency)
+
 @app.post("/validate")
 async def validate_notebook(notebook_data: Dict[str, Any]):
     """Validate notebook structure"""
-    if not datadog_client:
+    client = _datadog()
+    if not client:
         raise HTTPException(status_code=500, detail="Datadog client not initialized")
     
-    validation = datadog_client.validate_notebook_structure(notebook_data)
+    validation = client.validate_notebook_structure(notebook_data)
     return validation
 
+@app.post("/deploy/fanout")
+async def deploy_to_orgs(request: FanOutDeployRequest):
+    """Create one notebook or dashboard in many orgs, streaming each org's outcome as NDJSON"""
+    if tenant_registry is None:
+        raise HTTPException(status_code=400, detail="No Datadog orgs configured - set DATADOG_TENANTS_FILE")
+    if request.kind not in CREATE_PATHS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of: {', '.join(CREATE_PATHS)}")
+    orgs = list(dict.fromkeys(request.orgs))
+    if not orgs:
+        raise HTTPException(status_code=400, detail="At least one org is required")
+    unknown = [org for org in orgs if org not in tenant_registry]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Unknown Datadog orgs: {', '.join(unknown)}")
+    if request.max_concurrency is not None and request.max_concurrency < 1:
+        raise HTTPException(status_code=400, detail="max_concurrency must be at least 1")
+
+    # Validated, cleaned and serialized once; every org receives the same bytes
+    validate = schema_validation.validate_notebook if request.kind == "notebook" else schema_validation.validate_dashboard
+    validation = validate(request.definition)
+    if not validation["valid"]:
+        raise HTTPException(status_code=400, detail=f"Invalid {request.kind} structure: {validation['errors']}")
+    prepared = prepare_payload(request.kind, request.definition)
+
+    outcomes = tenant_registry.deploy(prepared, orgs, request.max_concurrency or FANOUT_MAX_CONCURRENCY)
+    return StreamingResponse(_ndjson_items(outcomes), media_type="application/x-ndjson")
+
+@app.post("/validate/batch")
+async def validate_batch(request: BatchValidationRequest):
+    """Validate many notebook and dashboard definitions, spread across worker processes"""
+    global validation_pool
+    items = [{"kind": item.kind, "definition": item.definition} for item in request.items]
+    if len(items) <= VALIDATION_CHUNK_SIZE:
+        results = schema_validation.validate_many(items)
+    else:
+        if validation_pool is None:
+            validation_pool = ProcessPoolExecutor(max_workers=VALIDATION_WORKERS)
+        loop = asyncio.get_running_loop()
+        chunks = await asyncio.gather(*(
+            loop.run_in_executor(validation_pool, schema_validation.validate_many,
+                                 items[start:start + VALIDATION_CHUNK_SIZE])
+            for start in range(0, len(items), VALIDATION_CHUNK_SIZE)
+        ))
+        results = [result for chunk in chunks for result in chunk]
+
+    invalid = sum(1 for result in results if not result["valid"])
+    return {
+        "total": len(results),
+        "valid": len(results) - invalid,
+        "invalid": invalid,
+        "results": [dict(result, index=index, kind=item.kind, id=item.id)
+                    for index, (item, result) in enumerate(zip(request.items, results))]
+    }
+
 @app.get("/metrics/info")
 async def get_metrics_info():
     """Get information about available metrics"""
@@ -426,9 +1128,13 @@ async def get_example_suggestions(example_type: str):
 
 # Dashboard API Endpoints
 @app.post("/generate-dashboard", response_model=DashboardResponse)
-async def generate_dashboard(request: DashboardRequest):
+async def generate_dashboard(request: DashboardRequest, response: Response,
+                             idempotency_key: Optional[str] = Header(None)):
     """Generate a dashboard based on user description"""
-    
+    return await _idempotent("generate-dashboard", request, response, idempotency_key,
+                             lambda: _generate_dashboard(request))
+
+async def _generate_dashboard(request: DashboardRequest) -> Dict[str, Any]:
     if not dashboard_generator:
         raise HTTPException(status_code=500, detail="Dashboard generator not initialized - OpenAI API key missing")
     
@@ -445,7 +1151,9 @@ async def generate_dashboard(request: DashboardRequest):
             advanced_settings["rollup"] = request.rollup
         
         # Generate dashboard
-        dashboard_json = dashboard_generator.generate_dashboard(request.description, None, advanced_settings)
+        dashboard_json = await run_in_threadpool(
+            dashboard_generator.generate_dashboard, request.description, None, advanced_settings
+        )
         
         # Generate preview
         preview = dashboard_generator.preview_dashboard(dashboard_json)
@@ -453,18 +1161,19 @@ async def generate_dashboard(request: DashboardRequest):
         # Create in Datadog if requested
         datadog_dashboard_id = None
         if request.create_in_datadog:
-            if not datadog_client:
+            client = _async_datadog()
+            if not client:
                 raise HTTPException(status_code=500, detail="Datadog client not initialized - API credentials missing")
             
             # Validate dashboard structure
-            validation = datadog_client.validate_dashboard_structure(dashboard_json)
+            validation = client.validate_dashboard_structure(dashboard_json)
             if not validation["valid"]:
                 raise HTTPException(status_code=400, detail=f"Invalid dashboard structure: {validation['errors']}")
             
             # Create dashboard in Datadog
-            result = datadog_client.create_dashboard(dashboard_json)
+            result = await client.create_dashboard(dashboard_json)
             if "error" in result:
-                raise HTTPException(status_code=500, detail=f"Failed to create dashboard in Datadog: {result['error']}")
+                raise HTTPException(status_code=_datadog_error_status(result, 500), detail=f"Failed to create dashboard in Datadog: {result['error']}")
             
             dashboard_id = result.get("id")
             datadog_dashboard_id = str(dashboard_id) if dashboard_id is not None else None
@@ -475,9 +1184,9 @@ async def generate_dashboard(request: DashboardRequest):
             dashboard_json=dashboard_json,
             datadog_dashboard_id=datadog_dashboard_id,
             preview=preview
-        )
+        ).model_dump()
         
-    except HTTPException:
+    except (HTTPException, UpstreamUnavailable):
         raise
     except Exception as e:
         logger.error(f"Failed to generate dashboard: {str(e)}")
@@ -486,34 +1195,68 @@ async def generate_dashboard(request: DashboardRequest):
 @app.get("/dashboards")
 async def list_dashboards(count: int = 5):
     """List existing dashboards"""
-    if not datadog_client:
+    client = _async_datadog()
+    if not client:
         raise HTTPException(status_code=500, detail="Datadog client not initialized")
     
-    result = datadog_client.list_dashboards(count=count)
+    result = await client.list_dashboards(count=count)
     if "error" in result:
-        raise HTTPException(status_code=500, detail=f"Failed to list dashboards: {result['error']}")
+        raise HTTPException(status_code=_datadog_error_status(result, 500), detail=f"Failed to list dashboards: {result['error']}")
     
     return result
 
+@app.get("/dashboards/stream")
+async def stream_dashboards(page_size: int = 100):
+    """Stream every dashboard as NDJSON, fetching pages as the client reads"""
+    client = _async_datadog()
+    if not client:
+        raise HTTPException(status_code=500, detail="Datadog client not initialized")
+    if page_size < 1:
+        raise HTTPException(status_code=400, detail="page_size must be at least 1")
+    
+    return StreamingResponse(_ndjson_items(client.iter_dashboards(page_size=page_size)),
+                             media_type="application/x-ndjson")
+
 @app.get("/dashboards/{dashboard_id}")
 async def get_dashboard(dashboard_id: str):
     """Get a specific dashboard"""
-    if not datadog_client:
+    client = _async_datadog()
+    if not client:
         raise HTTPException(status_code=500, detail="Datadog client not initialized")
     
-    result = datadog_client.get_dashboard(dashboard_id)
+    result = await client.get_dashboard(dashboard_id)
     if "error" in result:
-        raise HTTPException(status_code=404, detail=f"Dashboard not found: {result['error']}")
+        raise HTTPException(status_code=_datadog_error_status(result, 404), detail=f"Dashboard not found: {result['error']}")
     
     return result
 
+@app.post("/dashboards/bulk")
+async def bulk_create_dashboards(request: BulkCreateRequest):
+    """Create many dashboards concurrently, reporting each dashboard's outcome"""
+    client = _check_bulk_request(len(request.items), request.max_concurrency)
+    return await client.bulk_create_dashboards(request.items, request.max_concurrency)
+
+@app.put("/dashboards/bulk")
+async def bulk_update_dashboards(request: BulkUpdateRequest):
+    """Update many dashboards concurrently, skipping unchanged ones and reporting each dashboard's outcome"""
+    client = _check_bulk_request(len(request.items), request.max_concurrency)
+    updates = [(item.id, item.definition) for item in request.items]
+    return await client.bulk_update_dashboards(updates, request.max_concurrency, request.force)
+
+@app.post("/dashboards/bulk/delete")
+async def bulk_delete_dashboards(request: BulkDeleteRequest):
+    """Delete many dashboards concurrently, reporting each dashboard's outcome"""
+    client = _check_bulk_request(len(request.ids), request.max_concurrency)
+    return await client.bulk_delete_dashboards(request.ids, request.max_concurrency)
+
 @app.post("/validate-dashboard")
 async def validate_dashboard(dashboard_data: Dict[str, Any]):
     """Validate dashboard structure"""
-    if not datadog_client:
+    client = _datadog()
+    if not client:
         raise HTTPException(status_code=500, detail="Datadog client not initialized")
     
-    validation = datadog_client.validate_dashboard_structure(dashboard_data)
+    validation = client.validate_dashboard_structure(dashboard_data)
     return validation
 
 @app.post("/preview")
@@ -536,7 +1279,9 @@ async def generate_preview(request: NotebookRequest):
             advanced_settings["rollup"] = request.rollup
         
         # Generate notebook for preview only
-        notebook_json = notebook_generator.generate_notebook(request.description, None, advanced_settings)
+        notebook_json = await run_in_threadpool(
+            notebook_generator.generate_notebook, request.description, None, advanced_settings
+        )
         
         # Generate text preview
         preview = notebook_generator.preview_notebook(notebook_json)
@@ -553,6 +1298,8 @@ async def generate_preview(request: NotebookRequest):
             }
         }
         
+    except (HTTPException, UpstreamUnavailable):
+        raise
     except Exception as e:
         logger.error(f"Failed to generate preview: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to generate preview: {str(e)}")
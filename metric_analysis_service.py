@@ -4,18 +4,33 @@ Handles analysis of suggested vs existing metrics and provides setup documentati
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import json
-from typing import Dict, Any, List, Optional, Set
+import asyncio
+import contextvars
+import threading
+from typing import Dict, Any, List, Optional, Set, Iterable, Iterator, Tuple, FrozenSet
 import logging
 from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import time
 import os
+from collections import OrderedDict
+import httpx
 import pandas as pd
 from datadog_client import DatadogClient
+from coverage_matrix import CoverageMatrix, CoverageMatrixEngine
+from customer_metrics_client import AsyncCustomerMetricsClient
+from definition_analyzer import detect_definition_type, extract_metric_names
+from resilience import UpstreamUnavailable
 
 logger = logging.getLogger(__name__)
 
 
+class MetricInventoryError(RuntimeError):
+    """A customer's existing metrics could not be fetched"""
+
+
 @dataclass
 class MetricAnalysis:
     """Results of metric analysis"""
@@ -37,21 +52,63 @@ class MissingMetric:
     priority: str  # 'high', 'medium', 'low'
 
 
+@dataclass
+class BatchAnalysisResult:
+    """Result of analyzing one customer within a batch"""
+    customer_id: str
+    analysis: Optional[MetricAnalysis] = None
+    error: Optional[str] = None
+
+
 class MetricAnalysisService:
-    def __init__(self, datadog_client: DatadogClient, customer_metrics_endpoint: Optional[str] = None):
+    def __init__(self, datadog_client: DatadogClient, customer_metrics_endpoint: Optional[str] = None,
+                 max_concurrency: int = 8, connect_timeout: float = 5.0, read_timeout: float = 30.0,
+                 transport: Optional[httpx.AsyncBaseTransport] = None, coverage_cache_size: int = 64):
         """
         Initialize the metric analysis service
         
         Args:
             datadog_client: Configured Datadog client
             customer_metrics_endpoint: Optional custom endpoint for retrieving customer metrics
+            max_concurrency: Default number of customer inventories fetched in parallel by batch analysis
+            connect_timeout: Seconds allowed to connect to the custom metrics endpoint
+            read_timeout: Seconds allowed between response chunks from the custom metrics endpoint
+            transport: Optional httpx transport for async custom endpoint fetches, e.g. a cassette replay
+            coverage_cache_size: Coverage matrices kept, one per distinct customer list
         """
         self.datadog_client = datadog_client
         self.customer_metrics_endpoint = customer_metrics_endpoint
+        self.max_concurrency = max_concurrency
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        # Pooled keep-alive session for synchronous custom endpoint fetches
+        self._http_session = requests.Session()
+        self._http_session.mount('http://', HTTPAdapter(pool_maxsize=max_concurrency))
+        self._http_session.mount('https://', HTTPAdapter(pool_maxsize=max_concurrency))
+        self._async_metrics_client = None
+        self._transport = transport
         self._metrics_cache = {}
         self._cache_ttl = 300  # 5 minutes
+        # One lock per inventory cache key, so concurrent misses fetch it once
+        self._inventory_locks: Dict[str, threading.Lock] = {}
+        self._inventory_locks_guard = threading.Lock()
         self._integration_patterns = self._load_integration_patterns()
+        self._integration_prefixes = [
+            (prefix.lower(), integration_key)
+            for integration_key, pattern_info in self._integration_patterns.items()
+            for prefix in pattern_info.get('prefixes', [])
+        ]
+        self._coverage_engine = None
+        # Keyed by the requested customer list, so bounded: callers can ask for any combination
+        self._coverage_cache: "OrderedDict[Tuple[str, ...], Dict[str, Any]]" = OrderedDict()
+        self._coverage_cache_size = coverage_cache_size
+        self._coverage_lock = threading.Lock()
         
+    @property
+    def http_session(self) -> requests.Session:
+        """Session used for synchronous custom endpoint fetches, e.g. to install a cassette on"""
+        return self._http_session
+
     def _load_integration_patterns(self) -> Dict[str, Dict[str, Any]]:
         """
         Load integration patterns from CSV files in the metrics directory
@@ -150,9 +207,9 @@ class MetricAnalysisService:
             MetricAnalysis with results and recommendations
         """
         try:
-            # Get customer's existing metrics
-            existing_metrics = self._get_customer_metrics(customer_id)
-            existing_metric_names = set(existing_metrics)
+            # Get customer's existing metrics (the set is cached alongside the inventory)
+            existing_metric_names = self._get_customer_metric_set(customer_id)
+            existing_metrics = list(existing_metric_names)
             
             # Extract metric names from suggestions
             suggested_metric_names = []
@@ -166,6 +223,8 @@ class MetricAnalysisService:
             
             # Find missing metrics
             missing_metrics = []
+            # Documentation is resolved once per distinct integration within this analysis
+            doc_info_by_integration = {}
             for i, suggested_metric in enumerate(suggested_metrics):
                 metric_name = None
                 if isinstance(suggested_metric, dict):
@@ -177,7 +236,10 @@ class MetricAnalysisService:
                 if metric_name and metric_name not in existing_metric_names:
                     # Get integration and documentation info
                     integration = self._detect_integration(metric_name)
-                    doc_info = self.datadog_client.get_integration_documentation(integration)
+                    doc_info = doc_info_by_integration.get(integration)
+                    if doc_info is None:
+                        doc_info = self.datadog_client.get_integration_documentation(integration)
+                        doc_info_by_integration[integration] = doc_info
                     
                     missing_metric = {
                         'metric_name': metric_name,
@@ -201,7 +263,7 @@ class MetricAnalysisService:
             recommendations = self._generate_recommendations(missing_metrics, existing_metrics)
             
             return MetricAnalysis(
-                existing_metrics=list(existing_metric_names),
+                existing_metrics=existing_metrics,
                 missing_metrics=missing_metrics,
                 total_suggested=total_suggested,
                 coverage_percentage=coverage_percentage,
@@ -212,6 +274,121 @@ class MetricAnalysisService:
             logger.error(f"Failed to analyze metrics: {str(e)}")
             raise
 
+    def analyze_definition(self, definition: Dict[str, Any],
+                           customer_id: Optional[str] = None) -> Tuple[str, List[str], MetricAnalysis]:
+        """
+        Analyze the metrics queried by a notebook or dashboard against customer's existing metrics
+        
+        Args:
+            definition: Generated notebook or dashboard JSON
+            customer_id: Optional customer ID for custom endpoint
+            
+        Returns:
+            Tuple of (definition type, extracted metric names, MetricAnalysis)
+            
+        Raises:
+            ValueError: If the definition is neither a notebook nor a dashboard
+        """
+        definition_type = detect_definition_type(definition)
+        if definition_type == 'unknown':
+            raise ValueError("Definition must be a notebook (data.attributes.cells) or a dashboard (widgets)")
+        
+        metric_names = extract_metric_names(definition)
+        analysis = self.analyze_metrics(metric_names, customer_id)
+        return definition_type, metric_names, analysis
+
+    def analyze_metrics_batch(self, customer_ids: Iterable[str], suggested_metrics: List[Dict[str, Any]],
+                              max_concurrency: Optional[int] = None) -> Iterator[BatchAnalysisResult]:
+        """
+        Analyze one list of suggested metrics against many customers
+        
+        Customer inventories are fetched concurrently and results are yielded
+        in completion order, so callers can stream them as they arrive.
+        
+        Args:
+            customer_ids: Customer IDs to analyze (duplicates are ignored)
+            suggested_metrics: List of suggested metrics from GPT model
+            max_concurrency: Maximum number of customers analyzed at once
+            
+        Yields:
+            BatchAnalysisResult for each customer
+        """
+        unique_ids = list(dict.fromkeys(customer_ids))
+        if not unique_ids:
+            return
+        
+        workers = max(1, min(max_concurrency or self.max_concurrency, len(unique_ids)))
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="metric-analysis")
+        
+        try:
+            futures = {
+                # Each worker keeps the request's deadline
+                executor.submit(contextvars.copy_context().run, self.analyze_metrics,
+                                suggested_metrics, customer_id): customer_id
+                for customer_id in unique_ids
+            }
+            
+            for future in as_completed(futures):
+                customer_id = futures[future]
+                try:
+                    yield BatchAnalysisResult(customer_id=customer_id, analysis=future.result())
+                except Exception as e:
+                    logger.error(f"Batch analysis failed for customer {customer_id}: {str(e)}")
+                    yield BatchAnalysisResult(customer_id=customer_id, error=str(e))
+        finally:
+            # Stop queued work if the consumer goes away early
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_coverage_matrix(self, customer_ids: Optional[Iterable[str]] = None,
+                            max_concurrency: Optional[int] = None) -> CoverageMatrix:
+        """
+        Get the fraction of every integration's metrics reported by each customer
+        
+        Inventories are fetched concurrently and the result is cached for the
+        same TTL as customer metrics, keeping the most recently used
+        coverage_cache_size matrices.
+        
+        Args:
+            customer_ids: Customer IDs to include (defaults to the Datadog org inventory)
+            max_concurrency: Maximum number of inventories fetched at once
+            
+        Returns:
+            CoverageMatrix with one row per customer and one column per integration
+        """
+        unique_ids = list(dict.fromkeys(customer_ids or [])) or ['default']
+        cache_key = tuple(unique_ids)
+        
+        with self._coverage_lock:
+            cached = self._coverage_cache.get(cache_key)
+            if cached and time.time() - cached['timestamp'] < self._cache_ttl:
+                self._coverage_cache.move_to_end(cache_key)
+                return cached['matrix']
+        
+        if self._coverage_engine is None:
+            self._coverage_engine = CoverageMatrixEngine.from_integration_patterns(self._integration_patterns)
+        
+        def fetch(customer_id: str) -> List[str]:
+            return self._get_customer_metrics(None if customer_id == 'default' else customer_id)
+        
+        workers = max(1, min(max_concurrency or self.max_concurrency, len(unique_ids)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="coverage-matrix") as executor:
+            # Each worker keeps the request's deadline
+            futures = [executor.submit(contextvars.copy_context().run, fetch, customer_id)
+                       for customer_id in unique_ids]
+            inventories = dict(zip(unique_ids, (future.result() for future in futures)))
+        
+        matrix = self._coverage_engine.compute(inventories)
+        with self._coverage_lock:
+            self._coverage_cache[cache_key] = {
+                'matrix': matrix,
+                'timestamp': time.time()
+            }
+            self._coverage_cache.move_to_end(cache_key)
+            while len(self._coverage_cache) > self._coverage_cache_size:
+                self._coverage_cache.popitem(last=False)
+        
+        return matrix
+
     def _get_customer_metrics(self, customer_id: Optional[str] = None) -> List[str]:
         """
         Get customer's existing metrics from Datadog or custom endpoint
@@ -221,25 +398,67 @@ class MetricAnalysisService:
             
         Returns:
             List of existing metric names
+            
+        Raises:
+            MetricInventoryError: If the inventory could not be fetched
+            UpstreamUnavailable: If Datadog's breaker is open or the request deadline has passed
         """
-        cache_key = f"customer_metrics_{customer_id or 'default'}"
+        use_custom_endpoint = bool(self.customer_metrics_endpoint and customer_id)
+        # Without a custom endpoint every customer resolves to the same Datadog inventory
+        cache_key = f"customer_metrics_{customer_id if use_custom_endpoint else 'default'}"
         
         # Check cache first
-        if cache_key in self._metrics_cache:
-            cached_data = self._metrics_cache[cache_key]
-            if time.time() - cached_data['timestamp'] < self._cache_ttl:
-                return cached_data['metrics']
+        cached = self._cached_metrics(cache_key)
+        if cached is not None:
+            return cached
         
+        with self._inventory_lock(cache_key):
+            # Another thread may have fetched it while this one waited
+            cached = self._cached_metrics(cache_key)
+            if cached is not None:
+                return cached
+            return self._fetch_customer_metrics(cache_key, customer_id if use_custom_endpoint else None)
+
+    def _cached_metrics(self, cache_key: str) -> Optional[List[str]]:
+        """Cached inventory for a key, or None if absent or expired"""
+        cached_data = self._metrics_cache.get(cache_key)
+        if cached_data and time.time() - cached_data['timestamp'] < self._cache_ttl:
+            return cached_data['metrics']
+        return None
+
+    def _inventory_lock(self, cache_key: str) -> threading.Lock:
+        """Lock serializing fetches of one inventory"""
+        with self._inventory_locks_guard:
+            lock = self._inventory_locks.get(cache_key)
+            if lock is None:
+                lock = self._inventory_locks[cache_key] = threading.Lock()
+            return lock
+
+    def _fetch_customer_metrics(self, cache_key: str, customer_id: Optional[str]) -> List[str]:
+        """
+        Fetch and cache one inventory
+        
+        Args:
+            cache_key: Key the inventory is cached under
+            customer_id: Customer ID for the custom endpoint, or None for the Datadog inventory
+            
+        Returns:
+            List of existing metric names
+            
+        Raises:
+            MetricInventoryError: If the inventory could not be fetched
+            UpstreamUnavailable: If Datadog's breaker is open or the request deadline has passed
+        """
+        use_custom_endpoint = customer_id is not None
         try:
-            if self.customer_metrics_endpoint and customer_id:
+            if use_custom_endpoint:
                 # Use custom endpoint if provided
                 metrics = self._fetch_from_custom_endpoint(customer_id)
             else:
                 # Use Datadog API to get active metrics
                 result = self.datadog_client.get_active_metrics()
                 if 'error' in result:
-                    logger.error(f"Failed to get metrics from Datadog: {result['error']}")
-                    return []
+                    raise MetricInventoryError(f"Failed to get metrics from Datadog: {result['error']}")
                 
                 # Extract metric names from Datadog API v2 response
                 metrics = []
@@ -260,9 +479,99 @@ class MetricAnalysisService:
             
             return metrics
             
+        except MetricInventoryError as e:
+            logger.error(str(e))
+            raise
+        except UpstreamUnavailable:
+            # Open breaker or exceeded deadline: left for the route to answer with 503/504
+            raise
         except Exception as e:
             logger.error(f"Failed to get customer metrics: {str(e)}")
-            return []
+            raise MetricInventoryError(f"Failed to get customer metrics: {str(e)}") from e
+
+    def _get_customer_metric_set(self, customer_id: Optional[str] = None) -> FrozenSet[str]:
+        """
+        Get customer's existing metrics as a set, built once per cached inventory
+        
+        Args:
+            customer_id: Optional customer ID
+            
+        Returns:
+            Frozen set of existing metric names
+        """
+        metrics = self._get_customer_metrics(customer_id)
+        
+        use_custom_endpoint = bool(self.customer_metrics_endpoint and customer_id)
+        cache_key = f"customer_metrics_{customer_id if use_custom_endpoint else 'default'}"
+        cached_data = self._metrics_cache.get(cache_key)
+        if cached_data is None or cached_data['metrics'] is not metrics:
+            return frozenset(metrics)
+        
+        metric_set = cached_data.get('metric_set')
+        if metric_set is None:
+            metric_set = frozenset(metrics)
+            cached_data['metric_set'] = metric_set
+        return metric_set
+
+    async def get_customer_metrics_async(self, customer_id: Optional[str] = None) -> List[str]:
+        """
+        Get customer's existing metrics without blocking the event loop
+        
+        Custom endpoint fetches go through the pooled async client; the Datadog
+        inventory falls back to the synchronous path in a worker thread.
+        
+        Args:
+            customer_id: Optional customer ID
+            
+        Returns:
+            List of existing metric names
+            
+        Raises:
+            MetricInventoryError: If the inventory could not be fetched
+            UpstreamUnavailable: If Datadog's breaker is open or the request deadline has passed
+        """
+        use_custom_endpoint = bool(self.customer_metrics_endpoint and customer_id)
+        if not use_custom_endpoint:
+            # to_thread copies the context, so the fetch keeps the request's deadline
+            return await asyncio.to_thread(self._get_customer_metrics, customer_id)
+        
+        cache_key = f"customer_metrics_{customer_id}"
+        cached_data = self._metrics_cache.get(cache_key)
+        if cached_data and time.time() - cached_data['timestamp'] < self._cache_ttl:
+            return cached_data['metrics']
+        
+        try:
+            metrics = await self._get_async_metrics_client().fetch_metrics(customer_id)
+        except UpstreamUnavailable:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to get customer metrics: {str(e)}")
+            raise MetricInventoryError(f"Failed to get customer metrics: {str(e)}") from e
+        
+        self._metrics_cache[cache_key] = {
+            'metrics': metrics,
+            'timestamp': time.time()
+        }
+        return metrics
+
+    def _get_async_metrics_client(self) -> AsyncCustomerMetricsClient:
+        """Lazily create the pooled async client for the custom metrics endpoint"""
+        if self._async_metrics_client is None:
+            self._async_metrics_client = AsyncCustomerMetricsClient(
+                self.customer_metrics_endpoint,
+                connect_timeout=self.connect_timeout,
+                read_timeout=self.read_timeout,
+                max_connections_per_host=self.max_concurrency,
+                transport=self._transport
+            )
+        return self._async_metrics_client
+
+    async def aclose(self) -> None:
+        """Release pooled connections held by the service"""
+        if self._async_metrics_client is not None:
+            await self._async_metrics_client.aclose()
+            self._async_metrics_client = None
+        self._http_session.close()
 
     def _fetch_from_custom_endpoint(self, customer_id: str) -> List[str]:
         """
@@ -281,7 +590,7 @@ class MetricAnalysisService:
             # Replace placeholder in endpoint URL
             url = self.customer_metrics_endpoint.replace('{customer_id}', customer_id)
             
-            response = requests.get(url, timeout=30)
+            response = self._http_session.get(url, timeout=(self.connect_timeout, self.read_timeout))
             response.raise_for_status()
             
             data = response.json()
@@ -315,22 +624,10 @@ class MetricAnalysisService:
         """
         metric_lower = metric_name.lower()
         
-        # Check against loaded integration patterns
-        for integration_key, pattern_info in self._integration_patterns.items():
-            prefixes = pattern_info.get('prefixes', [])
-            for prefix in prefixes:
-                if metric_lower.startswith(prefix.lower()):
-                    return integration_key
-        
-        # If no pattern matches, try to detect from the metric structure
-        if '.' in metric_name:
-            parts = metric_name.split('.')
-            if len(parts) >= 2:
-                potential_integration = f"{parts[0]}.{parts[1]}"
-                # Check if this looks like a known integration pattern
-                for integration_key, pattern_info in self._integration_patterns.items():
-                    if potential_integration.lower() in [p.lower() for p in pattern_info.get('prefixes', [])]:
-                        return integration_key
+        # Check against loaded integration patterns (prefixes are lower-cased once at startup)
+        for prefix, integration_key in self._integration_prefixes:
+            if metric_lower.startswith(prefix):
+                return integration_key
         
         # Default to 'custom' if no pattern matches
         return 'custom'
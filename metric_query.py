@@ -0,0 +1,296 @@
+"""
+Metric Query Parser
+Parses Datadog metric queries such as avg:system.cpu.user{env:prod} by {host}.rollup(avg, 60) into a small AST
+"""
+
+import dataclasses
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterator, List, Optional, Tuple, Union
+
+# Parsed query strings kept in memory; LLM output repeats the same few queries many times
+PARSE_CACHE_SIZE = 4096
+
+_OPERATORS = {"+": 1, "-": 1, "*": 2, "/": 2}
+_IDENT_START = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_")
+_IDENT_CHARS = _IDENT_START | frozenset("0123456789.")
+
+
+class MetricQueryError(ValueError):
+    """A query string is not a well-formed metric query"""
+
+    def __init__(self, message: str, query: str, position: int):
+        super().__init__(f"{message} at position {position} in {query!r}")
+        self.query = query
+        self.position = position
+
+
+@dataclass(frozen=True)
+class Number:
+    value: float
+
+
+@dataclass(frozen=True)
+class String:
+    value: str
+
+
+@dataclass(frozen=True)
+class Name:
+    """A bare word argument, e.g. the 'avg' in rollup(avg, 60) or the 'null' in fill(null)"""
+    value: str
+
+
+@dataclass(frozen=True)
+class Call:
+    """A function wrapping other queries, e.g. per_second(...), or a .method() applied to a metric"""
+    name: str
+    args: Tuple["Node", ...] = ()
+
+
+@dataclass(frozen=True)
+class Rollup:
+    method: Optional[str]
+    interval: Optional[int]
+
+
+@dataclass(frozen=True)
+class MetricQuery:
+    """
+    One aggregator:metric{scope} by {group} term and the methods chained onto it
+
+    An empty scope means none was written (avg:metric), not {*}.
+    """
+    aggregator: str
+    metric: str
+    scope: Tuple[str, ...] = ()
+    group_by: Tuple[str, ...] = ()
+    modifiers: Tuple[Call, ...] = ()
+
+    @property
+    def rollup(self) -> Optional[Rollup]:
+        """The .rollup() applied to this term, or None for Datadog's automatic rollup"""
+        for call in self.modifiers:
+            if call.name == "rollup":
+                method = next((arg.value for arg in call.args if isinstance(arg, Name)), None)
+                interval = next((int(arg.value) for arg in call.args if isinstance(arg, Number)), None)
+                return Rollup(method, interval)
+        return None
+
+    def with_rollup(self, method: str, interval: int) -> "MetricQuery":
+        """Copy with the rollup replaced in place, or appended if there was none"""
+        rollup = Call("rollup", (Name(method), Number(float(interval))))
+        modifiers = [rollup if call.name == "rollup" else call for call in self.modifiers]
+        if rollup not in modifiers:
+            modifiers.append(rollup)
+        return dataclasses.replace(self, modifiers=tuple(modifiers))
+
+
+@dataclass(frozen=True)
+class BinaryOp:
+    op: str
+    left: "Node"
+    right: "Node"
+
+
+Node = Union[Number, String, Name, Call, MetricQuery, BinaryOp]
+
+
+class _Parser:
+    """Recursive descent over the query text; scopes and group-bys are taken verbatim"""
+
+    def __init__(self, query: str):
+        self.query = query
+        self.pos = 0
+
+    def error(self, message: str) -> MetricQueryError:
+        return MetricQueryError(message, self.query, self.pos)
+
+    def peek(self) -> str:
+        while self.pos < len(self.query) and self.query[self.pos].isspace():
+            self.pos += 1
+        return self.query[self.pos] if self.pos < len(self.query) else ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            found = repr(self.query[self.pos]) if self.pos < len(self.query) else "end of query"
+            raise self.error(f"Expected {char!r}, found {found}")
+        self.pos += 1
+
+    def parse(self) -> Node:
+        node = self.expression(1)
+        if self.peek():
+            raise self.error(f"Unexpected {self.query[self.pos]!r}")
+        return node
+
+    def expression(self, min_precedence: int) -> Node:
+        left = self.primary()
+        while True:
+            op = self.peek()
+            precedence = _OPERATORS.get(op)
+            if precedence is None or precedence < min_precedence:
+                return left
+            self.pos += 1
+            left = BinaryOp(op, left, self.expression(precedence + 1))
+
+    def primary(self) -> Node:
+        char = self.peek()
+        if char == "(":
+            self.pos += 1
+            node = self.expression(1)
+            self.expect(")")
+            return node
+        if char.isdigit() or (char == "-" and self.query[self.pos + 1:self.pos + 2].isdigit()):
+            return self.number()
+        if char in ("'", '"'):
+            end = self.query.find(char, self.pos + 1)
+            if end < 0:
+                raise self.error("Unterminated string")
+            value = self.query[self.pos + 1:end]
+            self.pos = end + 1
+            return String(value)
+        if char in _IDENT_START:
+            name = self.identifier()
+            following = self.peek()
+            if following == ":":
+                self.pos += 1
+                return self.metric_query(name)
+            if following == "(":
+                return Call(name, self.arguments())
+            return Name(name)
+        raise self.error(f"Unexpected {char!r}" if char else "Unexpected end of query")
+
+    def number(self) -> Number:
+        start = self.pos
+        self.pos += 1
+        while self.pos < len(self.query) and (self.query[self.pos].isdigit() or self.query[self.pos] == "."):
+            self.pos += 1
+        try:
+            return Number(float(self.query[start:self.pos]))
+        except ValueError:
+            raise MetricQueryError("Invalid number", self.query, start)
+
+    def identifier(self) -> str:
+        start = self.pos
+        while self.pos < len(self.query) and self.query[self.pos] in _IDENT_CHARS:
+            self.pos += 1
+        return self.query[start:self.pos]
+
+    def arguments(self) -> Tuple[Node, ...]:
+        self.expect("(")
+        if self.peek() == ")":
+            self.pos += 1
+            return ()
+        args = [self.expression(1)]
+        while self.peek() == ",":
+            self.pos += 1
+            args.append(self.expression(1))
+        self.expect(")")
+        return tuple(args)
+
+    def braces(self) -> Tuple[str, ...]:
+        self.expect("{")
+        end = self.query.find("}", self.pos)
+        if end < 0:
+            raise self.error("Unterminated '{'")
+        items = tuple(item.strip() for item in self.query[self.pos:end].split(",") if item.strip())
+        self.pos = end + 1
+        return items
+
+    def metric_query(self, aggregator: str) -> MetricQuery:
+        if self.peek() not in _IDENT_START:
+            raise self.error("Expected a metric name")
+        start = self.pos
+        metric = self.identifier()
+        # Without a scope the first method is read as part of the name: avg:a.b.rollup(sum)
+        if self.query[self.pos:self.pos + 1] == "(" and "." in metric:
+            metric = metric.rsplit(".", 1)[0]
+            self.pos = start + len(metric)
+        if not metric or metric.endswith("."):
+            raise MetricQueryError("Invalid metric name", self.query, start)
+
+        scope = self.braces() if self.peek() == "{" else ()
+        group_by = ()
+        self.peek()
+        if self.query[self.pos:self.pos + 2].lower() == "by" and self.query[self.pos + 2:].lstrip().startswith("{"):
+            self.pos += 2
+            group_by = self.braces()
+
+        modifiers = []
+        while self.peek() == ".":
+            self.pos += 1
+            if self.peek() not in _IDENT_START:
+                raise self.error("Expected a method name")
+            method = self.identifier()
+            if "." in method:
+                raise self.error(f"Invalid method name {method!r}")
+            modifiers.append(Call(method, self.arguments()))
+        return MetricQuery(aggregator, metric, scope, group_by, tuple(modifiers))
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_query(query: str) -> Node:
+    """
+    Parse a Datadog metric query into an AST
+
+    Results are cached by query string; the nodes are immutable, so callers
+    can share them freely.
+
+    Args:
+        query: Metric query, e.g. "per_second(sum:aws.elb.request_count{*}.as_count())"
+
+    Returns:
+        Root node
+
+    Raises:
+        MetricQueryError: If the query is malformed
+    """
+    return _Parser(query).parse()
+
+
+def walk(node: Node) -> Iterator[Node]:
+    """Every node of a tree, parents before children, left to right"""
+    yield node
+    if isinstance(node, BinaryOp):
+        yield from walk(node.left)
+        yield from walk(node.right)
+    elif isinstance(node, Call):
+        for arg in node.args:
+            yield from walk(arg)
+
+
+def metric_queries(node: Node) -> List[MetricQuery]:
+    """The metric terms of a query in order"""
+    return [child for child in walk(node) if isinstance(child, MetricQuery)]
+
+
+def format_query(node: Node) -> str:
+    """
+    Query string for an AST
+
+    Formatting is canonical (no space inside braces, one space around
+    operators), so parse -> format -> parse returns an equal tree.
+    """
+    if isinstance(node, Number):
+        return str(int(node.value)) if node.value.is_integer() else repr(node.value)
+    if isinstance(node, String):
+        return f"'{node.value}'"
+    if isinstance(node, Name):
+        return node.value
+    if isinstance(node, Call):
+        return f"{node.name}({', '.join(format_query(arg) for arg in node.args)})"
+    if isinstance(node, MetricQuery):
+        text = f"{node.aggregator}:{node.metric}"
+        if node.scope:
+            text += "{" + ",".join(node.scope) + "}"
+        if node.group_by:
+            text += " by {" + ",".join(node.group_by) + "}"
+        return text + "".join(f".{format_query(call)}" for call in node.modifiers)
+    precedence = _OPERATORS[node.op]
+    left, right = format_query(node.left), format_query(node.right)
+    if isinstance(node.left, BinaryOp) and _OPERATORS[node.left.op] < precedence:
+        left = f"({left})"
+    # Operators are left-associative, so an equal-precedence right operand needs parentheses too
+    if isinstance(node.right, BinaryOp) and _OPERATORS[node.right.op] <= precedence:
+        right = f"({right})"
+    return f"{left} {node.op} {right}"
@@ -0,0 +1,185 @@
+"""
+Metric Series
+Chunked time ranges and NumPy decoding/stitching of Datadog metric query results
+"""
+
+import json
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_POINTLIST_RE = re.compile(r'"pointlist"\s*:\s*\[(\s*\])?')
+# Pointlists only hold numbers and nulls, so brackets can be blanked out and the rest read as CSV
+_POINT_TRANSLATION = str.maketrans("[]", "  ")
+
+
+@dataclass
+class MetricSeries:
+    """One timeseries of a query result; timestamps are epoch milliseconds, gaps are NaN"""
+    query: str
+    expression: Optional[str]
+    metric: Optional[str]
+    scope: Optional[str]
+    timestamps: np.ndarray
+    values: np.ndarray
+    interval: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def to_dict(self, include_points: bool = True) -> Dict[str, Any]:
+        """JSON-serializable view; NaN values become null"""
+        result = {
+            "query": self.query,
+            "expression": self.expression,
+            "metric": self.metric,
+            "scope": self.scope,
+            "interval": self.interval,
+            "points": len(self),
+        }
+        if include_points:
+            values = self.values.astype(object)
+            values[np.isnan(self.values)] = None
+            result["pointlist"] = [[int(t), v] for t, v in zip(self.timestamps.tolist(), values.tolist())]
+        return result
+
+
+@dataclass
+class MetricQueryResult:
+    """Stitched result of one query across every chunk of the requested window"""
+    query: str
+    series: List[MetricSeries] = field(default_factory=list)
+    error: Optional[Any] = None
+    status_code: Optional[int] = None
+
+    def to_dict(self, include_points: bool = True) -> Dict[str, Any]:
+        result = {"query": self.query, "series": [s.to_dict(include_points) for s in self.series]}
+        if self.error is not None:
+            result["error"] = self.error
+            result["status_code"] = self.status_code
+        return result
+
+
+def align_chunks(from_timestamp: int, to_timestamp: int, chunk_seconds: int) -> List[Tuple[int, int]]:
+    """
+    Split [from, to] into windows whose inner boundaries fall on multiples of chunk_seconds
+
+    Epoch-aligned boundaries keep chunks identical between overlapping requests.
+
+    Args:
+        from_timestamp: Start (epoch seconds)
+        to_timestamp: End (epoch seconds)
+        chunk_seconds: Chunk length in seconds
+
+    Returns:
+        (from, to) pairs covering the range in order
+    """
+    if chunk_seconds <= 0:
+        raise ValueError("chunk_seconds must be positive")
+    if to_timestamp <= from_timestamp:
+        return [(from_timestamp, to_timestamp)]
+    chunks = []
+    start = from_timestamp
+    while start < to_timestamp:
+        end = min((start // chunk_seconds + 1) * chunk_seconds, to_timestamp)
+        chunks.append((start, end))
+        start = end
+    return chunks
+
+
+def parse_pointlists(body: Union[bytes, str]) -> Tuple[Dict[str, Any], List[np.ndarray]]:
+    """
+    Decode a /api/v1/query response without building per-point Python objects
+
+    Every pointlist is read straight into a float64 (n, 2) array and replaced by
+    an empty list before the (now small) remainder goes through json.loads.
+
+    Args:
+        body: Raw response body
+
+    Returns:
+        (decoded response with empty pointlists, one points array per series)
+    """
+    text = body.decode("utf-8") if isinstance(body, bytes) else body
+    arrays = []
+    pieces = []
+    position = 0
+    for match in _POINTLIST_RE.finditer(text):
+        start = match.start(0) + match.group(0).index("[")
+        if match.group(1):
+            end = match.end()
+            points = np.empty((0, 2))
+        else:
+            end = text.index("]]", start) + 2
+            raw = text[start:end].translate(_POINT_TRANSLATION).replace("null", "nan")
+            points = np.fromstring(raw, sep=",").reshape(-1, 2)
+        arrays.append(points)
+        pieces.append(text[position:start])
+        pieces.append("[]")
+        position = end
+    pieces.append(text[position:])
+
+    try:
+        decoded = json.loads("".join(pieces))
+    except ValueError:
+        decoded = None
+    if decoded is None or len(arrays) != len(decoded.get("series") or []):
+        # Something other than a series carried a "pointlist" key; decode the slow way
+        logger.warning("Falling back to full JSON decode of metric query response")
+        decoded = json.loads(text)
+        arrays = []
+        for series in decoded.get("series") or []:
+            pointlist = series.get("pointlist") or []
+            arrays.append(np.array(pointlist, dtype=float).reshape(-1, 2))
+            series["pointlist"] = []
+    return decoded, arrays
+
+
+def series_key(series: Dict[str, Any]) -> Tuple:
+    """Identity of a series across chunks: (expression, scope, metric)"""
+    return series.get("expression"), series.get("scope"), series.get("metric")
+
+
+def stitch_chunks(query: str, chunks: List[Tuple[Dict[str, Any], List[np.ndarray]]]) -> List[MetricSeries]:
+    """
+    Merge per-chunk results into one series per (expression, scope, metric)
+
+    Points are concatenated, sorted by timestamp and de-duplicated where chunk
+    boundaries overlap.
+
+    Args:
+        query: The query the chunks answer
+        chunks: parse_pointlists() output for each chunk, in any order
+
+    Returns:
+        Stitched series in first-seen order
+    """
+    grouped: Dict[Tuple, Tuple[Dict[str, Any], List[np.ndarray]]] = {}
+    for decoded, arrays in chunks:
+        for meta, points in zip(decoded.get("series") or [], arrays):
+            key = series_key(meta)
+            if key not in grouped:
+                grouped[key] = (meta, [])
+            grouped[key][1].append(points)
+
+    stitched = []
+    for meta, parts in grouped.values():
+        points = np.concatenate(parts) if parts else np.empty((0, 2))
+        timestamps = points[:, 0].astype(np.int64)
+        # np.unique sorts and keeps the first occurrence of each boundary timestamp
+        timestamps, index = np.unique(timestamps, return_index=True)
+        stitched.append(MetricSeries(
+            query=query,
+            expression=meta.get("expression"),
+            metric=meta.get("metric"),
+            scope=meta.get("scope"),
+            timestamps=timestamps,
+            values=points[index, 1],
+            interval=meta.get("interval"),
+        ))
+    return stitched
@@ -9,6 +9,8 @@ import random
 from typing import Dict, List, Any, Optional
 from dataclasses import dataclass
 
+from metric_query import MetricQuery, format_query
+
 
 @dataclass
 class Metric:
@@ -217,13 +219,7 @@ class MetricsLoader:
     def format_metric_for_query(self, metric: Metric, aggregation: str = "avg", 
                                tags: Optional[List[str]] = None) -> str:
         """Format a metric for use in Datadog queries"""
-        query = f"{aggregation}:{metric.name}"
-        
-        if tags:
-            tag_string = ",".join(tags)
-            query += f"{{{tag_string}}}"
-        
-        return query
+        return format_query(MetricQuery(aggregation, metric.name, tuple(tags or ())))
     
     def get_metrics_summary(self) -> Dict[str, Any]:
         """Get summary statistics about loaded metrics"""
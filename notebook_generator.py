@@ -10,11 +10,16 @@ from datetime import datetime
 import openai
 from openai import OpenAI
 from metrics_loader import MetricsLoader, Metric
+import resilience
+from resilience import CircuitBreaker, UpstreamUnavailable
 
 
 class NotebookGenerator:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, timeout: float = 60.0, circuit_breaker: Optional[CircuitBreaker] = None):
         self.client = OpenAI(api_key=api_key)
+        # Per-call LLM timeout (capped by the request deadline) and the breaker shared by all LLM callers
+        self.timeout = timeout
+        self.circuit_breaker = circuit_breaker or CircuitBreaker("openai")
         self.example_notebook = self._load_example_notebook()
         self.metrics_loader = MetricsLoader()
     
@@ -61,7 +66,8 @@ class NotebookGenerator:
         
         try:
             # Get LLM response
-            response = self.client.chat.completions.create(
+            response = resilience.chat_completion(
+                self.circuit_breaker, self.client, self.timeout,
                 model="gpt-4",
                 messages=[
                     {"role": "system", "content": "You are a Datadog metric expert designed to help users understand and utilize available metrics in the Datadog ecosystem. You can interpret and explain metadata from various cloud services like Amazon EC2, S3, SQS, VPC, and Azure Functions, as well as on-premises systems. Your role includes clarifying metric definitions, recommending appropriate metrics for monitoring specific use cases, and providing insights into metric usage patterns and configurations. You support comparisons across services and guide users in leveraging metrics effectively for observability and alerting purposes. When provided with metadata files, you parse them to give detailed, accurate breakdowns and suggestions. You are also an expert in creating Datadog notebooks. You must respond with valid JSON only. Do not include any text before or after the JSON structure."},
@@ -93,6 +99,9 @@ class NotebookGenerator:
                 cells = self._extract_cells_from_response(llm_response, user_request)
                 return self._create_notebook_structure(user_request, cells, author_info)
             
+        except UpstreamUnavailable:
+            # Out of time or the LLM is down: fail fast rather than return a placeholder
+            raise
         except Exception as e:
             print(f"Error generating notebook with LLM: {e}")
             # Fallback to basic notebook
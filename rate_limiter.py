@@ -0,0 +1,261 @@
+"""
+Datadog Rate Limiter
+Paces outgoing Datadog API requests from the X-RateLimit-* response headers
+"""
+
+import random
+import re
+import threading
+import time
+import logging
+from typing import Dict, Any, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+# Status codes worth retrying: 429 is never processed server-side, 5xx may be transient
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE", "OPTIONS"})
+
+_FAMILY_RE = re.compile(r"^/api/v\d+/([^/?]+)")
+
+
+def endpoint_family(path: str) -> str:
+    """
+    Map a request path to the rate-limit family Datadog budgets it under
+
+    Args:
+        path: URL path, e.g. "/api/v1/notebooks/123"
+
+    Returns:
+        Family name such as 'notebooks', 'dashboard', 'metrics' or 'query'
+    """
+    match = _FAMILY_RE.match(path)
+    return match.group(1) if match else "default"
+
+
+def should_retry(method: str, status_code: int) -> bool:
+    """
+    Decide whether a response status may be retried for a method
+
+    5xx responses are only retried for idempotent methods since a failed POST
+    may still have created the resource.
+    """
+    if status_code == 429:
+        return True
+    return status_code in RETRYABLE_STATUS_CODES and method.upper() in IDEMPOTENT_METHODS
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 10.0) -> float:
+    """
+    Full-jitter exponential backoff delay for a retry attempt (0-based)
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def _header_float(headers: Mapping[str, str], name: str) -> Optional[float]:
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Token bucket sized from Datadog's advertised limit and period
+
+    Until the first rate-limit headers arrive the bucket does not pace at all.
+    Datadog budgets are fixed windows, so nothing is refilled before the
+    advertised reset; afterwards tokens refill at limit/period. Reservations
+    may drive the token count negative, which spaces out concurrent callers at
+    the sustainable rate instead of letting them burst.
+    """
+
+    def __init__(self):
+        self.limit: Optional[float] = None
+        self.period: Optional[float] = None
+        self.remaining: Optional[float] = None
+        self.reset_at: Optional[float] = None
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> Optional[float]:
+        """Tokens refilled per second, or None while the limit is unknown"""
+        if not self.limit or not self.period:
+            return None
+        return self.limit / self.period
+
+    def _refill(self, now: float) -> None:
+        rate = self.rate
+        if rate is not None:
+            since = self.updated if self.reset_at is None else max(self.updated, self.reset_at)
+            if now > since:
+                self.tokens = min(self.limit, self.tokens + (now - since) * rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """
+        Take one token
+
+        Returns:
+            Seconds the caller must wait before sending its request
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            rate = self.rate
+            if rate is None:
+                return 0.0
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            self.throttled += 1
+            debt = -self.tokens
+            if self.reset_at is not None and self.reset_at > now:
+                # The first queued caller goes as the window resets, the rest follow at the refill rate
+                return (self.reset_at - now) + (debt - 1) / rate
+            return debt / rate
+
+    def update(self, headers: Mapping[str, str]) -> bool:
+        """
+        Resynchronise the bucket with a response's rate-limit headers
+
+        Args:
+            headers: Response headers (case-insensitive mapping)
+
+        Returns:
+            True if rate-limit headers were present
+        """
+        limit = _header_float(headers, "X-RateLimit-Limit")
+        remaining = _header_float(headers, "X-RateLimit-Remaining")
+        if limit is None or remaining is None:
+            return False
+        period = _header_float(headers, "X-RateLimit-Period")
+        reset = _header_float(headers, "X-RateLimit-Reset")
+
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.limit = limit
+            self.period = period or reset or self.period or 60.0
+            self.remaining = remaining
+            # Trust the server's count unless reservations are already queued; those are being
+            # released at the refill rate, and gating refill on the new window would stall them
+            if self.tokens >= 0:
+                self.tokens = remaining
+                self.reset_at = now + reset if reset is not None else None
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        """Snapshot of the bucket for diagnostics"""
+        with self._lock:
+            self._refill(time.monotonic())
+            reset_in = None
+            if self.reset_at is not None:
+                reset_in = round(max(0.0, self.reset_at - time.monotonic()), 3)
+            return {
+                "limit": self.limit,
+                "period": self.period,
+                "remaining": self.remaining,
+                "reset_in": reset_in,
+                "available_tokens": round(self.tokens, 3) if self.rate is not None else None,
+                "throttled_requests": self.throttled,
+            }
+
+
+class RateLimiter:
+    """
+    Per endpoint-family token buckets shared by the sync and async Datadog clients
+    """
+
+    def __init__(self, max_retries: int = 5, retry_deadline: float = 30.0,
+                 backoff_base: float = 0.5, backoff_cap: float = 10.0):
+        """
+        Initialize the rate limiter
+
+        Args:
+            max_retries: Maximum retries for a 429/5xx response
+            retry_deadline: Seconds after the first attempt past which no retry is started
+            backoff_base: Base delay of the exponential backoff
+            backoff_cap: Upper bound of a single backoff delay
+        """
+        self.max_retries = max_retries
+        self.retry_deadline = retry_deadline
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.retries = 0
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, family: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(family)
+            if bucket is None:
+                bucket = self._buckets[family] = TokenBucket()
+            return bucket
+
+    def reserve(self, family: str) -> float:
+        """Reserve a request slot and return the seconds to wait before sending"""
+        return self.bucket(family).reserve()
+
+    def update(self, family: str, headers: Mapping[str, str]) -> None:
+        """Feed a response's headers back into the family's bucket"""
+        self.bucket(family).update(headers)
+
+    def retry_delay(self, attempt: int, status_code: int, headers: Mapping[str, str]) -> float:
+        """
+        Delay before retrying a failed attempt
+
+        A 429 waits for the advertised window reset (plus jitter); anything else
+        uses jittered exponential backoff.
+        """
+        delay = backoff_delay(attempt, self.backoff_base, self.backoff_cap)
+        if status_code == 429:
+            reset = _header_float(headers, "Retry-After") or _header_float(headers, "X-RateLimit-Reset")
+            if reset is not None:
+                delay += reset
+        return delay
+
+    def next_retry_delay(self, method: str, attempt: int, status_code: int,
+                         headers: Mapping[str, str], started: float) -> Optional[float]:
+        """
+        Decide whether to retry a response and for how long to wait first
+
+        Args:
+            method: HTTP method of the request
+            attempt: 0-based number of the attempt that just completed
+            status_code: Response status code
+            headers: Response headers
+            started: time.monotonic() of the first attempt
+
+        Returns:
+            Seconds to wait before retrying, or None to give up
+        """
+        if attempt >= self.max_retries or not should_retry(method, status_code):
+            return None
+        delay = self.retry_delay(attempt, status_code, headers)
+        if time.monotonic() + delay - started > self.retry_deadline:
+            logger.warning(f"Giving up on {method} after HTTP {status_code}: retry would exceed "
+                           f"the {self.retry_deadline:.0f}s deadline")
+            return None
+        with self._lock:
+            self.retries += 1
+        logger.info(f"Retrying {method} after HTTP {status_code} in {delay:.2f}s (attempt {attempt + 1})")
+        return delay
+
+    def status(self) -> Dict[str, Any]:
+        """Current budget of every endpoint family seen so far"""
+        with self._lock:
+            buckets = dict(self._buckets)
+            retries = self.retries
+        return {
+            "families": {family: bucket.status() for family, bucket in sorted(buckets.items())},
+            "retries": retries,
+            "max_retries": self.max_retries,
+            "retry_deadline": self.retry_deadline,
+        }
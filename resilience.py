@@ -0,0 +1,256 @@
+"""
+Resilience
+Per-request deadlines carried in a context variable, and circuit breakers that fail fast on degraded upstreams
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Any, Callable, Iterator, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# time.monotonic() by which the current request must finish, or None for no deadline
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class UpstreamUnavailable(Exception):
+    """Base for failures that should reach the HTTP client as a 5xx without further work"""
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(UpstreamUnavailable):
+    """The request's deadline passed before an upstream call could complete"""
+    status_code = 504
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    """An upstream's circuit breaker is open, so the call was not attempted"""
+    status_code = 503
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[None]:
+    """
+    Run the enclosed code under a deadline of `seconds` from now
+
+    A nested scope can only shorten the deadline of the enclosing one. The
+    deadline follows the context into tasks and run_in_threadpool calls.
+    """
+    if seconds is None:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or None without one"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def timeout_for(default: float, action: str = "request") -> float:
+    """
+    Timeout for the next upstream call: default, capped by the time left
+
+    Raises:
+        DeadlineExceeded: If the deadline has already passed
+    """
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded(f"Deadline exceeded before {action}")
+    return min(default, left)
+
+
+def ensure_time_for(seconds: float, action: str) -> None:
+    """
+    Check that a wait of `seconds` still fits before the deadline
+
+    Raises:
+        DeadlineExceeded: If the wait would outlast the deadline
+    """
+    left = remaining()
+    if left is not None and seconds >= left:
+        raise DeadlineExceeded(f"Deadline exceeded: {action} needs {seconds:.1f}s, {max(left, 0):.1f}s left")
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one upstream
+
+    After failure_threshold consecutive failures the breaker opens and calls
+    fail immediately with CircuitOpenError. After reset_timeout seconds a single
+    trial call is let through (half-open): success closes the breaker, failure
+    opens it again. Thread-safe, so sync and async clients can share one.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Initialize the breaker
+
+        Args:
+            name: Upstream name used in errors and status, e.g. 'datadog'
+            failure_threshold: Consecutive failures that open the breaker
+            reset_timeout: Seconds the breaker stays open before a trial call
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.failures = 0
+        self.rejected = 0
+        self._opened_at: Optional[float] = None
+        self._opened_wall: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """
+        Reserve permission for one call
+
+        Raises:
+            CircuitOpenError: If the breaker is open, or half-open with its trial call in flight
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            retry_after = self._opened_at + self.reset_timeout - time.monotonic()
+            if self.state == self.OPEN and retry_after <= 0:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                logger.info(f"Circuit breaker {self.name} half-open, sending a trial call")
+                return
+            self.rejected += 1
+        raise CircuitOpenError(f"{self.name} circuit breaker is open, failing fast",
+                               retry_after=max(retry_after, 1.0))
+
+    def record_success(self) -> None:
+        """Report a call that reached the upstream and got a healthy answer"""
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit breaker {self.name} closed after a successful trial call")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """Report a call that failed because the upstream is unreachable, slow or erroring"""
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Circuit breaker {self.name} opened after "
+                                   f"{self.consecutive_failures} consecutive failures")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._opened_wall = time.time()
+
+    def release(self) -> None:
+        """Give back a reserved call that ended without saying anything about the upstream"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def call(self, func: Callable[[], T], is_failure: Callable[[BaseException], bool] = lambda e: True) -> T:
+        """
+        Run func through the breaker
+
+        Args:
+            func: The upstream call
+            is_failure: Whether an exception raised by func counts against the upstream
+
+        Returns:
+            func's result
+        """
+        self.before_call()
+        try:
+            result = func()
+        except BaseException as e:
+            if is_failure(e):
+                self.record_failure()
+            else:
+                self.release()
+            raise
+        self.record_success()
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current state, for health endpoints and load shedding"""
+        with self._lock:
+            retry_after = None
+            opened_at = None
+            if self.state != self.CLOSED and self._opened_at is not None:
+                retry_after = round(max(0.0, self._opened_at + self.reset_timeout - time.monotonic()), 3)
+                opened_at = datetime.fromtimestamp(self._opened_wall, tz=timezone.utc).isoformat()
+            return {
+                "name": self.name,
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "opened_at": opened_at,
+                "retry_after": retry_after,
+                "failures": self.failures,
+                "rejected": self.rejected,
+            }
+
+
+def chat_completion(breaker: CircuitBreaker, client: Any, default_timeout: float, **request) -> Any:
+    """
+    OpenAI chat completion through a breaker, with its timeout capped by the deadline
+
+    Connection errors, timeouts and 5xx responses count against the breaker;
+    other API errors (bad request, rate limit) do not. A timeout that was only
+    hit because the deadline shortened it is reported as DeadlineExceeded.
+
+    Args:
+        breaker: The LLM circuit breaker
+        client: openai.OpenAI client
+        default_timeout: Timeout in seconds without a deadline
+        **request: Arguments for chat.completions.create
+
+    Returns:
+        The completion
+    """
+    import openai
+
+    timeout = timeout_for(default_timeout, "LLM call")
+    limited = timeout < default_timeout
+    # The SDK's own retries would each get the full timeout again, so skip them when time is short
+    options = client.with_options(timeout=timeout, max_retries=0) if limited else client.with_options(timeout=timeout)
+
+    def is_failure(e: BaseException) -> bool:
+        if isinstance(e, openai.APITimeoutError):
+            return not limited
+        return isinstance(e, (openai.APIConnectionError, openai.InternalServerError))
+
+    try:
+        return breaker.call(lambda: options.chat.completions.create(**request), is_failure)
+    except openai.APITimeoutError as e:
+        if limited:
+            raise DeadlineExceeded("Deadline exceeded during LLM call") from e
+        raise
@@ -0,0 +1,186 @@
+"""
+Response Cache
+LRU + TTL cache for single-resource Datadog GETs with conditional revalidation
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Dict, Any, Optional, Tuple, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    body: bytes
+    stored_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+def _resource_modified(value: Any) -> Optional[str]:
+    """
+    HTTP date for a resource's own modification timestamp
+
+    Notebooks carry data.attributes.modified, dashboards modified_at.
+    """
+    if not isinstance(value, dict):
+        return None
+    modified = value.get("modified_at")
+    data = value.get("data")
+    if modified is None and isinstance(data, dict):
+        modified = (data.get("attributes") or {}).get("modified")
+    if not isinstance(modified, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(modified.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return format_datetime(parsed.astimezone(timezone.utc), usegmt=True)
+
+
+class ResponseCache:
+    """
+    Bounded cache of raw response bodies keyed by resource
+
+    Fresh entries (younger than ttl) are served without a request. Stale
+    entries are revalidated with If-None-Match / If-Modified-Since and a 304
+    reply renews them without transferring the body again. Bodies are kept as
+    bytes so every caller gets its own freshly decoded copy.
+
+    Each key has a generation that invalidate() bumps, so a GET that was
+    already in flight when the resource changed cannot store its old body.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 30.0):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries: Maximum number of cached resources (0 disables caching)
+            ttl: Seconds an entry is served without revalidation
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        # Invalidation counts of recently changed keys; bounded well above max_entries
+        self._generations: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._max_generations = max(1024, 4 * max_entries)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def lookup(self, key: Hashable) -> Tuple[Optional[CacheEntry], bool]:
+        """
+        Find a cached entry
+
+        Returns:
+            (entry or None, whether the entry is fresh enough to serve directly)
+        """
+        if not self.enabled:
+            return None, False
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, False
+            self._entries.move_to_end(key)
+            fresh = time.monotonic() - entry.stored_at < self.ttl
+            if fresh:
+                self.hits += 1
+            return entry, fresh
+
+    def generation(self, key: Hashable) -> int:
+        """Invalidation count of a key, taken before a GET and handed to resolve()"""
+        with self._lock:
+            return self._generations.get(key, 0)
+
+    @staticmethod
+    def conditional_headers(entry: Optional[CacheEntry]) -> Dict[str, str]:
+        """Revalidation headers for a stale entry"""
+        if entry is None:
+            return {}
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def resolve(self, key: Hashable, entry: Optional[CacheEntry], response: Any,
+                generation: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Turn a (possibly conditional) GET response into a result, updating the cache
+
+        Args:
+            key: Cache key of the resource
+            entry: Entry the request was revalidating, if any
+            response: requests or httpx response
+            generation: generation(key) from before the request; the body is not
+                stored if the key was invalidated since
+
+        Returns:
+            Decoded resource
+        """
+        if response.status_code == 304 and entry is not None:
+            with self._lock:
+                entry.stored_at = time.monotonic()
+                self.revalidated += 1
+            return json.loads(entry.body)
+
+        value = response.json()
+        if self.enabled:
+            self._store(key, CacheEntry(
+                body=response.content,
+                stored_at=time.monotonic(),
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified") or _resource_modified(value)
+            ), generation)
+        return value
+
+    def _store(self, key: Hashable, entry: CacheEntry, generation: Optional[int] = None) -> None:
+        with self._lock:
+            if generation is not None and self._generations.get(key, 0) != generation:
+                logger.debug(f"Not caching {key}: it changed while the GET was in flight")
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop a resource, e.g. after it was updated or deleted"""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._generations[key] = self._generations.pop(key, 0) + 1
+            while len(self._generations) > self._max_generations:
+                self._generations.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidated": self.revalidated,
+            }
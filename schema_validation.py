@@ -0,0 +1,351 @@
+"""
+Schema Validation
+Structural schemas for notebooks and dashboards, compiled once into single-pass validators that report JSON paths
+"""
+
+import logging
+from typing import Dict, Any, List, Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+# A compiled check appends "<path>: <message>" strings to errors and warnings
+Check = Callable[[Any, str, List[str], List[str]], None]
+
+_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "number": (int, float),
+    "integer": int,
+    "boolean": bool,
+}
+
+# Schemas use a small JSON Schema subset (type, enum, required, properties, items,
+# minItems, minLength) plus a few extensions:
+#   anyRequired: list of alternatives, each a list of fields that must all be present
+#   forbidden: fields that must not be present
+#   recommended: fields whose absence is a warning
+#   deprecated: fields whose presence is a warning
+#   $ref: name of another schema in the same set, allowing recursion (group widgets)
+#   variants: {"key": field, "cases": {value: schema}, "default": schema}; the schema picked
+#             by the object's value for that field is applied to the whole object
+OTHER_WIDGET_REQUEST = {
+    "type": "object",
+    "properties": {
+        "q": {"type": "string", "minLength": 1},
+        "queries": {"type": "array", "minItems": 1, "items": {
+            "type": "object", "required": ["data_source", "name"],
+            "properties": {"name": {"type": "string"}, "data_source": {"type": "string"}}}},
+        "formulas": {"type": "array", "items": {"type": "object", "required": ["formula"]}},
+    },
+}
+
+WIDGET_REQUEST = dict(OTHER_WIDGET_REQUEST, anyRequired=[["q"], ["queries"]])
+
+# Widgets whose requests are metric queries, written as 'q' or as 'queries' + 'formulas'; others
+# (list_stream, slo_list, ...) describe what they show with fields of their own, such as 'query'
+QUERY_WIDGET_TYPES = ("timeseries", "query_value", "toplist", "heatmap", "distribution", "change",
+                      "query_table", "sunburst", "geomap", "treemap")
+
+# Most widgets take a list of requests; a few (scatterplot, hostmap) take an object
+REQUESTS_BY_WIDGET_TYPE = {
+    "key": "type",
+    "cases": {widget_type: {"properties": {"requests": {"type": ["array", "object"], "items": {"$ref": "request"}}}}
+              for widget_type in QUERY_WIDGET_TYPES},
+    "default": {"properties": {"requests": {"type": ["array", "object"], "items": {"$ref": "other_request"}}}},
+}
+
+WIDGET_DEFINITION = {
+    "type": "object",
+    "required": ["type"],
+    "recommended": ["time"],
+    "properties": {
+        "type": {"type": "string", "minLength": 1},
+        "title": {"type": "string"},
+        "widgets": {"type": "array", "items": {"$ref": "widget"}},
+    },
+    "variants": REQUESTS_BY_WIDGET_TYPE,
+}
+
+WIDGET_LAYOUT = {
+    "type": "object",
+    "required": ["x", "y", "width", "height"],
+    "properties": {field: {"type": "integer"} for field in ("x", "y", "width", "height")},
+}
+
+DEPRECATED_DASHBOARD_FIELDS = ["is_read_only", "author_handle", "created_at", "modified_at", "url"]
+
+
+def _dashboard_schemas(layout_type: str) -> Dict[str, Any]:
+    # Ordered dashboards may still carry positions (Datadog keeps them for reflow); free ones need them
+    widget = {
+        "type": "object",
+        "required": ["definition", "layout"] if layout_type == "free" else ["definition"],
+        "properties": {"definition": {"$ref": "definition"}, "layout": WIDGET_LAYOUT},
+    }
+    return {
+        "root": {
+            "type": "object",
+            "required": ["title", "widgets", "layout_type"],
+            "recommended": ["description", "template_variables"],
+            "deprecated": DEPRECATED_DASHBOARD_FIELDS,
+            "properties": {
+                "title": {"type": "string", "minLength": 1},
+                "layout_type": {"type": "string", "enum": ["ordered", "free"]},
+                "description": {"type": ["string", "null"]},
+                "widgets": {"type": "array", "items": {"$ref": "widget"}},
+                "template_variables": {"type": "array", "items": {"type": "object", "required": ["name"]}},
+            },
+        },
+        "widget": widget,
+        "definition": WIDGET_DEFINITION,
+        "request": WIDGET_REQUEST,
+        "other_request": OTHER_WIDGET_REQUEST,
+    }
+
+
+NOTEBOOK_SCHEMAS = {
+    "root": {
+        "type": "object",
+        "required": ["data"],
+        "properties": {"data": {
+            "type": "object",
+            "required": ["type", "attributes"],
+            "properties": {
+                "type": {"type": "string", "enum": ["notebooks"]},
+                "attributes": {
+                    "type": "object",
+                    "required": ["name", "cells"],
+                    "recommended": ["time", "metadata"],
+                    "properties": {
+                        "name": {"type": "string", "minLength": 1},
+                        "cells": {"type": "array", "items": {"$ref": "cell"}},
+                        "time": {"type": "object"},
+                        "metadata": {"type": "object"},
+                    },
+                },
+            },
+        }},
+    },
+    "cell": {
+        "type": "object",
+        "required": ["type", "attributes"],
+        "properties": {
+            "type": {"type": "string", "enum": ["notebook_cells"]},
+            "attributes": {
+                "type": "object",
+                "required": ["definition"],
+                "properties": {"definition": {
+                    "type": "object",
+                    "required": ["type"],
+                    "properties": {
+                        "type": {"type": "string", "minLength": 1},
+                    },
+                    "variants": REQUESTS_BY_WIDGET_TYPE,
+                }},
+            },
+        },
+    },
+    "request": WIDGET_REQUEST,
+    "other_request": OTHER_WIDGET_REQUEST,
+}
+
+
+def _type_name(value: Any) -> str:
+    if value is None:
+        return "null"
+    for name, python_type in _TYPES.items():
+        if isinstance(value, python_type) and not (name in ("number", "integer") and isinstance(value, bool)):
+            return name
+    return type(value).__name__
+
+
+def compile_schema(schemas: Dict[str, Any], root: str = "root") -> Check:
+    """
+    Compile a named set of schemas into a validator function
+
+    Each schema node becomes a closure that checks only what that node declares,
+    so validating a payload is a single walk with no schema interpretation.
+
+    Args:
+        schemas: Schema name -> schema; "$ref" values refer to these names
+        root: Name of the schema to validate payloads against
+
+    Returns:
+        check(value, path, errors, warnings)
+    """
+    compiled: Dict[str, Check] = {}
+
+    def ref(name: str) -> Check:
+        if name not in schemas:
+            raise ValueError(f"Unknown schema reference: {name}")
+
+        # Resolved on first call so schemas can refer to each other recursively
+        def check(value, path, errors, warnings):
+            compiled[name](value, path, errors, warnings)
+        return check
+
+    def build(schema: Dict[str, Any]) -> Check:
+        if "$ref" in schema:
+            return ref(schema["$ref"])
+
+        steps: List[Check] = []
+
+        types = schema.get("type")
+        if types is not None:
+            names = (types,) if isinstance(types, str) else tuple(types)
+            python_types = tuple(_TYPES[name] for name in names if name != "null")
+            allow_null = "null" in names
+            allow_bool = "boolean" in names
+            expected = " or ".join(names)
+        else:
+            python_types, allow_null, allow_bool, expected = None, False, False, ""
+
+        enum = schema.get("enum")
+        min_length = schema.get("minLength")
+        min_items = schema.get("minItems")
+        required = tuple(schema.get("required", ()))
+        any_required = [tuple(group) for group in schema.get("anyRequired", ())]
+        forbidden = tuple(schema.get("forbidden", ()))
+        recommended = tuple(schema.get("recommended", ()))
+        deprecated = tuple(schema.get("deprecated", ()))
+        properties = [(key, build(sub)) for key, sub in schema.get("properties", {}).items()]
+        items = build(schema["items"]) if "items" in schema else None
+        variants = schema.get("variants")
+
+        if enum is not None:
+            allowed = ", ".join(str(option) for option in enum)
+
+            def check_enum(value, path, errors, warnings):
+                if value not in enum:
+                    errors.append(f"{path}: must be one of: {allowed}")
+            steps.append(check_enum)
+
+        if min_length is not None:
+            def check_length(value, path, errors, warnings):
+                if isinstance(value, str) and len(value) < min_length:
+                    errors.append(f"{path}: must not be empty")
+            steps.append(check_length)
+
+        if required or any_required or forbidden or recommended or deprecated or properties:
+            def check_object(value, path, errors, warnings):
+                if not isinstance(value, dict):
+                    return
+                for key in required:
+                    if key not in value:
+                        errors.append(f"{path}: missing required field '{key}'")
+                if any_required and not any(all(key in value for key in group) for group in any_required):
+                    options = " or ".join("+".join(f"'{key}'" for key in group) for group in any_required)
+                    errors.append(f"{path}: missing {options}")
+                for key in forbidden:
+                    if key in value:
+                        errors.append(f"{path}: field '{key}' is not allowed here")
+                for key in recommended:
+                    if key not in value:
+                        warnings.append(f"{path}: no '{key}' specified, will use default")
+                for key in deprecated:
+                    if key in value:
+                        warnings.append(f"{path}: field '{key}' is deprecated and will be removed")
+                for key, sub_check in properties:
+                    if key in value:
+                        sub_check(value[key], f"{path}.{key}", errors, warnings)
+            steps.append(check_object)
+
+        if variants is not None:
+            key = variants["key"]
+            cases = {value: build(sub) for value, sub in variants.get("cases", {}).items()}
+            default = build(variants["default"]) if "default" in variants else None
+
+            def check_variant(value, path, errors, warnings):
+                if not isinstance(value, dict):
+                    return
+                selected = value.get(key)
+                variant = cases.get(selected, default) if isinstance(selected, str) else default
+                if variant is not None:
+                    variant(value, path, errors, warnings)
+            steps.append(check_variant)
+
+        if min_items is not None or items is not None:
+            def check_array(value, path, errors, warnings):
+                if not isinstance(value, list):
+                    return
+                if min_items is not None and len(value) < min_items:
+                    errors.append(f"{path}: must have at least {min_items} item(s)")
+                if items is not None:
+                    for index, item in enumerate(value):
+                        items(item, f"{path}[{index}]", errors, warnings)
+            steps.append(check_array)
+
+        steps = tuple(steps)
+
+        def check(value, path, errors, warnings):
+            if python_types is not None:
+                if value is None:
+                    if not allow_null:
+                        errors.append(f"{path}: expected {expected}, got null")
+                    return
+                if not isinstance(value, python_types) or (isinstance(value, bool) and not allow_bool):
+                    errors.append(f"{path}: expected {expected}, got {_type_name(value)}")
+                    return
+            for step in steps:
+                step(value, path, errors, warnings)
+        return check
+
+    for name, schema in schemas.items():
+        compiled[name] = build(schema)
+    return compiled[root]
+
+
+_notebook_check = compile_schema(NOTEBOOK_SCHEMAS)
+_dashboard_checks = {layout: compile_schema(_dashboard_schemas(layout)) for layout in ("ordered", "free")}
+
+
+def _result(check: Check, payload: Any) -> Dict[str, Any]:
+    errors: List[str] = []
+    warnings: List[str] = []
+    check(payload, "$", errors, warnings)
+    return {"valid": not errors, "errors": errors, "warnings": warnings}
+
+
+def validate_notebook(notebook_data: Any) -> Dict[str, Any]:
+    """
+    Validate a notebook payload, collecting every error with its JSON path
+
+    Returns:
+        {"valid": bool, "errors": ["$.data.attributes.cells[0]: ..."], "warnings": [...]}
+    """
+    return _result(_notebook_check, notebook_data)
+
+
+def validate_dashboard(dashboard_data: Any) -> Dict[str, Any]:
+    """
+    Validate a dashboard payload, collecting every error with its JSON path
+
+    Widget layout rules follow the dashboard's layout_type: free layouts need
+    a position per widget, ordered layouts may have one. Requests must carry
+    'q' or 'queries' only for widget types built on metric queries.
+
+    Returns:
+        {"valid": bool, "errors": ["$.widgets[2].definition: ..."], "warnings": [...]}
+    """
+    layout_type = dashboard_data.get("layout_type") if isinstance(dashboard_data, dict) else None
+    return _result(_dashboard_checks["free" if layout_type == "free" else "ordered"], dashboard_data)
+
+
+VALIDATORS = {"notebook": validate_notebook, "dashboard": validate_dashboard}
+
+
+def validate_many(items: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Validate {"kind": "notebook" | "dashboard", "definition": {...}} items
+
+    Module-level so that batches can be sent to worker processes.
+    """
+    results = []
+    for item in items:
+        validator = VALIDATORS.get(item.get("kind"))
+        if validator is None:
+            results.append({"valid": False, "errors": [f"$: unknown kind {item.get('kind')!r}"], "warnings": []})
+        else:
+            results.append(validator(item.get("definition")))
+    return results
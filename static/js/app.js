@@ -2,6 +2,24 @@
 let currentNotebookData = null;
 let currentRequestData = null;
 
+// Idempotency key of the last submission that has not succeeded yet; resubmitting the
+// same request (double-click, retry after an error) reuses it so nothing is created twice
+let pendingSubmission = null;
+
+function newIdempotencyKey() {
+    if (window.crypto && typeof window.crypto.randomUUID === 'function') {
+        return window.crypto.randomUUID();
+    }
+    return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+}
+
+function idempotencyKeyFor(endpoint, body) {
+    if (!pendingSubmission || pendingSubmission.endpoint !== endpoint || pendingSubmission.body !== body) {
+        pendingSubmission = { endpoint, body, key: newIdempotencyKey() };
+    }
+    return pendingSubmission.key;
+}
+
 // Global variable to store integration patterns
 let integrationPatterns = {};
 
@@ -446,12 +464,14 @@ async function handleFormSubmission(event) {
         hideMessages();
 
         const endpoint = selectedMode === 'dashboard' ? '/generate-dashboard' : '/generate';
+        const body = JSON.stringify(requestData);
         const response = await fetch(endpoint, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
+                'Idempotency-Key': idempotencyKeyFor(endpoint, body),
             },
-            body: JSON.stringify(requestData)
+            body
         });
 
         const result = await response.json();
@@ -460,6 +480,9 @@ async function handleFormSubmission(event) {
             throw new Error(result.detail || `HTTP error! status: ${response.status}`);
         }
 
+        // A later submission of the same form is a new request
+        pendingSubmission = null;
+
         // Store the generated data
         if (selectedMode === 'dashboard') {
             currentNotebookData = result.dashboard_json;
@@ -0,0 +1,280 @@
+"""
+Tenant Registry
+Per-org Datadog clients created on first use, rate-limited independently and closed when idle
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Any, AsyncIterator, Callable, List, Optional, Tuple
+
+from async_datadog_client import AsyncDatadogClient
+from datadog_client import DatadogClient, DatadogPayloadMixin, PreparedPayload
+
+logger = logging.getLogger(__name__)
+
+# Org names appear in URL paths and headers, so keep them to a safe alphabet
+TENANT_NAME_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+ClientFactory = Callable[["TenantConfig"], Tuple[DatadogClient, AsyncDatadogClient]]
+
+
+class UnknownTenant(KeyError):
+    """The requested org is not configured"""
+
+
+@dataclass(frozen=True)
+class TenantConfig:
+    """Credentials and site of one Datadog org"""
+    name: str
+    api_key: str
+    app_key: str
+    base_url: str = "https://api.datadoghq.com"
+
+
+@dataclass
+class TenantClients:
+    """The live clients of one org and their usage"""
+    config: TenantConfig
+    client: DatadogClient
+    async_client: AsyncDatadogClient
+    # MetricAnalysisService over client, built by main on the org's first analysis request
+    metric_analysis: Optional[Any] = None
+    created_at: float = field(default_factory=time.time)
+    last_used: float = field(default_factory=time.monotonic)
+    in_flight: int = 0
+    requests: int = 0
+
+
+# Clients of the org the current request targets; None means the deployment's default org
+current_tenant: ContextVar[Optional[TenantClients]] = ContextVar("current_tenant", default=None)
+
+
+def load_tenants(path: str) -> Dict[str, TenantConfig]:
+    """
+    Read org credentials from a JSON file
+
+    The file maps org names to {"api_key", "app_key", "base_url"}. Keys can be
+    given indirectly as "api_key_env"/"app_key_env", naming environment
+    variables, so the file itself need not hold secrets.
+
+    Args:
+        path: JSON file path
+
+    Returns:
+        Configs keyed by org name
+    """
+    with open(path) as f:
+        raw = json.load(f)
+    if not isinstance(raw, dict):
+        raise ValueError(f"{path} must contain a JSON object of org name -> credentials")
+
+    tenants = {}
+    for name, entry in raw.items():
+        if not TENANT_NAME_RE.match(name):
+            raise ValueError(f"Invalid org name {name!r} in {path}")
+        api_key = entry.get("api_key") or os.getenv(entry.get("api_key_env", ""), "")
+        app_key = entry.get("app_key") or os.getenv(entry.get("app_key_env", ""), "")
+        if not api_key or not app_key:
+            raise ValueError(f"Org {name!r} in {path} is missing its API or application key")
+        tenants[name] = TenantConfig(name, api_key, app_key,
+                                     entry.get("base_url", "https://api.datadoghq.com"))
+    return tenants
+
+
+class TenantRegistry:
+    """
+    Lazily built Datadog clients for many orgs in one process
+
+    Each org's clients are created on its first request by the factory, which
+    gives them their own connection pool, rate limiter, caches and circuit
+    breaker, so one org exhausting its Datadog budget does not slow another.
+    Clients unused for idle_ttl seconds (and with no request in flight) are
+    closed and rebuilt on the next request.
+    """
+
+    def __init__(self, tenants: Dict[str, TenantConfig], factory: ClientFactory, idle_ttl: float = 900.0,
+                 eviction_interval: float = 60.0):
+        """
+        Initialize the registry
+
+        Args:
+            tenants: Org configs keyed by name
+            factory: Builds the (sync, async) client pair for an org
+            idle_ttl: Seconds without requests after which an org's clients are closed
+            eviction_interval: Seconds between background idle sweeps
+        """
+        self.tenants = dict(tenants)
+        self.factory = factory
+        self.idle_ttl = idle_ttl
+        self.eviction_interval = eviction_interval
+        self.created = 0
+        self.evicted = 0
+        self._active: Dict[str, TenantClients] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.tenants
+
+    def get(self, name: str) -> TenantClients:
+        """
+        Clients of an org, building them on first use
+
+        Raises:
+            UnknownTenant: If the org is not configured
+        """
+        config = self.tenants.get(name)
+        if config is None:
+            raise UnknownTenant(name)
+        with self._lock:
+            tenant = self._active.get(name)
+            if tenant is None:
+                client, async_client = self.factory(config)
+                tenant = TenantClients(config, client, async_client)
+                self._active[name] = tenant
+                self.created += 1
+                logger.info(f"Created Datadog clients for org {name}")
+            tenant.last_used = time.monotonic()
+            return tenant
+
+    def acquire(self, name: str) -> TenantClients:
+        """Clients of an org, marked in use until release() so they are not evicted mid-request"""
+        tenant = self.get(name)
+        with self._lock:
+            tenant.in_flight += 1
+            tenant.requests += 1
+        return tenant
+
+    def release(self, tenant: TenantClients) -> None:
+        with self._lock:
+            tenant.in_flight -= 1
+            tenant.last_used = time.monotonic()
+
+    async def deploy(self, prepared: PreparedPayload, orgs: List[str],
+                     max_concurrency: int = 16) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Create one prepared notebook or dashboard in many orgs
+
+        Each org's request goes through that org's own client, so it is paced
+        by that org's rate limiter and breaker. Outcomes are yielded as they
+        complete, not in input order. Closing the iterator early cancels the
+        deployments still pending.
+
+        Args:
+            prepared: Payload from datadog_client.prepare_payload
+            orgs: Target org names
+            max_concurrency: Maximum orgs being deployed to at once
+
+        Yields:
+            Per-org outcome: org, index in orgs, success, created id or error, elapsed_ms
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def deploy_one(index: int, name: str) -> Dict[str, Any]:
+            async with semaphore:
+                started = time.monotonic()
+                try:
+                    tenant = self.acquire(name)
+                except UnknownTenant:
+                    result = {"error": f"Unknown Datadog org: {name}", "status_code": 404}
+                else:
+                    try:
+                        result = await tenant.async_client.create_prepared(prepared)
+                    except Exception as e:
+                        # Open breaker or exceeded deadline: report it for this org and carry on
+                        logger.error(f"Deploying {prepared.kind} to org {name} failed: {str(e)}")
+                        result = {"error": str(e), "status_code": getattr(e, "status_code", None)}
+                    finally:
+                        self.release(tenant)
+            outcome = DatadogPayloadMixin._bulk_item_result(index, result)
+            return {"org": name, **outcome, "elapsed_ms": round((time.monotonic() - started) * 1000, 1)}
+
+        tasks = [asyncio.ensure_future(deploy_one(index, name)) for index, name in enumerate(orgs)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def evict_idle(self) -> List[str]:
+        """
+        Close the clients of orgs idle for longer than idle_ttl
+
+        Returns:
+            Names of the evicted orgs
+        """
+        cutoff = time.monotonic() - self.idle_ttl
+        with self._lock:
+            idle = [name for name, tenant in self._active.items()
+                    if tenant.in_flight == 0 and tenant.last_used <= cutoff]
+            evicted = [self._active.pop(name) for name in idle]
+            self.evicted += len(evicted)
+        for tenant in evicted:
+            await self._close(tenant)
+            logger.info(f"Closed idle Datadog clients for org {tenant.config.name}")
+        return idle
+
+    async def _close(self, tenant: TenantClients) -> None:
+        if tenant.metric_analysis is not None:
+            await tenant.metric_analysis.aclose()
+        tenant.async_client.applied_hashes.flush()
+        await tenant.async_client.aclose()
+        tenant.client.session.close()
+
+    def start(self) -> None:
+        """Start the background idle sweep on the running event loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._loop())
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.eviction_interval)
+            try:
+                await self.evict_idle()
+            except Exception as e:
+                logger.error(f"Idle org eviction failed: {str(e)}")
+
+    async def aclose(self) -> None:
+        """Stop the sweep and close every org's clients"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        with self._lock:
+            active = list(self._active.values())
+            self._active.clear()
+        for tenant in active:
+            await self._close(tenant)
+
+    def stats(self) -> Dict[str, Any]:
+        """Configured orgs and the state of their live clients, without credentials"""
+        now = time.monotonic()
+        with self._lock:
+            active = dict(self._active)
+        orgs = {}
+        for name, config in self.tenants.items():
+            tenant = active.get(name)
+            entry: Dict[str, Any] = {"base_url": config.base_url, "active": tenant is not None}
+            if tenant is not None:
+                entry.update({
+                    "created_at": datetime.fromtimestamp(tenant.created_at, tz=timezone.utc).isoformat(),
+                    "idle_seconds": round(now - tenant.last_used, 3),
+                    "in_flight": tenant.in_flight,
+                    "requests": tenant.requests,
+                    "circuit_breaker": tenant.async_client.circuit_breaker.snapshot(),
+                })
+            orgs[name] = entry
+        return {"orgs": orgs, "active": len(active), "created": self.created, "evicted": self.evicted,
+                "idle_ttl": self.idle_ttl}
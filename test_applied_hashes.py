@@ -0,0 +1,104 @@
+"""
+Test script for content-hash change detection on notebook and dashboard updates
+Runs the clients against the fake Datadog server and counts the PUTs that reach it
+"""
+
+import asyncio
+
+import pytest
+
+from applied_hashes import AppliedHashStore, canonical_hash
+from async_datadog_client import AsyncDatadogClient
+from datadog_client import DatadogClient
+from fake_datadog_server import FakeDatadogServer
+from rate_limiter import RateLimiter
+
+
+def dashboard(title, widgets=2):
+    return {"title": title, "layout_type": "ordered",
+            "widgets": [{"definition": {"type": "note", "content": f"{title} {i}"}} for i in range(widgets)]}
+
+
+def puts(server, path="/api/v1/dashboard/{id}"):
+    return server.state.stats()["requests"].get(f"PUT {path}", 0)
+
+
+def test_canonical_hash_ignores_key_order_and_read_only_fields():
+    client = DatadogClient("fake", "fake", "http://127.0.0.1:9")
+    a = client._clean_dashboard_data_for_creation({"title": "T", "layout_type": "ordered", "widgets": []})
+    b = client._clean_dashboard_data_for_creation({"widgets": [], "id": "abc", "layout_type": "ordered",
+                                                  "title": "T", "modified_at": "2024-01-01"})
+    assert canonical_hash(a) == canonical_hash(b)
+    assert canonical_hash(a) != canonical_hash(dict(a, title="U"))
+
+
+def test_unchanged_update_is_skipped():
+    with FakeDatadogServer(dashboards=0) as server:
+        client = DatadogClient("fake", "fake", server.url)
+        dashboard_id = client.create_dashboard(dashboard("A"))["id"]
+
+        skipped = client.update_dashboard(dashboard_id, dashboard("A"))
+        applied = client.update_dashboard(dashboard_id, dashboard("B"))
+        again = client.update_dashboard(dashboard_id, dashboard("B"))
+        forced = client.update_dashboard(dashboard_id, dashboard("B"), force=True)
+
+        assert skipped["skipped"] and again["skipped"]
+        assert applied["title"] == "B" and forced["title"] == "B"
+        assert puts(server) == 2
+        assert client.applied_hashes.stats()["skipped"] == 2
+
+
+def test_failed_update_is_retried_on_next_sync():
+    def notebook(name):
+        return {"data": {"type": "notebooks", "attributes": {"name": name, "cells": []}}}
+
+    with FakeDatadogServer(notebooks=1) as server:
+        client = DatadogClient("fake", "fake", server.url, rate_limiter=RateLimiter(max_retries=0))
+        client.update_notebook("1", notebook("N"))
+
+        server.state.fail_next(1, status=500)
+        assert "error" in client.update_notebook("1", notebook("N2"))
+        assert not client.update_notebook("1", notebook("N2")).get("skipped")
+        assert puts(server, "/api/v1/notebooks/{id}") == 3
+
+
+def test_bulk_sync_reports_applied_skipped_and_failed():
+    with FakeDatadogServer(dashboards=0) as server:
+        client = DatadogClient("fake", "fake", server.url, rate_limiter=RateLimiter(max_retries=0))
+        ids = [client.create_dashboard(dashboard(f"D{i}"))["id"] for i in range(6)]
+
+        updates = [(ids[i], dashboard(f"D{i}" if i < 3 else f"D{i} v2")) for i in range(6)]
+        updates.append(("999-999-999", dashboard("missing")))
+        summary = client.bulk_update_dashboards(updates, max_concurrency=4)
+
+        assert (summary["applied"], summary["skipped"], summary["failed"]) == (3, 3, 1)
+        assert summary["succeeded"] == 6
+        assert [item.get("skipped", False) for item in summary["results"][:6]] == [True] * 3 + [False] * 3
+
+        resync = client.bulk_update_dashboards(updates[:6])
+        assert (resync["applied"], resync["skipped"]) == (0, 6)
+
+
+def test_async_client_and_persisted_record(tmp_path):
+    path = str(tmp_path / "applied.json")
+
+    async def run(url, store):
+        async with AsyncDatadogClient("fake", "fake", url, applied_hashes=store) as client:
+            created = await client.create_dashboard(dashboard("A"))
+            summary = await client.bulk_update_dashboards([(created["id"], dashboard("A"))])
+            return created["id"], summary
+
+    with FakeDatadogServer(dashboards=0) as server:
+        dashboard_id, summary = asyncio.run(run(server.url, AppliedHashStore(path)))
+        assert summary["skipped"] == 1
+
+        # A restarted process reads the record back and still skips the no-op update
+        restarted = DatadogClient("fake", "fake", server.url, applied_hashes=AppliedHashStore(path))
+        assert restarted.update_dashboard(dashboard_id, dashboard("A"))["skipped"]
+        assert restarted.delete_dashboard(dashboard_id)["success"]
+        assert restarted.applied_hashes.stats()["resources"] == 0
+        assert puts(server) == 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
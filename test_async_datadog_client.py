@@ -0,0 +1,100 @@
+"""
+Test script for the async Datadog client
+Includes a small load test against a slow local stand-in for the Datadog API
+"""
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+import main
+from async_datadog_client import AsyncDatadogClient
+
+LATENCY = 0.3
+CONCURRENT_REQUESTS = 10
+
+
+class SlowDatadogHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        time.sleep(LATENCY)
+        path = self.path.split("?")[0]
+        if path.startswith("/api/v1/notebooks/missing"):
+            self._send(404, {"errors": ["Notebook not found"]})
+        elif path.startswith("/api/v1/notebooks/"):
+            self._send(200, {"data": {"id": int(path.rsplit("/", 1)[1]), "type": "notebooks"}})
+        else:
+            self._send(200, {"data": [], "meta": {"page": {"total_count": 0}}})
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), SlowDatadogHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_concurrent_client_calls_overlap(server):
+    async def run():
+        async with AsyncDatadogClient("api", "app", server) as client:
+            start = time.perf_counter()
+            results = await asyncio.gather(*(client.get_notebook(str(i)) for i in range(CONCURRENT_REQUESTS)))
+            return results, time.perf_counter() - start
+
+    results, elapsed = asyncio.run(run())
+
+    assert [r["data"]["id"] for r in results] == list(range(CONCURRENT_REQUESTS))
+    # Sequential calls would take CONCURRENT_REQUESTS * LATENCY
+    assert elapsed < CONCURRENT_REQUESTS * LATENCY / 2
+
+
+def test_error_results_match_sync_client(server):
+    async def run():
+        async with AsyncDatadogClient("api", "app", server) as client:
+            return await client.get_notebook("missing")
+
+    result = asyncio.run(run())
+    assert result == {"error": {"errors": ["Notebook not found"]}, "status_code": 404}
+
+
+def test_routes_serve_concurrent_requests(server, monkeypatch):
+    async def run():
+        monkeypatch.setattr(main, "async_datadog_client", AsyncDatadogClient("api", "app", server))
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app") as http:
+            start = time.perf_counter()
+            responses = await asyncio.gather(*(http.get(f"/notebooks/{i}") for i in range(CONCURRENT_REQUESTS)))
+            elapsed = time.perf_counter() - start
+        await main.async_datadog_client.aclose()
+        return responses, elapsed
+
+    responses, elapsed = asyncio.run(run())
+
+    assert all(r.status_code == 200 for r in responses)
+    print(f"{CONCURRENT_REQUESTS} concurrent /notebooks/{{id}} requests in {elapsed:.2f}s "
+          f"(sequential floor {CONCURRENT_REQUESTS * LATENCY:.2f}s)")
+    assert elapsed < CONCURRENT_REQUESTS * LATENCY / 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q", "-s"]))
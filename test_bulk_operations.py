@@ -0,0 +1,159 @@
+"""
+Test script for bulk notebook and dashboard operations
+Runs against a local stand-in that tracks how many requests are in flight
+"""
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+import main
+from async_datadog_client import AsyncDatadogClient
+from datadog_client import DatadogClient
+
+LATENCY = 0.05
+
+
+class BulkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    lock = threading.Lock()
+    in_flight = 0
+    peak = 0
+    next_id = 0
+
+    @classmethod
+    def reset(cls):
+        with cls.lock:
+            cls.in_flight = cls.peak = cls.next_id = 0
+
+    def _handle(self):
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.peak = max(cls.peak, cls.in_flight)
+            cls.next_id += 1
+            new_id = cls.next_id
+        try:
+            time.sleep(LATENCY)
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length)) if length else {}
+            path = self.path.split("?")[0]
+            name = json.dumps(payload)
+
+            if "fail" in name or path.endswith("/missing"):
+                self._send(400 if self.command != "DELETE" else 404, {"errors": ["Rejected"]})
+            elif self.command == "DELETE":
+                self._send(204, None)
+            elif path.startswith("/api/v1/notebooks"):
+                self._send(200, {"data": {"id": new_id, "type": "notebooks"}})
+            else:
+                self._send(200, {"id": f"abc-{new_id}", "title": payload.get("title")})
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+    do_POST = do_PUT = do_DELETE = _handle
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode() if payload is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), BulkHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def notebook(name):
+    return {"data": {"type": "notebooks", "attributes": {"name": name, "cells": [], "time": {"live_span": "1h"}}}}
+
+
+def dashboard(title):
+    return {"title": title, "layout_type": "ordered", "widgets": []}
+
+
+def test_sync_bulk_create_reports_each_item(server):
+    BulkHandler.reset()
+    client = DatadogClient("api", "app", server)
+    names = [f"nb-{i}" if i % 5 else f"fail-{i}" for i in range(20)]
+
+    summary = client.bulk_create_notebooks([notebook(n) for n in names], max_concurrency=4)
+
+    assert summary["total"] == 20
+    assert summary["failed"] == 4
+    assert [item["index"] for item in summary["results"]] == list(range(20))
+    assert all(item["success"] == (i % 5 != 0) for i, item in enumerate(summary["results"]))
+    assert all(item["id"] for item in summary["results"] if item["success"])
+    assert summary["results"][0]["status_code"] == 400
+    assert BulkHandler.peak <= 4
+
+
+def test_async_bulk_update_and_delete(server):
+    BulkHandler.reset()
+
+    async def run():
+        async with AsyncDatadogClient("api", "app", server, bulk_concurrency=3) as client:
+            updated = await client.bulk_update_dashboards([(f"d{i}", dashboard(f"t{i}")) for i in range(9)])
+            deleted = await client.bulk_delete_dashboards(["d1", "missing", "d2"])
+            return updated, deleted
+
+    updated, deleted = asyncio.run(run())
+
+    assert updated["succeeded"] == 9
+    assert [item["id"] for item in updated["results"]] == [f"d{i}" for i in range(9)]
+    assert BulkHandler.peak <= 3
+    assert [item["success"] for item in deleted["results"]] == [True, False, True]
+    assert deleted["results"][1]["status_code"] == 404
+
+
+def test_invalid_dashboard_does_not_abort_the_rest(server):
+    BulkHandler.reset()
+
+    async def run():
+        async with AsyncDatadogClient("api", "app", server) as client:
+            return await client.bulk_create_dashboards([dashboard("ok"), {"title": "no widgets"}, dashboard("ok2")])
+
+    summary = asyncio.run(run())
+    assert [item["success"] for item in summary["results"]] == [True, False, True]
+    assert summary["results"][1]["validation_errors"]
+
+
+def test_bulk_routes(server, monkeypatch):
+    BulkHandler.reset()
+
+    async def run():
+        monkeypatch.setattr(main, "async_datadog_client", AsyncDatadogClient("api", "app", server))
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app") as http:
+            created = await http.post("/notebooks/bulk", json={
+                "items": [notebook("a"), notebook("fail")], "max_concurrency": 2})
+            empty = await http.post("/dashboards/bulk/delete", json={"ids": []})
+        await main.async_datadog_client.aclose()
+        return created, empty
+
+    created, empty = asyncio.run(run())
+    assert created.status_code == 200
+    assert created.json()["succeeded"] == 1
+    assert created.json()["failed"] == 1
+    assert empty.status_code == 400
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,86 @@
+"""
+Test script for the vectorized coverage matrix engine
+"""
+
+import csv
+import io
+from coverage_matrix import CoverageMatrixEngine
+from metric_analysis_service import MetricAnalysisService
+
+
+INTEGRATIONS = {
+    "system": ["system.cpu.user", "system.mem.used", "system.load.1", "system.disk.used"],
+    "nginx": ["nginx.net.connections", "nginx.net.request_per_s"],
+    "empty": [],
+}
+
+
+def test_coverage_matrix_fractions():
+    engine = CoverageMatrixEngine(INTEGRATIONS)
+    matrix = engine.compute({
+        "acme": ["system.cpu.user", "system.mem.used", "nginx.net.connections", "custom.metric"],
+        "globex": [],
+    })
+
+    assert matrix.integrations == ["system", "nginx"]
+    assert matrix.values.shape == (2, 2)
+    assert matrix.values[0].tolist() == [0.5, 0.5]
+    assert matrix.values[1].tolist() == [0.0, 0.0]
+    assert matrix.reported_metric_counts[0].tolist() == [2, 1]
+
+
+def test_coverage_matrix_exports():
+    engine = CoverageMatrixEngine(INTEGRATIONS)
+    matrix = engine.compute({"acme": ["nginx.net.connections", "nginx.net.request_per_s"]})
+
+    as_dict = matrix.to_dict()
+    assert as_dict["coverage"]["acme"] == {"system": 0.0, "nginx": 1.0}
+    assert as_dict["integration_metric_counts"] == {"system": 4, "nginx": 2}
+
+    rows = list(csv.reader(io.StringIO(matrix.to_csv())))
+    assert rows[0] == ["customer_id", "system", "nginx"]
+    assert rows[1] == ["acme", "0.0000", "1.0000"]
+
+
+def test_service_coverage_matrix_uses_metric_csvs_and_caches():
+    calls = []
+
+    class FakeDatadogClient:
+        def get_active_metrics(self):
+            calls.append(1)
+            return {"data": [{"type": "metrics", "id": "system.cpu.user"}]}
+
+    service = MetricAnalysisService(FakeDatadogClient())
+    matrix = service.get_coverage_matrix()
+
+    assert matrix.customers == ["default"]
+    assert "system" in matrix.integrations
+    system_column = matrix.integrations.index("system")
+    assert 0 < matrix.values[0, system_column] < 1
+
+    assert service.get_coverage_matrix() is matrix
+    assert len(calls) == 1
+
+
+def test_service_coverage_cache_keeps_the_most_recent_matrices():
+    class FakeDatadogClient:
+        def get_active_metrics(self):
+            return {"data": [{"type": "metrics", "id": "system.cpu.user"}]}
+
+    service = MetricAnalysisService(FakeDatadogClient(), coverage_cache_size=2)
+    first = service.get_coverage_matrix(["a"])
+    second = service.get_coverage_matrix(["b"])
+    assert service.get_coverage_matrix(["a"]) is first  # "a" is now the most recently used
+    service.get_coverage_matrix(["a", "b"])
+
+    assert list(service._coverage_cache) == [("a",), ("a", "b")]
+    assert service.get_coverage_matrix(["a"]) is first
+    assert service.get_coverage_matrix(["b"]) is not second
+
+
+if __name__ == "__main__":
+    test_coverage_matrix_fractions()
+    test_coverage_matrix_exports()
+    test_service_coverage_matrix_uses_metric_csvs_and_caches()
+    test_service_coverage_cache_keeps_the_most_recent_matrices()
+    print("✅ Coverage matrix tests passed")
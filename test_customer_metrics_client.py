@@ -0,0 +1,124 @@
+"""
+Test script for the async customer metrics client
+Runs against a local stand-in HTTP server
+"""
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from customer_metrics_client import AsyncCustomerMetricsClient, StreamingMetricListDecoder
+from metric_analysis_service import MetricAnalysisService
+
+LARGE_INVENTORY = [f"custom.metric.number_{i}" for i in range(50000)]
+
+RESPONSES = {
+    "/list": json.dumps(["system.cpu.user", "system.mem.used"]),
+    "/metrics": json.dumps({"total": 2, "tags": {"env": ["prod"]}, "metrics": ["a.b", "c.d"]}),
+    "/data": json.dumps({"data": [{"type": "metrics", "id": "x.y"}], "meta": {}}),
+    "/large": json.dumps(LARGE_INVENTORY),
+    "/unexpected": json.dumps({"items": []}),
+}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/slow":
+            time.sleep(1.0)
+        body = RESPONSES.get(path, RESPONSES["/list"]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        # Write in small pieces so the client sees many chunks
+        for start in range(0, len(body), 4096):
+            self.wfile.write(body[start:start + 4096])
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def fetch(url_template, customer_ids, **kwargs):
+    async def run():
+        async with AsyncCustomerMetricsClient(url_template, **kwargs) as client:
+            return await asyncio.gather(*(client.fetch_metrics(c) for c in customer_ids))
+    return asyncio.run(run())
+
+
+def test_decoder_handles_every_chunk_boundary():
+    body = json.dumps({"skip": [1, {"n": 2.5}], "metrics": ["a.b", "cé.d", 12345]}).encode()
+    for size in (1, 2, 3, 7, len(body)):
+        decoder = StreamingMetricListDecoder()
+        for start in range(0, len(body), size):
+            decoder.feed(body[start:start + size])
+        assert decoder.close() == ["a.b", "cé.d", 12345]
+
+
+def test_decoder_rejects_truncated_body():
+    decoder = StreamingMetricListDecoder()
+    decoder.feed(b'["a.b", "c.d"')
+    with pytest.raises(ValueError):
+        decoder.close()
+
+
+def test_response_formats(server):
+    results = fetch(server + "/{customer_id}", ["list", "metrics", "data", "unexpected"])
+    assert results == [
+        ["system.cpu.user", "system.mem.used"],
+        ["a.b", "c.d"],
+        [{"type": "metrics", "id": "x.y"}],
+        [],
+    ]
+
+
+def test_large_body_and_connection_reuse(server):
+    StandInHandler.connections = 0
+    results = fetch(server + "/large?c={customer_id}", [str(i) for i in range(20)], max_connections_per_host=2)
+    assert all(r == LARGE_INVENTORY for r in results)
+    assert StandInHandler.connections <= 2
+
+
+def test_read_timeout_is_separate_from_connect_timeout(server):
+    with pytest.raises(httpx.ReadTimeout):
+        fetch(server + "/{customer_id}", ["slow"], connect_timeout=5.0, read_timeout=0.2)
+
+
+def test_service_async_fetch_uses_cache(server):
+    service = MetricAnalysisService(None, server + "/{customer_id}")
+
+    async def run():
+        first = await service.get_customer_metrics_async("metrics")
+        second = await service.get_customer_metrics_async("metrics")
+        await service.aclose()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == ["a.b", "c.d"]
+    assert second is first
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,89 @@
+"""
+Test script for extracting metrics from notebook and dashboard definitions
+"""
+
+import json
+from definition_analyzer import detect_definition_type, extract_metric_names, extract_metric_names_from_query
+from metric_analysis_service import MetricAnalysisService
+
+
+NOTEBOOK = {
+    "data": {
+        "type": "notebooks",
+        "attributes": {
+            "name": "Test",
+            "cells": [
+                {"type": "notebook_cells", "attributes": {"definition": {"type": "markdown", "text": "# avg:not.a.metric"}}},
+                {"type": "notebook_cells", "attributes": {"definition": {
+                    "type": "timeseries",
+                    "requests": [
+                        {"q": "avg:system.cpu.user{host:web-1,env:prod} by {host}"},
+                        {"q": "avg:system.cpu.user{*} / max:system.cpu.idle{*}.rollup(avg, 60)"},
+                    ]
+                }}},
+            ]
+        }
+    }
+}
+
+DASHBOARD = {
+    "title": "Test",
+    "layout_type": "ordered",
+    "widgets": [
+        {"definition": {"type": "query_value", "requests": [{"q": "sum:aws.elb.request_count{*}.as_count()"}]}},
+        {"definition": {"type": "group", "widgets": [
+            {"definition": {"type": "timeseries", "requests": [{
+                "queries": [
+                    {"data_source": "metrics", "name": "query1", "query": "p95:trace.http.request{service:web}"},
+                    {"data_source": "logs", "name": "query2", "search": {"query": "status:error"}},
+                ],
+                "formulas": [{"formula": "query1"}]
+            }]}},
+        ]}},
+        {"definition": {"type": "hostmap", "requests": {"fill": {"q": "avg:system.load.1{*} by {host}"}}}},
+    ]
+}
+
+
+def test_query_parsing():
+    assert extract_metric_names_from_query("per_second(sum:a.b{x:y}) + avg:c.d.rollup(sum, 300)") == ["a.b", "c.d"]
+    assert extract_metric_names_from_query("avg:system.cpu.user") == ["system.cpu.user"]
+
+
+def test_extract_from_notebook_and_dashboard():
+    assert detect_definition_type(NOTEBOOK) == "notebook"
+    assert extract_metric_names(NOTEBOOK) == ["system.cpu.user", "system.cpu.idle"]
+
+    assert detect_definition_type(DASHBOARD) == "dashboard"
+    assert extract_metric_names(DASHBOARD) == ["aws.elb.request_count", "trace.http.request", "system.load.1"]
+
+
+def test_extract_from_example_notebook():
+    with open("NotebookExample1.json") as f:
+        assert extract_metric_names(json.load(f)) == ["system.load.1"]
+
+
+def test_service_analyzes_definition_in_one_call():
+    class FakeDatadogClient:
+        def get_active_metrics(self):
+            return {"data": [{"type": "metrics", "id": "system.cpu.user"}]}
+
+        def get_integration_documentation(self, integration_name, metric_name=None):
+            return {}
+
+    service = MetricAnalysisService(FakeDatadogClient())
+    kind, names, analysis = service.analyze_definition(NOTEBOOK)
+
+    assert kind == "notebook"
+    assert names == ["system.cpu.user", "system.cpu.idle"]
+    assert analysis.total_suggested == 2
+    assert analysis.coverage_percentage == 50
+    assert [m["metric_name"] for m in analysis.missing_metrics] == ["system.cpu.idle"]
+
+
+if __name__ == "__main__":
+    test_query_parsing()
+    test_extract_from_notebook_and_dashboard()
+    test_extract_from_example_notebook()
+    test_service_analyzes_definition_in_one_call()
+    print("✅ Definition analyzer tests passed")
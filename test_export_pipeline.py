@@ -0,0 +1,125 @@
+"""
+Test script for the streaming notebook/dashboard export pipeline
+Exports the fake Datadog server's inventory to a gzip NDJSON archive, including an interrupted and resumed run
+"""
+
+import asyncio
+
+import pytest
+
+from async_datadog_client import AsyncDatadogClient
+from datadog_client import DatadogAPIError, DatadogClient
+from export_pipeline import ExportPipeline, read_archive
+from fake_datadog_server import FakeDatadogServer
+from rate_limiter import RateLimiter
+
+
+def export(url, archive, fail_notebooks_from=None, fail_dashboards_from=None, **kwargs):
+    async def run():
+        async with AsyncDatadogClient("fake", "fake", url, rate_limiter=RateLimiter(max_retries=0)) as client:
+            if fail_notebooks_from is not None:
+                client.list_notebooks = _failing_from(client.list_notebooks, fail_notebooks_from)
+            if fail_dashboards_from is not None:
+                client.list_dashboards = _failing_from(client.list_dashboards, fail_dashboards_from)
+            return await ExportPipeline(client, str(archive), **kwargs).run()
+
+    return asyncio.run(run())
+
+
+def test_export_writes_every_item(tmp_path):
+    archive = tmp_path / "backup.ndjson.gz"
+    with FakeDatadogServer(notebooks=230, dashboards=40) as server:
+        summary = export(server.url, archive, page_size=50, max_concurrency=4)
+        requests = server.state.stats()["requests"]
+
+    items = list(read_archive(archive))
+    notebooks = [item for item in items if item["type"] == "notebook"]
+    dashboards = [item for item in items if item["type"] == "dashboard"]
+    assert summary["exported"] == 270 and summary["failed"] == 0
+    assert len({item["id"] for item in notebooks}) == 230 and len(dashboards) == 40
+    assert notebooks[0]["body"]["data"]["attributes"]["cells"]
+    assert requests["GET /api/v1/notebooks"] == 5  # four full pages and the empty tail page
+
+
+def test_interrupted_export_resumes_without_duplicates(tmp_path):
+    archive = tmp_path / "backup.ndjson.gz"
+    with FakeDatadogServer(notebooks=230, dashboards=10) as server:
+        with pytest.raises(DatadogAPIError):
+            export(server.url, archive, fail_notebooks_from=150, page_size=50)
+        # Simulate a page that was half written when the process died
+        with open(archive, "ab") as f:
+            f.write(b"\x1f\x8b partial")
+
+        summary = export(server.url, archive, page_size=50)
+        again = export(server.url, archive, page_size=50)
+
+    ids = [(item["type"], item["id"]) for item in read_archive(archive)]
+    assert summary["resumed"] and summary["offsets"] == {"notebook": 230, "dashboard": 10}
+    assert len(ids) == len(set(ids)) == 240
+    assert again["exported"] == 240 and not again["resumed"]
+
+
+def test_failed_and_deleted_bodies(tmp_path):
+    archive = tmp_path / "backup.ndjson.gz"
+
+    async def run(url):
+        async with AsyncDatadogClient("fake", "fake", url, rate_limiter=RateLimiter(max_retries=0)) as client:
+            get_notebook = client.get_notebook
+
+            async def flaky_get(notebook_id):
+                if notebook_id == "2":
+                    return {"error": "Internal error", "status_code": 500}
+                return await get_notebook(notebook_id)
+
+            client.get_notebook = flaky_get
+            # Notebook 3 is still listed but gone by the time its body is fetched
+            await client.delete_notebook("3")
+            client.list_notebooks = _with_deleted(client.list_notebooks, "3")
+            return await ExportPipeline(client, str(archive), kinds=["notebook"]).run()
+
+    with FakeDatadogServer(notebooks=5, dashboards=0) as server:
+        summary = asyncio.run(run(server.url))
+
+    assert summary["exported"] == 3
+    assert summary["failures"] == [{"type": "notebook", "id": "2", "error": "Internal error", "status_code": 500}]
+    assert sorted(item["id"] for item in read_archive(archive)) == ["1", "4", "5"]
+
+
+def test_resume_after_a_dashboard_is_edited(tmp_path):
+    archive = tmp_path / "backup.ndjson.gz"
+    with FakeDatadogServer(notebooks=0, dashboards=30) as server:
+        with pytest.raises(DatadogAPIError):
+            export(server.url, archive, fail_dashboards_from=10, kinds=["dashboard"], page_size=10)
+        # The oldest dashboard, not yet exported, is edited and jumps to the front of the listing
+        client = DatadogClient("fake", "fake", server.url)
+        oldest = client.list_dashboards(count=100)["dashboards"][-1]["id"]
+        client.update_dashboard(oldest, {"title": "Edited", "layout_type": "ordered", "widgets": []})
+
+        summary = export(server.url, archive, kinds=["dashboard"], page_size=10)
+
+    ids = [item["id"] for item in read_archive(archive)]
+    assert summary["resumed"] and summary["exported"] == 30
+    assert len(ids) == len(set(ids)) == 30 and oldest in ids
+
+
+def _failing_from(listing, first_failing_start):
+    """Listing whose pages from an offset on fail, as when the process is cut off mid-export"""
+    async def failing_listing(start=0, **params):
+        if start >= first_failing_start:
+            return {"error": "Service unavailable", "status_code": 503}
+        return await listing(start=start, **params)
+    return failing_listing
+
+
+def _with_deleted(list_notebooks, notebook_id):
+    """Listing that still shows a notebook deleted after the page was served"""
+    async def listing(**params):
+        result = await list_notebooks(**params)
+        if params.get("start", 0) == 0:
+            result["data"].append({"id": int(notebook_id), "type": "notebooks", "attributes": {}})
+        return result
+    return listing
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
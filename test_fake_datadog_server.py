@@ -0,0 +1,107 @@
+"""
+Test script for the fake Datadog API server
+Drives the real DatadogClient end to end against the in-process stand-in
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from async_datadog_client import AsyncDatadogClient
+from datadog_client import DatadogClient
+from fake_datadog_server import FakeDatadogServer, load_seed_metrics
+from rate_limiter import RateLimiter
+
+
+def test_notebook_and_dashboard_round_trip():
+    with FakeDatadogServer(notebooks=3, dashboards=2) as server:
+        client = DatadogClient("fake", "fake", server.url)
+
+        created = client.create_notebook({"data": {"type": "notebooks", "attributes": {
+            "name": "Round trip", "time": {"live_span": "1h"}, "cells": []}}})
+        notebook_id = created["data"]["id"]
+        assert client.get_notebook(notebook_id)["data"]["attributes"]["name"] == "Round trip"
+        assert client.get_notebook(notebook_id) == client.get_notebook(notebook_id)
+        assert client.delete_notebook(notebook_id)["success"]
+        assert client.get_notebook(notebook_id)["status_code"] == 404
+
+        dashboard = client.create_dashboard({"title": "T", "layout_type": "ordered", "widgets": []})
+        assert client.update_dashboard(dashboard["id"], {"title": "T2", "layout_type": "ordered",
+                                                         "widgets": []})["title"] == "T2"
+        assert server.state.stats()["dashboards"] == 3
+        # Repeat GETs are served by the response cache
+        assert server.state.stats()["requests"]["GET /api/v1/notebooks/{id}"] == 2
+
+
+def test_large_inventory_paginates():
+    with FakeDatadogServer(notebooks=450, dashboards=230) as server:
+        client = DatadogClient("fake", "fake", server.url)
+
+        assert len(list(client.iter_notebooks(page_size=100))) == 450
+        dashboards = list(client.iter_dashboards())
+        assert len(dashboards) == 230
+        assert len({d["id"] for d in dashboards}) == 230
+
+
+def test_metrics_are_seeded_from_the_saved_response():
+    seed = load_seed_metrics()
+    with FakeDatadogServer(metrics=len(seed) + 10) as server:
+        client = DatadogClient("fake", "fake", server.url)
+
+        active = [m["id"] for m in client.get_active_metrics()["data"]]
+        assert active[:len(seed)] == seed
+        assert len(active) == len(seed) + 10
+        assert client.get_metrics_metadata("container.cpu")["metrics"]
+
+        result = client.query_metrics("avg:container.cpu.usage{*} by {host}", 0, 3600)
+        assert len(result["series"]) == 3
+        assert result["series"][0]["interval"] == 20
+        assert result["series"][0]["length"] == 181
+
+
+def test_rate_limit_headers_pace_the_client():
+    with FakeDatadogServer(rate_limit=5, rate_limit_period=1) as server:
+        client = DatadogClient("fake", "fake", server.url, rate_limiter=RateLimiter(backoff_base=0.01))
+        started = time.monotonic()
+
+        results = [client.list_notebooks(count=1) for _ in range(8)]
+
+        assert all("error" not in r for r in results)
+        assert time.monotonic() - started >= 0.5
+        assert client.get_rate_limit_status()["families"]["notebooks"]["limit"] == 5
+
+
+def test_injected_failures_and_latency():
+    with FakeDatadogServer(error_rate=1.0, error_status=500) as server:
+        client = DatadogClient("fake", "fake", server.url, rate_limiter=RateLimiter(max_retries=0))
+        assert client.list_dashboards()["status_code"] == 500
+
+    with FakeDatadogServer(latency=0.2) as server:
+        server.state.fail_next(1)
+        client = DatadogClient("fake", "fake", server.url, rate_limiter=RateLimiter(backoff_base=0.01))
+        started = time.monotonic()
+        assert "error" not in client.list_notebooks()
+        assert time.monotonic() - started >= 0.4
+        assert server.state.stats()["statuses"] == {503: 1, 200: 1}
+
+
+def test_requests_without_keys_are_rejected():
+    with FakeDatadogServer() as server:
+        assert DatadogClient("", "", server.url).list_notebooks()["status_code"] == 403
+
+
+def test_async_client_against_the_fake():
+    async def run(url):
+        async with AsyncDatadogClient("fake", "fake", url) as client:
+            return await asyncio.gather(*(client.get_notebook(i) for i in range(1, 21)))
+
+    with FakeDatadogServer(notebooks=20, latency=0.1) as server:
+        started = time.monotonic()
+        results = asyncio.run(run(server.url))
+        assert time.monotonic() - started < 1.0
+        assert [r["data"]["id"] for r in results] == list(range(1, 21))
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,95 @@
+"""
+Test script for deploying one definition to many Datadog orgs
+Fans a dashboard out to several fake Datadog servers and reads back the streamed per-org outcomes
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import main
+from datadog_client import DatadogPayloadMixin, prepare_payload
+from fake_datadog_server import FakeDatadogServer
+from tenant_registry import TenantConfig, TenantRegistry
+
+CREATE_ROUTE = "POST /api/v1/dashboard"
+
+DASHBOARD = {
+    "id": "abc-123-def",
+    "title": "Service overview",
+    "layout_type": "ordered",
+    "author_handle": "someone@example.com",
+    "widgets": [{"id": 1, "definition": {"type": "timeseries", "title": "CPU",
+                                         "requests": [{"q": "avg:system.cpu.user{*}"}]}}],
+}
+
+
+def test_prepared_payload_is_cleaned_and_compressed_once():
+    prepared = prepare_payload("dashboard", DASHBOARD)
+    sent = json.loads(prepared.body)
+
+    assert "id" not in sent and "author_handle" not in sent and "id" not in sent["widgets"][0]
+    assert prepared.encoded(None, 6) == (prepared.body, {})
+    compressed, headers = prepared.encoded(1, 6)
+    assert headers == {"Content-Encoding": "gzip"}
+    assert prepared.encoded(1, 6)[0] is compressed
+
+    with pytest.raises(ValueError):
+        prepare_payload("monitor", DASHBOARD)
+
+
+def test_fanout_streams_each_orgs_outcome(monkeypatch):
+    cleaned = []
+    original_clean = DatadogPayloadMixin._clean_dashboard_data_for_creation
+
+    def counting_clean(self, dashboard_data):
+        cleaned.append(dashboard_data)
+        return original_clean(self, dashboard_data)
+
+    monkeypatch.setattr(DatadogPayloadMixin, "_clean_dashboard_data_for_creation", counting_clean)
+
+    with FakeDatadogServer(dashboards=0) as acme, FakeDatadogServer(dashboards=0) as globex, \
+            FakeDatadogServer(dashboards=0, error_rate=1.0, error_status=400) as initech:
+        registry = TenantRegistry({
+            name: TenantConfig(name, f"{name}-api", f"{name}-app", server.url)
+            for name, server in (("acme", acme), ("globex", globex), ("initech", initech))
+        }, main._build_tenant_clients)
+        monkeypatch.setattr(main, "tenant_registry", registry)
+
+        async def run():
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://app") as http:
+                deployed = await http.post("/deploy/fanout", json={
+                    "kind": "dashboard", "definition": DASHBOARD,
+                    "orgs": ["acme", "globex", "initech", "acme"], "max_concurrency": 2})
+                unknown = await http.post("/deploy/fanout", json={
+                    "kind": "dashboard", "definition": DASHBOARD, "orgs": ["acme", "umbrella"]})
+                invalid = await http.post("/deploy/fanout", json={
+                    "kind": "dashboard", "definition": {"title": "No widgets"}, "orgs": ["acme"]})
+            await registry.aclose()
+            return deployed, unknown, invalid
+
+        deployed, unknown, invalid = asyncio.run(run())
+        created = {name: server.state.stats() for name, server in
+                   (("acme", acme), ("globex", globex), ("initech", initech))}
+
+    outcomes = {line["org"]: line for line in map(json.loads, deployed.text.splitlines())}
+    assert deployed.headers["content-type"] == "application/x-ndjson"
+    assert set(outcomes) == {"acme", "globex", "initech"}  # duplicates deployed once
+    # Each org assigns its own ID; the source dashboard's is never sent
+    assert outcomes["acme"]["success"] and outcomes["acme"]["id"] not in (None, DASHBOARD["id"])
+    assert outcomes["globex"]["success"] and outcomes["globex"]["index"] == 1
+    assert not outcomes["initech"]["success"] and outcomes["initech"]["status_code"] == 400
+    assert created["acme"]["dashboards"] == 1 and created["globex"]["dashboards"] == 1
+    assert created["initech"]["requests"][CREATE_ROUTE] == 1
+    # Cleaned once for all three orgs
+    assert len(cleaned) == 1
+
+    assert unknown.status_code == 404 and "umbrella" in unknown.json()["detail"]
+    assert invalid.status_code == 400
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,128 @@
+"""
+Test script for the background health probe
+Checks that /health serves the cached probe result instead of calling Datadog on every hit
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import main
+from async_datadog_client import AsyncDatadogClient
+from fake_datadog_server import FakeDatadogServer
+from health_probe import HealthProbe
+from rate_limiter import RateLimiter
+
+LIST_ROUTE = "GET /api/v1/notebooks"
+
+
+def test_health_serves_cached_status(monkeypatch):
+    async def run(url):
+        client = AsyncDatadogClient("fake", "fake", url)
+        probe = HealthProbe(client.test_connection, interval=60)
+        monkeypatch.setattr(main, "datadog_health_probe", probe)
+        await probe.probe()
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app") as http:
+            cached = [await http.get("/health") for _ in range(20)]
+            deep = await http.get("/health", params={"deep": "true"})
+        await client.aclose()
+        return cached, deep
+
+    with FakeDatadogServer() as server:
+        cached, deep = asyncio.run(run(server.url))
+        requests = server.state.stats()["requests"][LIST_ROUTE]
+
+    assert requests == 2  # initial probe + the deep check
+    body = cached[-1].json()
+    assert body["datadog_connection"] == "connected"
+    assert body["datadog_probe"]["age_seconds"] >= 0 and not body["datadog_probe"]["stale"]
+    assert deep.json()["datadog_probe"]["age_seconds"] < cached[-1].json()["datadog_probe"]["age_seconds"]
+
+
+def test_slow_check_times_out():
+    async def run(url):
+        async with AsyncDatadogClient("fake", "fake", url) as client:
+            probe = HealthProbe(client.test_connection, timeout=0.2)
+            started = time.monotonic()
+            snapshot = await probe.probe()
+            return snapshot, time.monotonic() - started
+
+    with FakeDatadogServer(latency=2.0) as server:
+        snapshot, elapsed = asyncio.run(run(server.url))
+
+    assert elapsed < 1.0
+    assert snapshot["status"] == "error"
+    assert "timed out" in snapshot["message"]
+    assert snapshot["consecutive_failures"] == 1
+
+
+def test_background_loop_refreshes_and_recovers():
+    async def run(server):
+        async with AsyncDatadogClient("fake", "fake", server.url,
+                                      rate_limiter=RateLimiter(max_retries=0)) as client:
+            probe = HealthProbe(client.test_connection, interval=0.05)
+            server.state.fail_next(2, status=500)
+            probe.start()
+            await asyncio.sleep(0.08)
+            failing = probe.snapshot()
+            await asyncio.sleep(0.3)
+            await probe.stop()
+            return failing, probe.snapshot()
+
+    with FakeDatadogServer() as server:
+        failing, recovered = asyncio.run(run(server))
+        checks = server.state.stats()["requests"][LIST_ROUTE]
+
+    assert failing["status"] == "error"
+    assert recovered["status"] == "connected" and recovered["consecutive_failures"] == 0
+    assert checks >= 4
+
+
+def test_concurrent_deep_checks_share_one_request():
+    calls = []
+
+    async def check():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"status": "connected", "message": "ok"}
+
+    async def run():
+        probe = HealthProbe(check)
+        return await asyncio.gather(*(probe.probe() for _ in range(10)))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(r["status"] == "connected" for r in results)
+
+
+def test_snapshot_before_first_check():
+    snapshot = HealthProbe(lambda: None).snapshot()
+    assert snapshot["status"] == "unknown"
+    assert snapshot["age_seconds"] is None and snapshot["stale"]
+
+
+
+def test_lifespan_starts_and_stops_the_probe(monkeypatch):
+    async def run(url):
+        client = AsyncDatadogClient("fake", "fake", url)
+        probe = HealthProbe(client.test_connection, interval=60)
+        monkeypatch.setattr(main, "datadog_health_probe", probe)
+        monkeypatch.setattr(main, "async_datadog_client", client)
+        monkeypatch.setattr(main, "metric_analysis_service", None)
+        async with main.lifespan(main.app):
+            await asyncio.sleep(0.2)
+            running = probe.snapshot()
+        return running, client.client.is_closed
+
+    with FakeDatadogServer() as server:
+        running, closed = asyncio.run(run(server.url))
+
+    assert running["age_seconds"] is not None
+    assert closed
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
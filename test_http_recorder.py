@@ -0,0 +1,118 @@
+"""
+Test script for the HTTP record/replay layer
+Records DatadogClient and custom-endpoint traffic against the fake Datadog server, then replays it offline
+"""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from async_datadog_client import AsyncDatadogClient
+from customer_metrics_client import AsyncCustomerMetricsClient
+from datadog_client import DatadogClient
+from fake_datadog_server import FakeDatadogServer
+from http_recorder import Cassette, CassetteMiss
+from metric_analysis_service import MetricAnalysisService
+
+
+def record_session(path, url):
+    cassette = Cassette(str(path), mode="record")
+    client = DatadogClient("secret-api", "secret-app", url, gzip_threshold=64)
+    cassette.install(client.session)
+    listed = client.list_notebooks(count=3)
+    created = client.create_dashboard({"title": "Recorded", "layout_type": "ordered", "widgets": [
+        {"definition": {"type": "note", "content": "x" * 100}}]})
+    fetched = client.get_dashboard(created["id"])
+    return cassette, listed, created, fetched
+
+
+def test_replay_serves_recorded_responses_without_network(tmp_path):
+    path = tmp_path / "datadog.jsonl"
+    with FakeDatadogServer(notebooks=5, latency=0.05) as server:
+        recorder, listed, created, fetched = record_session(path, server.url)
+        url = server.url
+
+    # The server is gone: every response now comes from the cassette
+    cassette = Cassette(str(path), latency_scale=0)
+    client = DatadogClient("other", "keys", url, gzip_threshold=64)
+    cassette.install(client.session)
+    started = time.monotonic()
+    assert client.list_notebooks(count=3) == listed
+    assert client.create_dashboard({"title": "Recorded", "layout_type": "ordered", "widgets": [
+        {"definition": {"type": "note", "content": "x" * 100}}]}) == created
+    assert client.get_dashboard(created["id"]) == fetched
+    assert time.monotonic() - started < 0.1
+    assert recorder.stats()["recorded"] == cassette.stats()["replayed"] == 3
+
+    with pytest.raises(CassetteMiss):
+        client.list_notebooks(count=4)
+
+    text = path.read_text()
+    assert "secret-api" not in text and "secret-app" not in text
+
+
+def test_replay_reproduces_latency_and_works_for_the_async_client(tmp_path):
+    path = tmp_path / "datadog.jsonl"
+    with FakeDatadogServer(notebooks=5, latency=0.2) as server:
+        record_session(path, server.url)
+        url = server.url
+
+    async def run():
+        cassette = Cassette(str(path), latency_scale=1.0)
+        async with AsyncDatadogClient("fake", "fake", url, transport=cassette.async_transport()) as client:
+            started = time.monotonic()
+            listed = await client.list_notebooks(count=3)
+            return listed, time.monotonic() - started
+
+    listed, elapsed = asyncio.run(run())
+    assert len(listed["data"]) == 3
+    assert elapsed >= 0.2
+
+
+def test_custom_endpoint_fetches_replay(tmp_path):
+    path = tmp_path / "customers.jsonl"
+    with FakeDatadogServer(metrics=4) as server:
+        # The fake server's active-metrics route stands in for a customer inventory endpoint
+        endpoint = f"{server.url}/api/v1/metrics?customer={{customer_id}}"
+        service = MetricAnalysisService(DatadogClient("fake", "fake", server.url), endpoint)
+        service.http_session.headers.update({"DD-API-KEY": "fake", "DD-APPLICATION-KEY": "fake"})
+        Cassette(str(path), mode="record").install(service.http_session)
+        recorded = service._fetch_from_custom_endpoint("acme")
+
+    service = MetricAnalysisService(DatadogClient("fake", "fake", server.url), endpoint)
+    Cassette(str(path), latency_scale=0).install(service.http_session)
+    assert len(recorded) == 4 and service._fetch_from_custom_endpoint("acme") == recorded
+    assert json.loads(path.read_text().splitlines()[0])["request"]["url"].endswith("customer=acme")
+
+
+
+def test_async_custom_endpoint_fetches_replay(tmp_path):
+    path = tmp_path / "customers.jsonl"
+    limits = AsyncCustomerMetricsClient.pool_limits(max_connections=7)
+
+    async def record(endpoint):
+        transport = Cassette(str(path), mode="record").async_transport(limits=limits)
+        assert transport.real._pool._max_connections == 7  # records through the client's own pool settings
+        async with AsyncCustomerMetricsClient(endpoint, headers={"DD-API-KEY": "fake", "DD-APPLICATION-KEY": "fake"},
+                                              transport=transport) as client:
+            return await client.fetch_metrics("acme")
+
+    async def replay(endpoint):
+        service = MetricAnalysisService(DatadogClient("fake", "fake", "http://127.0.0.1:9"), endpoint,
+                                        transport=Cassette(str(path), latency_scale=0).async_transport())
+        try:
+            return await service.get_customer_metrics_async("acme")
+        finally:
+            await service.aclose()
+
+    with FakeDatadogServer(metrics=4) as server:
+        endpoint = f"{server.url}/api/v1/metrics?customer={{customer_id}}"
+        recorded = asyncio.run(record(endpoint))
+
+    assert len(recorded) == 4 and asyncio.run(replay(endpoint)) == recorded
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,145 @@
+"""
+Test script for idempotent notebook and dashboard generation
+Replays /generate with the same Idempotency-Key against the fake Datadog server and counts what gets created
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import main
+from async_datadog_client import AsyncDatadogClient
+from fake_datadog_server import FakeDatadogServer
+from idempotency_store import IdempotencyStore, IdempotencyConflict
+
+CREATE_ROUTE = "POST /api/v1/notebooks"
+
+
+class CountingGenerator:
+    """Stands in for the LLM-backed generator and counts generations"""
+
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+
+    def generate_notebook(self, description, author_info=None, advanced_settings=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        return {"data": {"type": "notebooks", "attributes": {
+            "name": description, "time": {"live_span": "1h"},
+            "cells": [{"type": "notebook_cells", "attributes": {
+                "definition": {"type": "markdown", "text": f"# {description}"}}}]}}}
+
+    def preview_notebook(self, notebook_json):
+        return notebook_json["data"]["attributes"]["name"]
+
+
+@pytest.fixture
+def app(monkeypatch):
+    generator = CountingGenerator(delay=0.05)
+    monkeypatch.setattr(main, "notebook_generator", generator)
+    monkeypatch.setattr(main, "idempotency_store", IdempotencyStore(ttl=60))
+    monkeypatch.setattr(main, "async_datadog_client", None)  # Replaced per run by post_all
+    with FakeDatadogServer(notebooks=0) as server:
+        yield generator, server
+
+
+def post_all(server, requests):
+    async def run():
+        client = AsyncDatadogClient("fake", "fake", server.url)
+        main.async_datadog_client = client
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app") as http:
+            responses = []
+            for batch in requests:
+                responses.extend(await asyncio.gather(*[
+                    http.post("/generate", json=body, headers=headers) for body, headers in batch]))
+        await client.aclose()
+        return responses
+
+    return asyncio.run(run())
+
+
+def test_same_key_creates_one_notebook(app):
+    generator, server = app
+    body = {"description": "CPU", "create_in_datadog": True}
+    key = {"Idempotency-Key": "abc"}
+
+    # Three concurrent submissions (a double-click) then a later retry
+    responses = post_all(server, [[(body, key)] * 3, [(body, key)]])
+
+    assert [r.status_code for r in responses] == [200] * 4
+    assert len({r.json()["datadog_notebook_id"] for r in responses}) == 1
+    assert sum(r.headers.get("Idempotent-Replayed") == "true" for r in responses) == 3
+    assert generator.calls == 1
+    assert server.state.stats()["requests"][CREATE_ROUTE] == 1
+
+
+def test_key_reuse_with_different_body_is_rejected(app):
+    generator, server = app
+    key = {"Idempotency-Key": "abc"}
+
+    first, second = post_all(server, [[({"description": "CPU"}, key)], [({"description": "Memory"}, key)]])
+
+    assert first.status_code == 200
+    assert second.status_code == 422
+    assert generator.calls == 1
+
+
+def test_identical_create_without_key_is_deduplicated(app):
+    generator, server = app
+    create = {"description": "CPU", "create_in_datadog": True}
+    preview = {"description": "CPU"}
+
+    responses = post_all(server, [[(create, {}), (create, {})], [(preview, {}), (preview, {})]])
+
+    assert responses[0].json()["datadog_notebook_id"] == responses[1].json()["datadog_notebook_id"]
+    assert server.state.stats()["requests"][CREATE_ROUTE] == 1
+    # Generation without creating anything stays uncached
+    assert generator.calls == 3
+
+
+def test_failed_request_is_not_replayed(app):
+    generator, server = app
+    body = {"description": "CPU", "create_in_datadog": True}
+    key = {"Idempotency-Key": "abc"}
+    server.state.fail_next(1, status=400)
+
+    failed, retried = post_all(server, [[(body, key)], [(body, key)]])
+
+    assert failed.status_code == 500
+    assert retried.status_code == 200 and retried.json()["datadog_notebook_id"]
+    assert "Idempotent-Replayed" not in retried.headers
+    assert generator.calls == 2
+
+
+def test_store_expires_and_persists(tmp_path):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return {"id": len(calls)}
+
+    async def run():
+        store = IdempotencyStore(ttl=60, directory=str(tmp_path))
+        first = await store.run("generate", "k", {"a": 1}, compute)
+        # A new store reading the same directory replays the stored result
+        reloaded = IdempotencyStore(ttl=60, directory=str(tmp_path))
+        replay = await reloaded.run("generate", "k", {"a": 1}, compute)
+        with pytest.raises(IdempotencyConflict):
+            await reloaded.run("generate", "k", {"a": 2}, compute)
+        short = await reloaded.run("generate", "short", {"a": 1}, compute, ttl=0.01)
+        await asyncio.sleep(0.02)
+        expired = await reloaded.run("generate", "short", {"a": 1}, compute)
+        return first, replay, short, expired
+
+    first, replay, short, expired = asyncio.run(run())
+
+    assert first == ({"id": 1}, False) and replay == ({"id": 1}, True)
+    assert short == ({"id": 2}, False) and expired == ({"id": 3}, False)
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,112 @@
+"""
+Test script for batch metric analysis across many customers
+"""
+
+import threading
+import time
+from metric_analysis_service import MetricAnalysisService
+
+
+class FakeDatadogClient:
+    """Minimal stand-in for DatadogClient used by the analysis service"""
+
+    def get_active_metrics(self):
+        return {"data": [{"type": "metrics", "id": "system.cpu.user"}]}
+
+    def get_integration_documentation(self, integration_name, metric_name=None):
+        return {"setup_url": f"https://docs.datadoghq.com/integrations/{integration_name}/", "setup_steps": []}
+
+
+class SlowInventoryService(MetricAnalysisService):
+    """Analysis service whose custom endpoint sleeps and tracks concurrency"""
+
+    def __init__(self, inventories, delay=0.05, **kwargs):
+        super().__init__(FakeDatadogClient(), "http://inventory.local/{customer_id}", **kwargs)
+        self.inventories = inventories
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def _fetch_from_custom_endpoint(self, customer_id):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.delay)
+            if customer_id not in self.inventories:
+                raise RuntimeError(f"unknown customer {customer_id}")
+            return self.inventories[customer_id]
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+SUGGESTED = [{"metric_name": "system.cpu.user"}, {"metric_name": "system.mem.used"}]
+
+
+def test_batch_analysis_yields_every_customer():
+    inventories = {f"c{i}": ["system.cpu.user"] if i % 2 else ["system.cpu.user", "system.mem.used"]
+                   for i in range(10)}
+    service = SlowInventoryService(inventories)
+
+    results = {r.customer_id: r for r in service.analyze_metrics_batch(list(inventories) + ["c0"], SUGGESTED)}
+
+    assert set(results) == set(inventories)
+    assert results["c0"].analysis.coverage_percentage == 100
+    assert results["c1"].analysis.coverage_percentage == 50
+
+
+def test_batch_analysis_respects_concurrency_limit():
+    inventories = {f"c{i}": [] for i in range(12)}
+    service = SlowInventoryService(inventories, max_concurrency=3)
+
+    list(service.analyze_metrics_batch(inventories, SUGGESTED))
+
+    assert 1 < service.peak <= 3
+
+
+def test_batch_analysis_default_inventory_is_fetched_once():
+    calls = []
+
+    class CountingClient(FakeDatadogClient):
+        def get_active_metrics(self):
+            calls.append(1)
+            time.sleep(0.05)
+            return super().get_active_metrics()
+
+    service = MetricAnalysisService(CountingClient())
+    results = list(service.analyze_metrics_batch(["a", "b", "c", "d"], SUGGESTED, max_concurrency=4))
+
+    assert len(results) == 4
+    assert all(r.analysis is not None for r in results)
+    assert len(calls) == 1
+
+
+def test_batch_analysis_reports_fetch_failures():
+    inventories = {"c0": ["system.cpu.user"]}
+    service = SlowInventoryService(inventories, delay=0)
+
+    results = {r.customer_id: r for r in service.analyze_metrics_batch(["c0", "missing"], SUGGESTED)}
+
+    assert results["c0"].analysis.coverage_percentage == 50
+    assert results["missing"].analysis is None
+    assert "unknown customer missing" in results["missing"].error
+
+    class FailingClient(FakeDatadogClient):
+        def get_active_metrics(self):
+            return {"error": "Forbidden", "status_code": 403}
+
+    service = MetricAnalysisService(FailingClient())
+    results = list(service.analyze_metrics_batch(["a", "b"], SUGGESTED))
+
+    assert [r.analysis for r in results] == [None, None]
+    assert all("Forbidden" in r.error for r in results)
+
+
+if __name__ == "__main__":
+    test_batch_analysis_yields_every_customer()
+    test_batch_analysis_respects_concurrency_limit()
+    test_batch_analysis_default_inventory_is_fetched_once()
+    test_batch_analysis_reports_fetch_failures()
+    print("✅ Batch metric analysis tests passed")
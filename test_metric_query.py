@@ -0,0 +1,78 @@
+"""
+Test script for the Datadog metric query parser
+Parses generated and hand-written queries into ASTs and formats them back
+"""
+
+import pytest
+
+from metric_query import (BinaryOp, Call, MetricQuery, MetricQueryError, Name, Number, Rollup, String,
+                          format_query, metric_queries, parse_query)
+from metrics_loader import Metric, MetricsLoader
+
+
+def test_single_term_structure():
+    term = parse_query("avg:system.cpu.user{env:prod, host:a} by {host}.as_count().rollup(max, 60)")
+
+    assert term == MetricQuery("avg", "system.cpu.user", ("env:prod", "host:a"), ("host",),
+                               (Call("as_count"), Call("rollup", (Name("max"), Number(60)))))
+    assert term.rollup == Rollup("max", 60)
+    assert parse_query("p99.9:trace.http.request{*}BY{resource}").group_by == ("resource",)
+    assert parse_query("avg:system.load.1").scope == ()
+    assert parse_query("sum:hits{*}.rollup(300)").rollup == Rollup(None, 300)
+
+
+def test_functions_and_arithmetic():
+    tree = parse_query("top(per_second(sum:a.b{x:y}), 10, 'mean', 'desc') + avg:c.d.rollup(sum, 300) * -2")
+
+    assert isinstance(tree, BinaryOp) and tree.op == "+"
+    top = tree.left
+    assert top.name == "top" and top.args[1:] == (Number(10), String("mean"), String("desc"))
+    assert tree.right == BinaryOp("*", MetricQuery("avg", "c.d", modifiers=(
+        Call("rollup", (Name("sum"), Number(300))),)), Number(-2))
+    assert [term.metric for term in metric_queries(tree)] == ["a.b", "c.d"]
+
+
+@pytest.mark.parametrize("query", [
+    "avg:system.cpu.user{*}",
+    "(avg:a{*} - avg:b{*}) / 100",
+    "avg:a{*} - (avg:b{*} - avg:c{*})",
+    "timeshift(avg:a{*} by {host}, -3600)",
+    "sum:aws.elb.request_count{*}.as_count().fill(null, 10)",
+])
+def test_format_round_trips(query):
+    tree = parse_query(query)
+    assert format_query(tree) == query
+    assert parse_query(format_query(tree)) == tree
+
+
+@pytest.mark.parametrize("query, position", [
+    ("avg:", 4),
+    ("avg:a{*", 6),
+    ("per_second(avg:a{*}", 19),
+    ("avg:a{*} +", 10),
+    ("avg:a{*} )", 9),
+])
+def test_malformed_queries_report_where(query, position):
+    with pytest.raises(MetricQueryError) as info:
+        parse_query(query)
+    assert info.value.position == position
+
+
+def test_repeated_queries_come_from_the_cache():
+    parse_query.cache_clear()
+    first = parse_query("avg:system.cpu.user{*}")
+    assert parse_query("avg:system.cpu.user{*}") is first
+    assert parse_query.cache_info().hits == 1
+
+
+def test_loader_queries_parse_back(tmp_path):
+    loader = MetricsLoader(str(tmp_path))
+    metric = Metric("system.cpu.user", "gauge", "", "percent", "", "", "", "system", "cpu user", "")
+    query = loader.format_metric_for_query(metric, "max", ["env:prod", "*"])
+
+    assert query == "max:system.cpu.user{env:prod,*}"
+    assert parse_query(query) == MetricQuery("max", "system.cpu.user", ("env:prod", "*"))
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,162 @@
+"""
+Test script for chunked metric queries decoded into NumPy arrays
+Runs against a local stand-in that serves one point per minute with overlapping chunk boundaries
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+import pytest
+
+import metric_series
+from datadog_client import DatadogClient
+from fake_datadog_server import FakeDatadogServer
+from rate_limiter import RateLimiter
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests_seen = []
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        params = {k: v[0] for k, v in parse_qs(urlsplit(self.path).query).items()}
+        cls = type(self)
+        with cls.lock:
+            cls.requests_seen.append(params)
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        time.sleep(0.05)
+        with cls.lock:
+            cls.in_flight -= 1
+
+        query, start, end = params["query"], int(params["from"]), int(params["to"])
+        if query.startswith("bad:"):
+            return self._send(200, {"status": "error", "error": "Error parsing query"})
+        if query.startswith("forbidden:"):
+            return self._send(403, {"errors": ["Forbidden"]})
+        series = []
+        for scope in ("host:a", "host:b"):
+            # Inclusive end reproduces the duplicate point Datadog returns at chunk boundaries
+            points = [[t * 1000, None if t % 600 == 0 else float(t % 7)] for t in range(start, end + 1, 60)]
+            series.append({"expression": query, "metric": query.split(":")[1].split("{")[0],
+                           "scope": scope, "interval": 60, "pointlist": points})
+        self._send(200, {"status": "ok", "query": query, "series": series})
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    QueryHandler.requests_seen = []
+    QueryHandler.in_flight = QueryHandler.max_in_flight = 0
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), QueryHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_align_chunks_uses_epoch_boundaries():
+    assert metric_series.align_chunks(90, 350, 100) == [(90, 100), (100, 200), (200, 300), (300, 350)]
+    assert metric_series.align_chunks(0, 100, 100) == [(0, 100)]
+    with pytest.raises(ValueError):
+        metric_series.align_chunks(0, 100, 0)
+
+
+def test_parse_pointlists_matches_json_decoding():
+    body = json.dumps({"status": "ok", "series": [
+        {"scope": "a", "pointlist": [[1000.0, 1.5], [2000.0, None], [3000.0, -2e-3]]},
+        {"scope": "b", "pointlist": []},
+    ]})
+
+    decoded, arrays = metric_series.parse_pointlists(body.encode())
+
+    assert [s["pointlist"] for s in decoded["series"]] == [[], []]
+    assert arrays[0].shape == (3, 2) and arrays[1].shape == (0, 2)
+    np.testing.assert_array_equal(arrays[0], [[1000, 1.5], [2000, np.nan], [3000, -2e-3]])
+
+
+def test_parse_pointlists_falls_back_when_pointlist_is_not_a_series():
+    body = json.dumps({"status": "ok", "metadata": {"pointlist": [[1, 2]]},
+                       "series": [{"scope": "a", "pointlist": [[1000, 3]]}]})
+
+    decoded, arrays = metric_series.parse_pointlists(body)
+
+    assert len(arrays) == 1
+    np.testing.assert_array_equal(arrays[0], [[1000, 3]])
+    assert decoded["metadata"] == {"pointlist": [[1, 2]]}
+
+
+def test_batch_stitches_chunks_into_deduplicated_series(server):
+    client = DatadogClient("api", "app", server, bulk_concurrency=4)
+    queries = ["avg:system.cpu.user{*} by {host}", "avg:system.load.1{*} by {host}"]
+    start, end = 86400 * 100, 86400 * 100 + 4 * 3600
+
+    results = client.query_metrics_batch(queries + queries[:1], start, end, chunk_seconds=3600)
+
+    assert list(results) == queries
+    assert len(QueryHandler.requests_seen) == 8
+    assert 1 < QueryHandler.max_in_flight <= 4
+    for query, result in results.items():
+        assert result.error is None
+        assert [s.scope for s in result.series] == ["host:a", "host:b"]
+        series = result.series[0]
+        expected = np.arange(start, end + 1, 60) * 1000
+        np.testing.assert_array_equal(series.timestamps, expected)
+        assert series.timestamps.dtype == np.int64
+        assert np.isnan(series.values[0]) and series.values[1] == float((start + 60) % 7)
+
+    payload = results[queries[0]].to_dict()
+    assert payload["series"][0]["pointlist"][0] == [start * 1000, None]
+    assert "pointlist" not in results[queries[0]].to_dict(include_points=False)["series"][0]
+
+
+def test_batch_reports_errors_per_query(server):
+    client = DatadogClient("api", "app", server, rate_limiter=RateLimiter(max_retries=0))
+
+    queries = ["bad:query{", "forbidden:system.load.1{*}", "avg:system.load.1{*}"]
+
+    results = client.query_metrics_batch(queries, 0, 7200, chunk_seconds=3600)
+
+    assert results["bad:query{"].error == "Error parsing query"
+    assert results["bad:query{"].status_code == 200
+    assert results["bad:query{"].series == []
+    assert results["forbidden:system.load.1{*}"].status_code == 403
+    assert results["avg:system.load.1{*}"].error is None
+    assert len(results["avg:system.load.1{*}"].series[0]) == 121
+
+
+
+def test_batch_pins_one_rollup_across_chunks():
+    # Three whole days and a two-hour tail: unpinned, the tail would come back at 20s resolution
+    start = 86400 * 100
+    end = start + 3 * 86400 + 7200
+
+    with FakeDatadogServer() as fake:
+        client = DatadogClient("api", "app", fake.url)
+        result = client.query_metrics_batch(["avg:system.cpu.user{*}"], start, end)["avg:system.cpu.user{*}"]
+
+    assert result.error is None
+    spacing = np.unique(np.diff(result.series[0].timestamps))
+    assert spacing.tolist() == [1200 * 1000]
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
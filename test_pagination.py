@@ -0,0 +1,138 @@
+"""
+Test script for auto-paginating notebook and dashboard iterators
+Runs against a local stand-in that serves a fixed inventory page by page
+"""
+
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+import pytest
+
+import main
+from async_datadog_client import AsyncDatadogClient
+from datadog_client import DatadogAPIError, DatadogClient
+from rate_limiter import RateLimiter
+
+NOTEBOOKS = [{"id": i, "type": "notebooks", "attributes": {"name": f"nb-{i}"}} for i in range(23)]
+DASHBOARDS = [{"id": f"abc-{i}", "title": f"dash-{i}"} for i in range(7)]
+
+
+class PagedHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    pages_served = []
+    fail_from = None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        start, count = int(query["start"][0]), int(query["count"][0])
+        type(self).pages_served.append((url.path, start))
+
+        if self.fail_from is not None and start >= self.fail_from:
+            return self._send(500, {"errors": ["Internal error"]})
+        if url.path == "/api/v1/notebooks":
+            payload = {"data": NOTEBOOKS[start:start + count],
+                       "meta": {"page": {"total_count": len(NOTEBOOKS)}}}
+        else:
+            payload = {"dashboards": DASHBOARDS[start:start + count]}
+        self._send(200, payload)
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    PagedHandler.pages_served = []
+    PagedHandler.fail_from = None
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), PagedHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.mark.parametrize("prefetch", [True, False])
+def test_sync_iterator_walks_every_page(server, prefetch):
+    client = DatadogClient("api", "app", server)
+
+    assert [nb["id"] for nb in client.iter_notebooks(page_size=5, prefetch=prefetch)] == list(range(23))
+    assert [d["id"] for d in client.iter_dashboards(page_size=7, prefetch=prefetch)] == [d["id"] for d in DASHBOARDS]
+    # 23 notebooks in pages of 5, then 7 dashboards in one full page plus an empty one
+    assert len(PagedHandler.pages_served) == 5 + 2
+
+
+def test_sync_iterator_stops_early(server):
+    client = DatadogClient("api", "app", server)
+    iterator = client.iter_notebooks(page_size=5, prefetch=False)
+
+    assert [next(iterator)["id"] for _ in range(3)] == [0, 1, 2]
+    iterator.close()
+    assert PagedHandler.pages_served == [("/api/v1/notebooks", 0)]
+
+
+def test_sync_iterator_raises_on_failed_page(server):
+    PagedHandler.fail_from = 10
+    client = DatadogClient("api", "app", server, rate_limiter=RateLimiter(max_retries=0))
+
+    seen = []
+    with pytest.raises(DatadogAPIError) as excinfo:
+        for notebook in client.iter_notebooks(page_size=5):
+            seen.append(notebook["id"])
+    assert seen == list(range(10))
+    assert excinfo.value.status_code == 500
+
+
+def test_async_iterator_and_stream_route(server, monkeypatch):
+    async def run():
+        async with AsyncDatadogClient("api", "app", server) as client:
+            ids = [nb["id"] async for nb in client.iter_notebooks(page_size=4)]
+
+        monkeypatch.setattr(main, "async_datadog_client", AsyncDatadogClient("api", "app", server))
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app") as http:
+            response = await http.get("/dashboards/stream", params={"page_size": 3})
+        await main.async_datadog_client.aclose()
+        return ids, response
+
+    ids, response = asyncio.run(run())
+
+    assert ids == list(range(23))
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [d["id"] for d in lines] == [d["id"] for d in DASHBOARDS]
+
+
+def test_stream_route_reports_failed_page(server, monkeypatch):
+    PagedHandler.fail_from = 4
+
+    async def run():
+        monkeypatch.setattr(main, "async_datadog_client", AsyncDatadogClient(
+            "api", "app", server, rate_limiter=RateLimiter(max_retries=0)))
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app") as http:
+            response = await http.get("/notebooks/stream", params={"page_size": 4})
+        await main.async_datadog_client.aclose()
+        return response
+
+    lines = [json.loads(line) for line in asyncio.run(run()).text.splitlines()]
+    assert [nb["id"] for nb in lines[:-1]] == [0, 1, 2, 3]
+    assert lines[-1]["status_code"] == 500
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
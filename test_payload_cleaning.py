@@ -0,0 +1,61 @@
+"""
+Test script for notebook and dashboard payload cleaning
+"""
+
+import copy
+import json
+
+from datadog_client import DatadogClient
+
+client = DatadogClient("api", "app", "http://127.0.0.1:9")
+
+
+def test_notebook_cleaning_leaves_input_untouched():
+    with open("NotebookExample1.json") as f:
+        notebook = json.load(f)
+    notebook["data"]["id"] = 123
+    notebook["data"]["attributes"].update(id=1, created="2024-01-01", modified="2024-01-02", author={"handle": "x"})
+    notebook["data"]["attributes"]["cells"][0]["id"] = "cell-1"
+    original = copy.deepcopy(notebook)
+
+    clean = client._clean_notebook_data_for_creation(notebook)
+
+    assert notebook == original
+    assert "id" not in clean["data"]
+    assert not {"id", "created", "modified", "author"} & set(clean["data"]["attributes"])
+    assert "id" not in clean["data"]["attributes"]["cells"][0]
+    # Untouched subtrees are shared rather than copied
+    assert clean["data"]["attributes"]["cells"][0]["attributes"] is notebook["data"]["attributes"]["cells"][0]["attributes"]
+
+
+def test_dashboard_cleaning_copies_only_what_changes():
+    dashboard = {
+        "id": "abc", "url": "/dashboard/abc", "is_read_only": False, "title": "T", "layout_type": "ordered",
+        "widgets": [
+            {"id": 1, "definition": {"id": 2, "type": "note", "content": "x"}},
+            {"definition": {"type": "timeseries", "requests": [{"q": "avg:system.load.1{*}"}]}},
+        ],
+        "template_variables": [{"name": "env", "default": "prod", "id": 7}, {"name": "host", "prefix": "host"}],
+    }
+    original = copy.deepcopy(dashboard)
+
+    clean = client._clean_dashboard_data_for_creation(dashboard)
+
+    assert dashboard == original
+    assert clean == {
+        "title": "T", "layout_type": "ordered",
+        "widgets": [
+            {"definition": {"type": "note", "content": "x"}},
+            {"definition": {"type": "timeseries", "requests": [{"q": "avg:system.load.1{*}"}]}},
+        ],
+        "template_variables": [{"name": "env", "default": "prod", "available_values": ["*"]},
+                               {"name": "host", "prefix": "host"}],
+    }
+    assert clean["widgets"][1] is dashboard["widgets"][1]
+    assert clean["template_variables"][1] is dashboard["template_variables"][1]
+
+
+if __name__ == "__main__":
+    test_notebook_cleaning_leaves_input_untouched()
+    test_dashboard_cleaning_copies_only_what_changes()
+    print("✅ Payload cleaning tests passed")
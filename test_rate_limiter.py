@@ -0,0 +1,198 @@
+"""
+Test script for rate-limit-aware request pacing
+Runs the Datadog clients against a local stand-in that enforces a fixed-window limit
+"""
+
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+import main
+from async_datadog_client import AsyncDatadogClient
+from datadog_client import DatadogClient
+from rate_limiter import RateLimiter, TokenBucket, endpoint_family, should_retry
+
+LIMIT = 5
+PERIOD = 1
+
+
+class RateLimitedHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    lock = threading.Lock()
+    window_start = 0.0
+    used = 0
+    served = 0
+    rejected = 0
+    fail_next = 0
+
+    @classmethod
+    def reset(cls):
+        with cls.lock:
+            cls.window_start = time.monotonic()
+            cls.used = cls.served = cls.rejected = cls.fail_next = 0
+
+    def _handle(self):
+        cls = type(self)
+        with cls.lock:
+            now = time.monotonic()
+            if now - cls.window_start >= PERIOD:
+                cls.window_start, cls.used = now, 0
+            reset = max(0.0, PERIOD - (now - cls.window_start))
+            if cls.fail_next:
+                cls.fail_next -= 1
+                status = 503
+            elif cls.used >= LIMIT:
+                cls.rejected += 1
+                status = 429
+            else:
+                cls.used += 1
+                cls.served += 1
+                status = 200
+            remaining = LIMIT - cls.used
+
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        body = json.dumps({"data": []} if status == 200 else {"errors": ["Rate limit exceeded"]}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-RateLimit-Limit", str(LIMIT))
+        self.send_header("X-RateLimit-Period", str(PERIOD))
+        self.send_header("X-RateLimit-Remaining", str(remaining))
+        self.send_header("X-RateLimit-Reset", f"{reset:.3f}")
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = _handle
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), RateLimitedHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_endpoint_families_and_retry_policy():
+    assert endpoint_family("/api/v1/notebooks/123") == "notebooks"
+    assert endpoint_family("/api/v1/dashboard") == "dashboard"
+    assert endpoint_family("/api/v2/metrics") == "metrics"
+    assert endpoint_family("/unknown") == "default"
+    assert should_retry("POST", 429)
+    assert not should_retry("POST", 503)
+    assert should_retry("GET", 503)
+    assert not should_retry("GET", 404)
+
+
+def test_bucket_paces_after_headers():
+    bucket = TokenBucket()
+    assert bucket.reserve() == 0.0  # Unknown limit: no pacing
+
+    bucket.update({"X-RateLimit-Limit": "10", "X-RateLimit-Period": "10",
+                   "X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "2"})
+    assert 1.9 < bucket.reserve() <= 2.0
+    # A second caller queues behind the first at the sustainable rate
+    assert 2.9 < bucket.reserve() <= 3.0
+    assert bucket.status()["throttled_requests"] == 2
+
+
+def test_refill_is_held_until_reset():
+    bucket = TokenBucket()
+    bucket.update({"X-RateLimit-Limit": "10", "X-RateLimit-Period": "1",
+                   "X-RateLimit-Remaining": "1", "X-RateLimit-Reset": "0.5"})
+    time.sleep(0.2)
+
+    # Refilling continuously would have added two tokens by now, but the window has not reset
+    assert bucket.reserve() == 0.0
+    wait = bucket.reserve()
+    assert 0.0 < wait <= 0.3
+
+    # From the reset on, tokens come back at limit/period
+    time.sleep(wait + 0.2)
+    assert bucket.reserve() == 0.0
+
+
+def test_new_window_does_not_stall_queued_callers():
+    bucket = TokenBucket()
+    bucket.update({"X-RateLimit-Limit": "10", "X-RateLimit-Period": "10",
+                   "X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "0.1"})
+    assert bucket.reserve() <= 0.1
+    time.sleep(0.15)
+
+    # The queued caller's response reports a fresh window; the next caller follows at the refill rate
+    bucket.update({"X-RateLimit-Limit": "10", "X-RateLimit-Period": "10",
+                   "X-RateLimit-Remaining": "9", "X-RateLimit-Reset": "10"})
+    assert bucket.reserve() < 2.0
+
+
+def test_sync_client_stays_within_budget(server):
+    RateLimitedHandler.reset()
+    client = DatadogClient("api", "app", server, rate_limiter=RateLimiter(retry_deadline=10))
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda _: client.list_notebooks(), range(3 * LIMIT)))
+
+    assert all("error" not in r for r in results)
+    assert RateLimitedHandler.served == 3 * LIMIT
+    # Only the first burst (before any headers were seen) may hit the limit
+    assert RateLimitedHandler.rejected <= 4
+    assert client.get_rate_limit_status()["families"]["notebooks"]["limit"] == LIMIT
+
+
+def test_async_client_retries_transient_errors(server):
+    RateLimitedHandler.reset()
+    RateLimitedHandler.fail_next = 2
+
+    async def run():
+        async with AsyncDatadogClient("api", "app", server,
+                                      rate_limiter=RateLimiter(backoff_base=0.05)) as client:
+            return await client.list_dashboards(), client.get_rate_limit_status()
+
+    result, status = asyncio.run(run())
+    assert result == {"data": []}
+    assert status["retries"] == 2
+
+
+def test_post_is_not_retried_on_server_error(server):
+    RateLimitedHandler.reset()
+    RateLimitedHandler.fail_next = 1
+    client = DatadogClient("api", "app", server)
+
+    result = client.create_notebook({"data": {"type": "notebooks", "attributes": {"name": "x", "cells": []}}})
+    assert result["status_code"] == 503
+    assert client.get_rate_limit_status()["retries"] == 0
+
+
+def test_route_surfaces_rate_limit_as_429(server, monkeypatch):
+    RateLimitedHandler.reset()
+    RateLimitedHandler.used = LIMIT  # Budget already spent by someone else
+
+    async def run():
+        monkeypatch.setattr(main, "async_datadog_client", AsyncDatadogClient(
+            "api", "app", server, rate_limiter=RateLimiter(max_retries=0)))
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app") as http:
+            response = await http.get("/notebooks")
+            limits = await http.get("/datadog/rate-limits")
+        await main.async_datadog_client.aclose()
+        return response, limits
+
+    response, limits = asyncio.run(run())
+    assert response.status_code == 429
+    assert limits.json()["families"]["notebooks"]["remaining"] == 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
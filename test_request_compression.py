@@ -0,0 +1,121 @@
+"""
+Test script for gzip-compressed Datadog request bodies
+Runs against a local stand-in that decompresses and verifies every payload
+"""
+
+import asyncio
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from async_datadog_client import AsyncDatadogClient
+from datadog_client import DatadogClient
+from rate_limiter import RateLimiter
+
+THRESHOLD = 1024
+
+
+class DecompressingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    received = []
+    fail_next = 0
+
+    def _handle(self):
+        raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        encoding = self.headers.get("Content-Encoding")
+        payload = json.loads(gzip.decompress(raw) if encoding == "gzip" else raw)
+        type(self).received.append({"encoding": encoding, "raw": raw, "payload": payload})
+
+        if type(self).fail_next:
+            type(self).fail_next -= 1
+            return self._send(503, {"errors": ["Try again"]})
+        if self.path.startswith("/api/v1/notebooks"):
+            return self._send(200, {"data": {"id": 1, "type": "notebooks"}})
+        self._send(200, {"id": "abc-def-ghi", **payload})
+
+    do_POST = do_PUT = _handle
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    DecompressingHandler.received = []
+    DecompressingHandler.fail_next = 0
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), DecompressingHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def large_dashboard(widgets=200):
+    return {
+        "title": "Large", "layout_type": "ordered",
+        "widgets": [{"definition": {"type": "note", "content": f"# Section {i}\n" + "lorem ipsum " * 20}}
+                    for i in range(widgets)],
+    }
+
+
+def test_large_bodies_are_gzipped_and_small_ones_are_not(server):
+    client = DatadogClient("api", "app", server, gzip_threshold=THRESHOLD)
+    dashboard = large_dashboard()
+
+    assert "error" not in client.create_dashboard(dashboard)
+    assert "error" not in client.create_dashboard(large_dashboard(widgets=1))
+
+    large, small = DecompressingHandler.received
+    assert large["encoding"] == "gzip"
+    assert large["payload"] == dashboard
+    assert len(large["raw"]) < len(json.dumps(dashboard)) / 10
+    assert small["encoding"] is None
+
+
+def test_retries_resend_the_same_encoded_bytes(server, monkeypatch):
+    DecompressingHandler.fail_next = 2
+    client = DatadogClient("api", "app", server, gzip_threshold=THRESHOLD,
+                           rate_limiter=RateLimiter(backoff_base=0.01))
+    encodings = []
+    original = client._encode_json_body
+    monkeypatch.setattr(client, "_encode_json_body", lambda payload: encodings.append(1) or original(payload))
+
+    notebook = {"data": {"type": "notebooks", "attributes": {
+        "name": "Long", "cells": [{"type": "notebook_cells", "attributes": {"definition": {
+            "type": "markdown", "text": "x" * 5000}}}]}}}
+    assert "error" not in client.update_notebook("1", notebook)
+
+    assert len(encodings) == 1
+    assert len(DecompressingHandler.received) == 3
+    assert len({r["raw"] for r in DecompressingHandler.received}) == 1
+
+
+def test_async_client_compresses(server):
+    async def run():
+        async with AsyncDatadogClient("api", "app", server, gzip_threshold=THRESHOLD) as client:
+            return await client.update_dashboard("abc-def-ghi", large_dashboard())
+
+    assert "error" not in asyncio.run(run())
+    assert DecompressingHandler.received[0]["encoding"] == "gzip"
+    assert DecompressingHandler.received[0]["payload"] == large_dashboard()
+
+
+def test_compression_disabled_by_default(server):
+    DatadogClient("api", "app", server).create_dashboard(large_dashboard())
+    assert DecompressingHandler.received[0]["encoding"] is None
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
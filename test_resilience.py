@@ -0,0 +1,223 @@
+"""
+Test script for request deadlines and upstream circuit breakers
+Runs the Datadog clients against a slow or failing fake server and checks that calls fail fast
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import main
+from async_datadog_client import AsyncDatadogClient
+from datadog_client import DatadogClient
+from fake_datadog_server import FakeDatadogServer
+from metric_analysis_service import MetricAnalysisService
+from rate_limiter import RateLimiter
+from resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded, deadline_scope, remaining
+
+LIST_ROUTE = "GET /api/v1/notebooks"
+
+
+def test_breaker_opens_then_recovers_through_a_trial_call():
+    breaker = CircuitBreaker("upstream", failure_threshold=2, reset_timeout=0.05)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    time.sleep(0.06)
+    breaker.before_call()  # the trial call
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # only one trial at a time
+    breaker.record_failure()
+    assert breaker.snapshot()["state"] == "open"
+
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_success()
+    snapshot = breaker.snapshot()
+    assert snapshot["state"] == "closed" and snapshot["rejected"] == 2 and snapshot["failures"] == 3
+
+
+def test_nested_deadlines_only_shorten():
+    assert remaining() is None
+    with deadline_scope(10):
+        with deadline_scope(60):
+            assert remaining() <= 10
+        with deadline_scope(1):
+            assert remaining() <= 1
+    assert remaining() is None
+
+
+def test_deadline_cuts_a_hung_upstream_short():
+    breaker = CircuitBreaker("datadog", failure_threshold=1)
+    with FakeDatadogServer(latency=2.0) as server:
+        client = DatadogClient("fake", "fake", server.url, circuit_breaker=breaker)
+        started = time.monotonic()
+        with deadline_scope(0.3), pytest.raises(DeadlineExceeded):
+            client.list_notebooks()
+        elapsed = time.monotonic() - started
+
+    assert elapsed < 1.0
+    # Running out of our own time says nothing about Datadog's health
+    assert breaker.snapshot()["state"] == "closed"
+
+
+def test_failing_upstream_trips_the_shared_breaker():
+    breaker = CircuitBreaker("datadog", failure_threshold=3, reset_timeout=60)
+
+    async def run(url):
+        async with AsyncDatadogClient("fake", "fake", url, rate_limiter=RateLimiter(max_retries=0),
+                                      circuit_breaker=breaker) as async_client:
+            failed = [await async_client.list_notebooks() for _ in range(3)]
+            with pytest.raises(CircuitOpenError):
+                await async_client.list_notebooks()
+            return failed
+
+    with FakeDatadogServer(error_rate=1.0, error_status=503) as server:
+        failed = asyncio.run(run(server.url))
+        sync_client = DatadogClient("fake", "fake", server.url, circuit_breaker=breaker)
+        with pytest.raises(CircuitOpenError):
+            sync_client.get_notebook("1")
+        requests = server.state.stats()["requests"]
+
+    assert [result["status_code"] for result in failed] == [503] * 3
+    assert requests[LIST_ROUTE] == 3 and "GET /api/v1/notebooks/{id}" not in requests
+
+
+def test_routes_map_breaker_and_deadline_to_status_codes(monkeypatch):
+    breaker = CircuitBreaker("datadog", failure_threshold=1, reset_timeout=60)
+    monkeypatch.setattr(main, "datadog_circuit_breaker", breaker)
+
+    async def run(url):
+        client = AsyncDatadogClient("fake", "fake", url, circuit_breaker=breaker)
+        monkeypatch.setattr(main, "async_datadog_client", client)
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app") as http:
+            timed_out = await http.get("/notebooks", headers={"X-Request-Timeout": "0.2"})
+            breaker.record_failure()
+            rejected = await http.get("/notebooks")
+            health = await http.get("/health")
+        await client.aclose()
+        return timed_out, rejected, health
+
+    with FakeDatadogServer(latency=1.0) as server:
+        timed_out, rejected, health = asyncio.run(run(server.url))
+
+    assert timed_out.status_code == 504
+    assert rejected.status_code == 503 and int(rejected.headers["Retry-After"]) >= 59
+    assert health.json()["circuit_breakers"]["datadog"]["state"] == "open"
+
+
+
+def test_worker_threads_keep_the_callers_deadline():
+    with FakeDatadogServer(latency=2.0) as server:
+        client = DatadogClient("fake", "fake", server.url, bulk_concurrency=4)
+        started = time.monotonic()
+        with deadline_scope(0.3), pytest.raises(DeadlineExceeded):
+            client.query_metrics_batch(["avg:system.cpu.user{*}"], 0, 4 * 3600, chunk_seconds=3600)
+        elapsed = time.monotonic() - started
+
+    assert elapsed < 1.0
+
+
+def test_streams_end_with_an_error_line_when_the_breaker_is_open(monkeypatch):
+    breaker = CircuitBreaker("datadog", failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+
+    async def run(url):
+        client = AsyncDatadogClient("fake", "fake", url, circuit_breaker=breaker)
+        monkeypatch.setattr(main, "async_datadog_client", client)
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app") as http:
+            streamed = await http.get("/notebooks/stream")
+        await client.aclose()
+        return streamed
+
+    with FakeDatadogServer() as server:
+        streamed = asyncio.run(run(server.url))
+
+    assert streamed.status_code == 200
+    assert streamed.json()["status_code"] == 503 and "open" in streamed.json()["error"]
+
+
+
+def test_preview_and_analysis_routes_shed_load(monkeypatch):
+    class OpenBreakerGenerator:
+        def generate_notebook(self, description, author_info=None, advanced_settings=None):
+            raise CircuitOpenError("openai circuit breaker is open", retry_after=60)
+
+    class TimedOutAnalysis:
+        def analyze_metrics(self, suggested_metrics, customer_id=None):
+            raise DeadlineExceeded("Request deadline exceeded")
+
+        def get_coverage_matrix(self, customer_ids=None):
+            raise DeadlineExceeded("Request deadline exceeded")
+
+        async def get_customer_metrics_async(self, customer_id=None):
+            raise CircuitOpenError("datadog circuit breaker is open", retry_after=30)
+
+    monkeypatch.setattr(main, "notebook_generator", OpenBreakerGenerator())
+    monkeypatch.setattr(main, "metric_analysis_service", TimedOutAnalysis())
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app") as http:
+            return [
+                await http.post("/preview", json={"description": "cpu"}),
+                await http.post("/metrics/analyze", json={"suggested_metrics": [{"metric_name": "system.cpu.user"}]}),
+                await http.get("/metrics/coverage-matrix"),
+                await http.get("/metrics/customer/a"),
+            ]
+
+    preview, analyze, matrix, customer = asyncio.run(run())
+
+    assert preview.status_code == 503 and preview.headers["Retry-After"] == "60"
+    assert analyze.status_code == 504 and matrix.status_code == 504
+    assert customer.status_code == 503 and customer.headers["Retry-After"] == "30"
+
+
+
+def test_open_datadog_breaker_is_not_reported_as_a_failed_inventory(monkeypatch):
+    monkeypatch.delenv("CUSTOMER_METRICS_ENDPOINT", raising=False)
+    breaker = CircuitBreaker("datadog", failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    service = MetricAnalysisService(DatadogClient("fake", "fake", "http://127.0.0.1:9", circuit_breaker=breaker))
+    monkeypatch.setattr(main, "metric_analysis_service", service)
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app") as http:
+            return [
+                await http.post("/metrics/analyze", json={"suggested_metrics": [{"metric_name": "system.cpu.user"}]}),
+                await http.get("/metrics/coverage-matrix"),
+                await http.get("/metrics/customer/a"),
+            ]
+
+    for response in asyncio.run(run()):
+        assert response.status_code == 503 and int(response.headers["Retry-After"]) >= 59
+
+
+
+def test_async_inventory_fetch_keeps_the_deadline(monkeypatch):
+    monkeypatch.delenv("CUSTOMER_METRICS_ENDPOINT", raising=False)
+
+    async def run(url):
+        service = MetricAnalysisService(DatadogClient("fake", "fake", url))
+        with deadline_scope(0.3):
+            await service.get_customer_metrics_async("a")
+
+    with FakeDatadogServer(latency=2.0) as server:
+        started = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            asyncio.run(run(server.url))
+        elapsed = time.monotonic() - started
+
+    assert elapsed < 1.0
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
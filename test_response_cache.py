@@ -0,0 +1,181 @@
+"""
+Test script for the notebook/dashboard response cache
+Runs against a local stand-in that honours If-None-Match and If-Modified-Since
+"""
+
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from async_datadog_client import AsyncDatadogClient
+from datadog_client import DatadogClient
+from response_cache import ResponseCache
+
+DASHBOARD_MODIFIED = "2024-05-01T12:30:00.000000+00:00"
+DASHBOARD_MODIFIED_HTTP = "Wed, 01 May 2024 12:30:00 GMT"
+
+
+class ConditionalHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests_seen = []
+    version = 1
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        type(self).requests_seen.append((self.command, path, self.headers.get("If-None-Match"),
+                                         self.headers.get("If-Modified-Since")))
+        resource_id = path.rsplit("/", 1)[1]
+        if path.startswith("/api/v1/notebooks/"):
+            etag = f'"{resource_id}-v{self.version}"'
+            if self.headers.get("If-None-Match") == etag:
+                return self._send(304, None)
+            payload = {"data": {"id": resource_id, "attributes": {"name": f"v{self.version}"}}}
+            return self._send(200, payload, {"ETag": etag})
+
+        if self.headers.get("If-Modified-Since") == DASHBOARD_MODIFIED_HTTP:
+            return self._send(304, None)
+        return self._send(200, {"id": resource_id, "title": "dash", "modified_at": DASHBOARD_MODIFIED})
+
+    def do_PUT(self):
+        type(self).requests_seen.append((self.command, self.path, None, None))
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        type(self).version += 1
+        self._send(200, {"data": {"id": "1"}})
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode() if payload is not None else b""
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    ConditionalHandler.requests_seen = []
+    ConditionalHandler.version = 1
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), ConditionalHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def gets():
+    return [r for r in ConditionalHandler.requests_seen if r[0] == "GET"]
+
+
+def test_fresh_entries_skip_the_request(server):
+    client = DatadogClient("api", "app", server)
+
+    first = client.get_notebook("1")
+    first["data"]["attributes"]["name"] = "mutated by caller"
+    second = client.get_notebook("1")
+
+    assert second["data"]["attributes"]["name"] == "v1"
+    assert len(gets()) == 1
+    assert client.response_cache.stats()["hits"] == 1
+
+
+def test_stale_entries_revalidate_with_etag_and_modified(server):
+    client = DatadogClient("api", "app", server, response_cache=ResponseCache(ttl=0))
+
+    assert client.get_notebook("1") == client.get_notebook("1")
+    assert client.get_dashboard("abc") == client.get_dashboard("abc")
+
+    assert [r[2:] for r in gets()] == [
+        (None, None), ('"1-v1"', None),
+        (None, None), (None, DASHBOARD_MODIFIED_HTTP),
+    ]
+    assert client.response_cache.stats()["revalidated"] == 2
+
+
+def test_own_updates_invalidate(server):
+    client = DatadogClient("api", "app", server)
+
+    client.get_notebook("1")
+    client.update_notebook("1", {"data": {"type": "notebooks", "attributes": {"name": "v2", "cells": []}}})
+
+    assert client.get_notebook("1")["data"]["attributes"]["name"] == "v2"
+    assert len(gets()) == 2
+
+
+def test_size_bound_evicts_least_recently_used(server):
+    client = DatadogClient("api", "app", server, response_cache=ResponseCache(max_entries=2))
+
+    for notebook_id in ("1", "2", "1", "3", "1", "2"):
+        client.get_notebook(notebook_id)
+
+    # "2" was evicted by "3" since "1" had been touched more recently
+    assert [r[1] for r in gets()] == ["/api/v1/notebooks/1", "/api/v1/notebooks/2",
+                                      "/api/v1/notebooks/3", "/api/v1/notebooks/2"]
+
+
+def test_async_client_shares_cache_with_sync_client(server):
+    cache = ResponseCache()
+    sync_client = DatadogClient("api", "app", server, response_cache=cache)
+
+    async def run():
+        async with AsyncDatadogClient("api", "app", server, response_cache=cache) as client:
+            first = await client.get_notebook("1")
+            sync_client.update_notebook("1", {"data": {"attributes": {"name": "v2", "cells": []}}})
+            second = await client.get_notebook("1")
+            third = await client.get_notebook("1")
+            return first, second, third
+
+    first, second, third = asyncio.run(run())
+    assert first["data"]["attributes"]["name"] == "v1"
+    assert second == third
+    assert second["data"]["attributes"]["name"] == "v2"
+    assert len(gets()) == 2
+
+
+def test_async_client_revalidates_with_etag_and_modified(server):
+    async def run():
+        async with AsyncDatadogClient("api", "app", server, response_cache=ResponseCache(ttl=0)) as client:
+            notebooks = [await client.get_notebook("1") for _ in range(2)]
+            dashboards = [await client.get_dashboard("abc") for _ in range(2)]
+            return notebooks, dashboards, client.response_cache.stats()
+
+    notebooks, dashboards, stats = asyncio.run(run())
+    assert notebooks[0] == notebooks[1] and "error" not in notebooks[1]
+    assert dashboards[0] == dashboards[1] and "error" not in dashboards[1]
+    assert [r[2:] for r in gets()] == [
+        (None, None), ('"1-v1"', None),
+        (None, None), (None, DASHBOARD_MODIFIED_HTTP),
+    ]
+    assert stats["revalidated"] == 2
+
+
+def test_get_in_flight_during_invalidation_is_not_stored():
+    cache = ResponseCache()
+
+    class Response:
+        status_code = 200
+        content = b'{"name": "old"}'
+        headers = {}
+
+        def json(self):
+            return json.loads(self.content)
+
+    generation = cache.generation("key")
+    cache.invalidate("key")  # an update lands while the GET is on the wire
+    assert cache.resolve("key", None, Response(), generation) == {"name": "old"}
+    assert cache.lookup("key") == (None, False)
+
+    cache.resolve("key", None, Response(), cache.generation("key"))
+    assert cache.lookup("key")[0] is not None
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,111 @@
+"""
+Test script for the compiled notebook/dashboard schema validators
+Checks JSON-path error reporting, layout rules and the /validate/batch endpoint
+"""
+
+import asyncio
+import glob
+import json
+import os
+
+import httpx
+import pytest
+
+import main
+from schema_validation import compile_schema, validate_dashboard, validate_notebook
+
+
+def dashboard(layout_type="ordered", **widget):
+    return {"title": "T", "layout_type": layout_type, "description": "", "template_variables": [],
+            "widgets": [dict({"definition": {"type": "timeseries", "time": {},
+                                             "requests": [{"q": "avg:system.cpu.user{*}"}]}}, **widget)]}
+
+
+def test_example_definitions_are_valid():
+    with open("NotebookExample1.json") as f:
+        assert validate_notebook(json.load(f))["valid"]
+    assert validate_dashboard(dashboard()) == {"valid": True, "errors": [], "warnings": []}
+
+
+def test_every_error_is_reported_with_its_path():
+    result = validate_notebook({"data": {"type": "notebook", "attributes": {"name": "", "cells": [
+        {"type": "notebook_cells", "attributes": {"definition": {"type": "timeseries", "requests": [{}]}}},
+        {"type": "notebook_cells", "attributes": {}},
+        "markdown",
+    ]}}})
+
+    assert not result["valid"]
+    assert result["errors"] == [
+        "$.data.type: must be one of: notebooks",
+        "$.data.attributes.name: must not be empty",
+        "$.data.attributes.cells[0].attributes.definition.requests[0]: missing 'q' or 'queries'",
+        "$.data.attributes.cells[1].attributes: missing required field 'definition'",
+        "$.data.attributes.cells[2]: expected object, got string",
+    ]
+    assert "$.data.attributes: no 'time' specified, will use default" in result["warnings"]
+
+
+@pytest.mark.parametrize("path", sorted(glob.glob(os.path.join("dashboard examples", "*.json"))))
+def test_sample_dashboard_payloads_are_valid(path):
+    with open(path) as f:
+        assert validate_dashboard(json.load(f))["errors"] == []
+
+
+def test_widget_layout_follows_layout_type():
+    ordered = dashboard("ordered", layout={"x": 0, "y": 0, "width": 4, "height": 2})
+    assert validate_dashboard(ordered)["errors"] == []
+    assert validate_dashboard(dashboard("ordered", layout={"x": 0}))["errors"] == [
+        "$.widgets[0].layout: missing required field 'y'",
+        "$.widgets[0].layout: missing required field 'width'",
+        "$.widgets[0].layout: missing required field 'height'"]
+    free = dashboard("free", layout={"x": 0, "y": 0, "width": 4, "height": True})
+    assert validate_dashboard(free)["errors"] == ["$.widgets[0].layout.height: expected integer, got boolean"]
+    assert validate_dashboard(dashboard("free"))["errors"] == ["$.widgets[0]: missing required field 'layout'"]
+
+
+def test_only_query_widgets_need_q_or_queries():
+    stream = {"definition": {"type": "list_stream", "time": {},
+                             "requests": [{"query": {"data_source": "logs_stream"}, "columns": []}]}}
+    query_value = {"definition": {"type": "query_value", "time": {}, "requests": [{"query": "x"}]}}
+    result = validate_dashboard(dict(dashboard(), widgets=[stream, query_value]))
+    assert result["errors"] == ["$.widgets[1].definition.requests[0]: missing 'q' or 'queries'"]
+
+
+def test_group_widgets_are_validated_recursively():
+    group = {"definition": {"type": "group", "time": {}, "widgets": [{"definition": {"time": {}}}]}}
+    result = validate_dashboard(dict(dashboard(), widgets=[group]))
+    assert result["errors"] == ["$.widgets[0].definition.widgets[0].definition: missing required field 'type'"]
+
+
+def test_unknown_reference_fails_at_compile_time():
+    with pytest.raises(ValueError):
+        compile_schema({"root": {"type": "array", "items": {"$ref": "missing"}}})
+
+
+def test_batch_endpoint_uses_worker_pool(monkeypatch):
+    monkeypatch.setattr(main, "VALIDATION_CHUNK_SIZE", 50)
+    items = [{"kind": "dashboard", "definition": dashboard(), "id": f"d{i}"} for i in range(120)]
+    items[70]["definition"] = {"title": "broken"}
+    items.append({"kind": "monitor", "definition": {}})
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app") as http:
+            return await http.post("/validate/batch", json={"items": items})
+
+    try:
+        response = asyncio.run(run())
+    finally:
+        if main.validation_pool is not None:
+            main.validation_pool.shutdown()
+            main.validation_pool = None
+
+    body = response.json()
+    assert response.status_code == 200
+    assert (body["total"], body["valid"], body["invalid"]) == (121, 119, 2)
+    assert body["results"][70]["id"] == "d70" and not body["results"][70]["valid"]
+    assert body["results"][120]["errors"] == ["$: unknown kind 'monitor'"]
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,146 @@
+"""
+Test script for serving several Datadog orgs from one process
+Routes requests to per-org clients by header and path against two fake Datadog servers
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import main
+from fake_datadog_server import FakeDatadogServer
+from tenant_registry import TenantConfig, TenantRegistry, UnknownTenant, load_tenants
+
+LIST_ROUTE = "GET /api/v1/notebooks"
+
+
+def test_load_tenants_reads_keys_from_the_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv("ACME_DD_API_KEY", "api-from-env")
+    path = tmp_path / "tenants.json"
+    path.write_text(json.dumps({
+        "acme": {"api_key_env": "ACME_DD_API_KEY", "app_key": "app", "base_url": "https://api.datadoghq.eu"},
+        "globex": {"api_key": "api", "app_key": "app"},
+    }))
+
+    tenants = load_tenants(str(path))
+
+    assert tenants["acme"] == TenantConfig("acme", "api-from-env", "app", "https://api.datadoghq.eu")
+    assert tenants["globex"].base_url == "https://api.datadoghq.com"
+
+    path.write_text(json.dumps({"../etc": {"api_key": "api", "app_key": "app"}}))
+    with pytest.raises(ValueError):
+        load_tenants(str(path))
+
+
+def test_clients_are_built_lazily_and_evicted_only_when_idle():
+    built = []
+
+    def factory(config):
+        built.append(config.name)
+        return main._build_tenant_clients(config)
+
+    async def run():
+        registry = TenantRegistry({"acme": TenantConfig("acme", "api", "app", "http://127.0.0.1:9")},
+                                  factory, idle_ttl=0)
+        assert built == []
+        first = registry.acquire("acme")
+        assert registry.get("acme") is first and built == ["acme"]
+
+        assert await registry.evict_idle() == []  # a request is still using it
+        registry.release(first)
+        assert await registry.evict_idle() == ["acme"]
+        assert first.async_client.client.is_closed
+
+        assert registry.get("acme") is not first and built == ["acme", "acme"]
+        stats = registry.stats()
+        await registry.aclose()
+        return stats
+
+    stats = asyncio.run(run())
+    assert stats["created"] == 2 and stats["evicted"] == 1
+    assert stats["orgs"]["acme"]["active"] and "api_key" not in json.dumps(stats)
+
+    registry = TenantRegistry({}, factory)
+    with pytest.raises(UnknownTenant):
+        registry.get("acme")
+
+
+def test_routes_use_the_org_named_by_header_or_path(monkeypatch):
+    with FakeDatadogServer(notebooks=3) as acme, FakeDatadogServer(notebooks=5) as globex:
+        registry = TenantRegistry({
+            "acme": TenantConfig("acme", "acme-api", "acme-app", acme.url),
+            "globex": TenantConfig("globex", "globex-api", "globex-app", globex.url),
+        }, main._build_tenant_clients)
+        monkeypatch.setattr(main, "tenant_registry", registry)
+        monkeypatch.setattr(main, "async_datadog_client", None)
+
+        async def run():
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://app") as http:
+                by_header = await http.get("/notebooks", params={"count": 10}, headers={"X-Datadog-Org": "acme"})
+                by_path = await http.get("/orgs/globex/notebooks", params={"count": 10})
+                streamed = await http.get("/orgs/globex/notebooks/stream")
+                unknown = await http.get("/orgs/initech/notebooks")
+                mismatched = await http.get("/orgs/acme/notebooks", headers={"X-Datadog-Org": "globex"})
+                default = await http.get("/notebooks")
+                orgs = await http.get("/orgs")
+            limiters = {name: registry.get(name).async_client.rate_limiter for name in ("acme", "globex")}
+            await registry.aclose()
+            return by_header, by_path, streamed, unknown, mismatched, default, orgs, limiters
+
+        by_header, by_path, streamed, unknown, mismatched, default, orgs, limiters = asyncio.run(run())
+        acme_requests = acme.state.stats()["requests"]
+        globex_requests = globex.state.stats()["requests"]
+
+    assert len(by_header.json()["data"]) == 3
+    assert len(by_path.json()["data"]) == 5
+    assert len(streamed.text.splitlines()) == 5
+    assert unknown.status_code == 404 and mismatched.status_code == 400
+    # Without an org the deployment's own credentials apply, and there are none here
+    assert default.status_code == 500
+    assert acme_requests[LIST_ROUTE] == 1 and globex_requests[LIST_ROUTE] >= 2
+
+    stats = orgs.json()
+    assert stats["active"] == 2 and stats["orgs"]["acme"]["requests"] == 1
+    assert stats["orgs"]["globex"]["in_flight"] == 0
+    assert limiters["acme"] is not limiters["globex"]
+
+
+
+def test_metric_analysis_uses_the_selected_orgs_inventory(monkeypatch):
+    monkeypatch.delenv("CUSTOMER_METRICS_ENDPOINT", raising=False)
+    with FakeDatadogServer(metrics=3) as acme, FakeDatadogServer(metrics=7) as globex:
+        registry = TenantRegistry({
+            "acme": TenantConfig("acme", "acme-api", "acme-app", acme.url),
+            "globex": TenantConfig("globex", "globex-api", "globex-app", globex.url),
+        }, main._build_tenant_clients)
+        monkeypatch.setattr(main, "tenant_registry", registry)
+        monkeypatch.setattr(main, "metric_analysis_service", None)
+
+        async def run():
+            transport = httpx.ASGITransport(app=main.app)
+            body = {"suggested_metrics": [{"metric_name": "system.cpu.user"}]}
+            async with httpx.AsyncClient(transport=transport, base_url="http://app") as http:
+                acme_analysis = await http.post("/orgs/acme/metrics/analyze", json=body)
+                globex_analysis = await http.post("/metrics/analyze", json=body, headers={"X-Datadog-Org": "globex"})
+                again = await http.post("/orgs/acme/metrics/analyze", json=body)
+                default = await http.post("/metrics/analyze", json=body)
+            services = [registry.get(name).metric_analysis for name in ("acme", "globex")]
+            await registry.aclose()
+            return acme_analysis, globex_analysis, again, default, services
+
+        acme_analysis, globex_analysis, again, default, services = asyncio.run(run())
+        acme_requests = acme.state.stats()["requests"]
+
+    assert len(acme_analysis.json()["existing_metrics"]) == 3
+    assert len(globex_analysis.json()["existing_metrics"]) == 7
+    # Built once per org, so the org's inventory cache serves the repeat
+    assert again.json() == acme_analysis.json() and acme_requests["GET /api/v2/metrics"] == 1
+    assert services[0] is not services[1] and services[0].datadog_client is not services[1].datadog_client
+    assert default.status_code == 500
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
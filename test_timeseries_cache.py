@@ -0,0 +1,175 @@
+"""
+Test script for the rollup-aligned timeseries cache
+Runs against a local stand-in that serves one point per pinned rollup interval
+"""
+
+import asyncio
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import pytest
+
+import timeseries_cache
+from async_datadog_client import AsyncDatadogClient
+from datadog_client import DatadogClient
+from timeseries_cache import TimeseriesCache
+
+QUERY = "avg:system.cpu.user{env:prod, host:a}"
+# 4h window: 60s rollup, 1h buckets
+START = 1_700_000_000 // 3600 * 3600 + 900
+END = START + 4 * 3600
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    ranges = []
+
+    def do_GET(self):
+        params = {k: v[0] for k, v in parse_qs(urlsplit(self.path).query).items()}
+        start, end = int(params["from"]), int(params["to"])
+        type(self).ranges.append((params["query"], start, end))
+        match = re.search(r"\.rollup\(\w+, (\d+)\)", params["query"])
+        interval = int(match.group(1)) if match else 20
+        first = -(-start // interval) * interval
+        points = [[t * 1000, float(t // interval % 100)] for t in range(first, end + 1, interval)]
+        body = json.dumps({"status": "ok", "query": params["query"], "series": [{
+            "metric": "system.cpu.user", "display_name": "system.cpu.user", "unit": None,
+            "expression": params["query"], "scope": "env:prod,host:a", "interval": interval,
+            "length": len(points), "pointlist": points}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    QueryHandler.ranges = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), QueryHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_query_normalization_and_rollup_pinning():
+    assert timeseries_cache.normalize_query("avg:cpu{host:a, env:prod} by {host}") == \
+        timeseries_cache.normalize_query("avg:cpu{env:prod,host:a}by{host}")
+    assert timeseries_cache.pin_rollup("avg:cpu{*}", 4 * 3600) == ("avg:cpu{*}.rollup(avg, 60)", 60)
+    assert timeseries_cache.pin_rollup("sum:hits{*}.as_count().rollup(sum)", 3600) == \
+        ("sum:hits{*}.as_count().rollup(sum, 20)", 20)
+    assert timeseries_cache.pin_rollup("avg:cpu{*}.rollup(max, 300)", 3600) == ("avg:cpu{*}.rollup(max, 300)", 300)
+    assert timeseries_cache.pin_rollup("avg:a{*} / avg:b{*}", 3600) is None
+    # Counts keep Datadog's default sum; averaging them would change the numbers
+    assert timeseries_cache.pin_rollup("sum:trace.hits{*}.as_count()", 3600) == \
+        ("sum:trace.hits{*}.as_count().rollup(sum, 20)", 20)
+    assert timeseries_cache.pin_rollup("sum:trace.hits{*}.as_count().rollup(300)", 3600) == \
+        ("sum:trace.hits{*}.as_count().rollup(300)", 300)
+    assert timeseries_cache.pin_rollup("sum:trace.hits{*}.as_count().rollup()", 3600) == \
+        ("sum:trace.hits{*}.as_count().rollup(sum, 20)", 20)
+    assert timeseries_cache.live_span_seconds("4h") == 14400
+    with pytest.raises(ValueError):
+        timeseries_cache.live_span_seconds("week_to_date")
+
+
+def test_repeated_query_is_served_from_memory(server):
+    client = DatadogClient("api", "app", server, timeseries_cache=TimeseriesCache())
+
+    first = client.query_metrics(QUERY, START, END)
+    second = client.query_metrics(QUERY, START, END)
+
+    assert len(QueryHandler.ranges) == 1
+    assert QueryHandler.ranges[0][0] == QUERY + ".rollup(avg, 60)"
+    assert first == second
+    series = first["series"][0]
+    assert series["pointlist"][0][0] == START * 1000
+    assert series["pointlist"][-1][0] == END * 1000
+    assert series["length"] == len(series["pointlist"]) == 241
+    assert series["unit"] is None and series["display_name"] == "system.cpu.user"
+    assert client.timeseries_cache.stats()["hits"] == 5
+
+
+def test_sliding_window_fetches_only_the_new_edge(server):
+    client = DatadogClient("api", "app", server, timeseries_cache=TimeseriesCache())
+    client.query_metrics(QUERY, START, END)
+
+    shifted = client.query_metrics(QUERY, START + 5400, END + 5400)
+
+    assert [r[1:] for r in QueryHandler.ranges[1:]] == [(END // 3600 * 3600 + 3600, (END + 5400) // 3600 * 3600 + 3600)]
+    uncached = DatadogClient("api", "app", server, timeseries_cache=TimeseriesCache())
+    assert shifted == uncached.query_metrics(QUERY, START + 5400, END + 5400)
+
+
+def test_buckets_still_settling_are_refetched(server):
+    # No settle delay, so the last full hour is cached even just after the hour; the current one is not
+    client = DatadogClient("api", "app", server, timeseries_cache=TimeseriesCache(settle_seconds=0))
+    now = int(time.time())
+
+    client.query_metrics(QUERY, now - 4 * 3600, now)
+    client.query_metrics(QUERY, now - 4 * 3600, now)
+
+    assert len(QueryHandler.ranges) == 2
+    assert QueryHandler.ranges[1][1] == now // 3600 * 3600
+    assert QueryHandler.ranges[1][1] > QueryHandler.ranges[0][1]
+
+
+def test_eviction_by_total_points(server):
+    cache = TimeseriesCache(max_points=130)
+    client = DatadogClient("api", "app", server, timeseries_cache=cache)
+
+    client.query_metrics(QUERY, START, END)
+
+    stats = cache.stats()
+    assert stats["points"] <= 130 and stats["buckets"] == 2 and stats["evictions"] == 3
+    client.query_metrics(QUERY, START, END)
+    assert [r[1:] for r in QueryHandler.ranges[1:]] == [(START // 3600 * 3600, START // 3600 * 3600 + 3 * 3600)]
+
+
+def test_disk_buckets_survive_a_new_cache(server, tmp_path):
+    DatadogClient("api", "app", server, timeseries_cache=TimeseriesCache(directory=str(tmp_path))) \
+        .query_metrics(QUERY, START, END)
+    restarted = TimeseriesCache(directory=str(tmp_path))
+
+    result = DatadogClient("api", "app", server, timeseries_cache=restarted).query_metrics(QUERY, START, END)
+
+    assert len(QueryHandler.ranges) == 1
+    assert result["series"][0]["length"] == 241
+    assert restarted.stats()["disk_hits"] == 5
+
+
+def test_unpinnable_queries_bypass_the_cache(server):
+    cache = TimeseriesCache()
+    client = DatadogClient("api", "app", server, timeseries_cache=cache)
+
+    client.query_metrics("avg:a{*} / avg:b{*}", START, END)
+    client.query_metrics("avg:a{*} / avg:b{*}", START, END)
+
+    assert len(QueryHandler.ranges) == 2
+    assert QueryHandler.ranges[0][0] == "avg:a{*} / avg:b{*}"
+    assert cache.stats()["bypassed"] == 2 and cache.stats()["buckets"] == 0
+
+
+def test_async_client_shares_the_cache(server):
+    cache = TimeseriesCache()
+    DatadogClient("api", "app", server, timeseries_cache=cache).query_metrics(QUERY, START, END)
+
+    async def run():
+        async with AsyncDatadogClient("api", "app", server, timeseries_cache=cache) as client:
+            return await client.query_metrics(QUERY, START - 3600, END)
+
+    result = asyncio.run(run())
+    assert [r[1:] for r in QueryHandler.ranges[1:]] == [(START // 3600 * 3600 - 3600, START // 3600 * 3600)]
+    assert result["series"][0]["length"] == 301
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
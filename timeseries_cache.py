@@ -0,0 +1,353 @@
+"""
+Timeseries Cache
+Rollup-aligned bucket cache for Datadog metric query results, held in memory and optionally on disk
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+import metric_series
+from metric_query import MetricQuery, MetricQueryError, format_query, parse_query
+
+logger = logging.getLogger(__name__)
+
+# Rollup intervals Datadog steps through as the queried span grows, targeting ~300 points
+ROLLUP_INTERVALS = (20, 60, 120, 300, 600, 1200, 1800, 3600, 7200, 14400, 28800, 43200, 86400)
+TARGET_POINTS = 300
+
+_LIVE_SPAN_RE = re.compile(r"^(\d+)(m|h|d|w|mo|y)$")
+_LIVE_SPAN_UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 604800, "mo": 2592000, "y": 31536000}
+_SCOPE_RE = re.compile(r"\{([^{}]*)\}")
+
+Parts = Tuple[List[Dict[str, Any]], List[np.ndarray]]
+
+
+def live_span_seconds(live_span: str) -> int:
+    """
+    Length of a notebook/widget live_span such as '1h', '4h', '1w' or '3mo'
+
+    Raises:
+        ValueError: If the live_span is not recognised
+    """
+    match = _LIVE_SPAN_RE.match(live_span.strip())
+    if not match:
+        raise ValueError(f"Unsupported live_span: {live_span}")
+    return int(match.group(1)) * _LIVE_SPAN_UNITS[match.group(2)]
+
+
+def normalize_query(query: str) -> str:
+    """
+    Canonical form of a metric query for use as a cache key
+
+    Whitespace around punctuation is dropped and tags inside each {...} are sorted,
+    so 'avg:cpu{host:a, env:prod} by {host}' and 'avg:cpu{env:prod,host:a}by{host}' match.
+    """
+    query = re.sub(r"\s*([{},:()])\s*", r"\1", re.sub(r"\s+", " ", query.strip()))
+    return _SCOPE_RE.sub(lambda m: "{" + ",".join(sorted(m.group(1).split(","))) + "}", query)
+
+
+def rollup_interval(span_seconds: int) -> int:
+    """Smallest standard rollup interval keeping a span at or under TARGET_POINTS points"""
+    for interval in ROLLUP_INTERVALS:
+        if span_seconds / interval <= TARGET_POINTS:
+            return interval
+    return ROLLUP_INTERVALS[-1]
+
+
+def pin_rollup(query: str, span_seconds: int) -> Optional[Tuple[str, int]]:
+    """
+    Fix a query's rollup interval so every sub-range is returned at the same resolution
+
+    Without an explicit interval Datadog picks the rollup from the queried span,
+    and a partial fetch of the missing edges would come back finer than the
+    cached buckets.
+
+    Args:
+        query: Metric query string
+        span_seconds: Length of the requested window
+
+    Returns:
+        (query with an explicit rollup interval, interval), or None for queries
+        whose rollup cannot be pinned safely (arithmetic, several terms)
+    """
+    query = query.strip()
+    try:
+        term = parse_query(query)
+    except MetricQueryError:
+        return None
+    if not isinstance(term, MetricQuery):
+        return None
+    rollup = term.rollup
+    if rollup is not None and rollup.interval:
+        return query, rollup.interval
+    interval = rollup_interval(span_seconds)
+    # Datadog's default time aggregation is sum for counts and avg for everything else
+    default_method = "sum" if any(call.name == "as_count" for call in term.modifiers) else "avg"
+    if rollup is None:
+        # Appending leaves the caller's spelling of the query untouched
+        return f"{query}.rollup({default_method}, {interval})", interval
+    return format_query(term.with_rollup(rollup.method or default_method, interval)), interval
+
+
+@dataclass
+class BucketEntry:
+    series: List[Dict[str, Any]]
+    arrays: List[np.ndarray]
+    points: int
+
+
+@dataclass
+class QueryPlan:
+    """What a query needs from Datadog once the cached buckets are accounted for"""
+    query: str
+    fetch_query: str
+    from_timestamp: int
+    to_timestamp: int
+    interval: Optional[int] = None
+    bucket_seconds: Optional[int] = None
+    cached: Dict[int, BucketEntry] = field(default_factory=dict)
+    missing: List[Tuple[int, int]] = field(default_factory=list)
+    storable: List[int] = field(default_factory=list)
+
+
+class TimeseriesCache:
+    """
+    Metric query results split into rollup-aligned time buckets
+
+    A window is covered by buckets of points_per_bucket rollup intervals aligned
+    to the epoch, so a sliding live_span keeps landing on the same buckets and
+    only the missing leading and trailing ones are fetched. Buckets are only
+    stored once they are older than settle_seconds, since Datadog still
+    backfills recent points. Memory is bounded by the total points held; with a
+    directory, settled buckets are also written to disk and survive eviction
+    and restarts.
+    """
+
+    def __init__(self, max_points: int = 1_000_000, points_per_bucket: int = 60,
+                 settle_seconds: int = 120, directory: Optional[str] = None):
+        """
+        Initialize the cache
+
+        Args:
+            max_points: Maximum points held in memory across all buckets (0 disables caching)
+            points_per_bucket: Rollup intervals per bucket
+            settle_seconds: Age a bucket's end must reach before it is cached
+            directory: Optional directory for on-disk buckets
+        """
+        self.max_points = max_points
+        self.points_per_bucket = points_per_bucket
+        self.settle_seconds = settle_seconds
+        self.directory = directory
+        self._entries: "OrderedDict[Tuple[str, int, int], BucketEntry]" = OrderedDict()
+        self._points = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_points > 0
+
+    def plan(self, query: str, from_timestamp: int, to_timestamp: int) -> QueryPlan:
+        """
+        Split a query window into cached buckets and ranges still to fetch
+
+        Args:
+            query: Metric query string
+            from_timestamp: Start (epoch seconds)
+            to_timestamp: End (epoch seconds)
+
+        Returns:
+            QueryPlan whose missing ranges must be fetched with fetch_query
+        """
+        plan = QueryPlan(query, query, from_timestamp, to_timestamp)
+        pinned = pin_rollup(query, to_timestamp - from_timestamp) if self.enabled else None
+        if pinned is None or to_timestamp <= from_timestamp:
+            with self._lock:
+                self.bypassed += 1
+            plan.missing = [(from_timestamp, to_timestamp)]
+            return plan
+
+        plan.fetch_query, plan.interval = pinned
+        plan.bucket_seconds = size = plan.interval * self.points_per_bucket
+        key_query = normalize_query(plan.fetch_query)
+        settled_before = time.time() - self.settle_seconds
+        run_start = None
+        for start in range(from_timestamp // size * size, to_timestamp + 1, size):
+            entry = self._get((key_query, plan.interval, start))
+            if entry is not None:
+                plan.cached[start] = entry
+                if run_start is not None:
+                    plan.missing.append((run_start, start))
+                    run_start = None
+                continue
+            if start + size <= settled_before:
+                plan.storable.append(start)
+            if run_start is None:
+                run_start = start
+            with self._lock:
+                self.misses += 1
+        if run_start is not None:
+            plan.missing.append((run_start, to_timestamp // size * size + size))
+        return plan
+
+    def complete(self, plan: QueryPlan, fetched: List[Parts]) -> Dict[str, Any]:
+        """
+        Store freshly fetched buckets and assemble the full query response
+
+        Args:
+            plan: Plan returned by plan()
+            fetched: metric_series.parse_pointlists() output for each missing range, in order
+
+        Returns:
+            Response shaped like /api/v1/query, trimmed to the requested window
+        """
+        parts: List[Parts] = [(entry.series, entry.arrays) for entry in plan.cached.values()]
+        for (range_start, range_end), (decoded, arrays) in zip(plan.missing, fetched):
+            series = decoded.get("series") or []
+            parts.append((series, arrays))
+            starts = [start for start in plan.storable
+                      if range_start <= start and start + (plan.bucket_seconds or 0) <= range_end]
+            if starts:
+                self._store_buckets(plan, starts, series, arrays)
+
+        metadata: Dict[Tuple, Dict[str, Any]] = {}
+        for series, _ in parts:
+            for meta in series:
+                metadata.setdefault(metric_series.series_key(meta), meta)
+        stitched = metric_series.stitch_chunks(plan.query, [({"series": s}, a) for s, a in parts])
+
+        start_ms, end_ms = plan.from_timestamp * 1000, plan.to_timestamp * 1000
+        result_series = []
+        for series in stitched:
+            keep = (series.timestamps >= start_ms) & (series.timestamps <= end_ms)
+            trimmed = metric_series.MetricSeries(
+                series.query, series.expression, series.metric, series.scope,
+                series.timestamps[keep], series.values[keep], series.interval
+            )
+            meta = dict(metadata.get((series.expression, series.scope, series.metric), {}))
+            meta.update(pointlist=trimmed.to_dict()["pointlist"], length=len(trimmed))
+            meta.pop("start", None)
+            meta.pop("end", None)
+            if len(trimmed):
+                meta.update(start=int(trimmed.timestamps[0]), end=int(trimmed.timestamps[-1]))
+            result_series.append(meta)
+
+        return {
+            "status": "ok",
+            "res_type": "time_series",
+            "query": plan.query,
+            "from_date": start_ms,
+            "to_date": end_ms,
+            "series": result_series,
+        }
+
+    def _store_buckets(self, plan: QueryPlan, starts: List[int],
+                       series: List[Dict[str, Any]], arrays: List[np.ndarray]) -> None:
+        size = plan.bucket_seconds
+        key_query = normalize_query(plan.fetch_query)
+        for start in starts:
+            low, high = start * 1000, (start + size) * 1000
+            sliced = [points[(points[:, 0] >= low) & (points[:, 0] < high)] for points in arrays]
+            entry = BucketEntry(series, sliced, sum(len(points) for points in sliced))
+            key = (key_query, plan.interval, start)
+            self._put(key, entry)
+            self._write_disk(key, entry)
+
+    def _get(self, key: Tuple[str, int, int]) -> Optional[BucketEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+        entry = self._read_disk(key)
+        if entry is not None:
+            with self._lock:
+                self.disk_hits += 1
+            self._put(key, entry)
+        return entry
+
+    def _put(self, key: Tuple[str, int, int], entry: BucketEntry) -> None:
+        # Empty buckets still cost an entry, so count them as one point
+        cost = max(entry.points, 1)
+        if cost > self.max_points:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._points -= max(previous.points, 1)
+            self._entries[key] = entry
+            self._points += cost
+            while self._points > self.max_points:
+                _, evicted = self._entries.popitem(last=False)
+                self._points -= max(evicted.points, 1)
+                self.evictions += 1
+
+    def _disk_path(self, key: Tuple[str, int, int]) -> str:
+        digest = hashlib.sha1(json.dumps(key).encode()).hexdigest()
+        return os.path.join(self.directory, f"{digest}.npz")
+
+    def _write_disk(self, key: Tuple[str, int, int], entry: BucketEntry) -> None:
+        if not self.directory:
+            return
+        arrays = {f"series_{i}": points for i, points in enumerate(entry.arrays)}
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, meta=np.array(json.dumps(entry.series)), **arrays)
+            os.replace(temp_path, self._disk_path(key))
+        except OSError as e:
+            logger.warning(f"Failed to write timeseries bucket to disk: {str(e)}")
+
+    def _read_disk(self, key: Tuple[str, int, int]) -> Optional[BucketEntry]:
+        if not self.directory:
+            return None
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                series = json.loads(str(data["meta"]))
+                arrays = [data[f"series_{i}"] for i in range(len(series))]
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable timeseries bucket {path}: {str(e)}")
+            return None
+        return BucketEntry(series, arrays, sum(len(points) for points in arrays))
+
+    def clear(self) -> None:
+        """Drop every bucket held in memory (on-disk buckets are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._points = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            return {
+                "buckets": len(self._entries),
+                "points": self._points,
+                "max_points": self.max_points,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "evictions": self.evictions,
+                "directory": self.directory,
+            }